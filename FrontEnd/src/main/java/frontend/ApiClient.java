@@ -11,6 +11,7 @@ import java.net.URL;
 import java.net.URLEncoder;
 import java.util.List;
 import java.util.Map;
+import java.util.function.Consumer;
 import javax.swing.ImageIcon;
 import frontend.modeldata.*;
 
@@ -68,6 +69,51 @@ public class ApiClient {
         return gson.fromJson(response, TrainingStatus.class);
     }
     
+    /**
+     * Nghe Server-Sent Events từ train service, gọi listener mỗi khi trạng thái thay đổi.
+     * Hàm block cho tới khi training kết thúc hoặc kết nối bị đóng.
+     */
+    public void streamTrainingStatus(String modelId, Consumer<TrainingStatus> listener) throws Exception {
+        URL url = new URL(trainServiceUrl + "/events/" + modelId);
+        HttpURLConnection connection = (HttpURLConnection) url.openConnection();
+        connection.setRequestMethod("GET");
+        connection.setRequestProperty("Accept", "text/event-stream");
+        connection.setConnectTimeout(10000);
+        connection.setReadTimeout(60000);
+
+        int responseCode = connection.getResponseCode();
+        if (responseCode != 200) {
+            connection.disconnect();
+            throw new Exception("HTTP " + responseCode + ": " + connection.getResponseMessage());
+        }
+
+        try (BufferedReader reader = new BufferedReader(
+                new InputStreamReader(connection.getInputStream(), "utf-8"))) {
+            String event = "status";
+            StringBuilder data = new StringBuilder();
+            String line;
+
+            while ((line = reader.readLine()) != null) {
+                if (line.isEmpty()) {
+                    if (data.length() > 0) {
+                        listener.accept(gson.fromJson(data.toString(), TrainingStatus.class));
+                        if ("done".equals(event)) {
+                            return;
+                        }
+                    }
+                    event = "status";
+                    data.setLength(0);
+                } else if (line.startsWith("event:")) {
+                    event = line.substring(6).trim();
+                } else if (line.startsWith("data:")) {
+                    data.append(line.substring(5).trim());
+                }
+            }
+        } finally {
+            connection.disconnect();
+        }
+    }
+
     public void cancelTraining(String modelId) throws Exception {
         sendPostRequest(trainServiceUrl + "/cancel/" + modelId, "{}");
     }
@@ -94,6 +140,23 @@ public class ApiClient {
         }
     }
     
+    public ImageIcon loadThumbnailFromUrl(String imageUrl, int width) {
+        if (imageUrl == null || imageUrl.isEmpty()) {
+            return null;
+        }
+        
+        try {
+            String filename = extractFilename(imageUrl);
+            String encodedFilename = URLEncoder.encode(filename, "UTF-8");
+            String thumbnailUrl = templateServiceUrl + "/images/" + encodedFilename + "/thumb?w=" + width;
+            return loadImageWithTimeout(thumbnailUrl);
+            
+        } catch (Exception e) {
+            System.err.println(e.getMessage());
+            return null;
+        }
+    }
+    
     private ImageIcon loadImageWithTimeout(String urlString) {
         try {
             URL url = new URL(urlString);
@@ -36,6 +36,7 @@ public class TrainingProgressDialog extends JDialog {
     private JLabel durationLabel;
 
     private Timer statusUpdateTimer;
+    private volatile boolean finished = false;
 
     public TrainingProgressDialog(Dialog parent, ApiClient apiClient, String modelId, AddModelDialog parentDialog) {
         super(parent, "Training Progress", true);
@@ -246,6 +247,28 @@ public class TrainingProgressDialog extends JDialog {
     }
 
     private void startStatusUpdates() {
+        Thread streamThread = new Thread(() -> {
+            try {
+                apiClient.streamTrainingStatus(modelId,
+                        status -> SwingUtilities.invokeLater(() -> handleStatus(status)));
+                if (!finished) {
+                    SwingUtilities.invokeLater(this::startStatusPolling);
+                }
+            } catch (Exception e) {
+                SwingUtilities.invokeLater(() -> {
+                    appendLog("Status stream unavailable, falling back to polling: " + e.getMessage());
+                    startStatusPolling();
+                });
+            }
+        }, "training-status-stream");
+        streamThread.setDaemon(true);
+        streamThread.start();
+    }
+
+    private void startStatusPolling() {
+        if (finished || !isDisplayable() || statusUpdateTimer != null) {
+            return;
+        }
         statusUpdateTimer = new Timer(2000, new ActionListener() {
             @Override
             public void actionPerformed(ActionEvent e) {
@@ -265,24 +288,7 @@ public class TrainingProgressDialog extends JDialog {
             @Override
             protected void done() {
                 try {
-                    TrainingStatus status = get();
-
-                    appendLog("=== STATUS DEBUG ===");
-                    appendLog("Status: " + status.getStatus());
-                    appendLog("Current Epoch: " + status.getCurrent_epoch());
-                    appendLog("Total Epochs: " + status.getTotal_epochs());
-                    appendLog("Final Metrics: " + (status.getFinal_metrics() != null ? status.getFinal_metrics().toString() : "null"));
-                    appendLog("Dataset Info: " + (status.getDataset_info() != null ? status.getDataset_info().toString() : "null"));
-                    appendLog("==================");
-
-                    updateUI(status);
-
-                    String currentStatus = status.getStatus();
-                    if ("completed".equals(currentStatus) || "failed".equals(currentStatus) || "cancelled".equals(currentStatus)) {
-                        statusUpdateTimer.stop();
-                        onTrainingFinished(status);
-                    }
-
+                    handleStatus(get());
                 } catch (Exception e) {
                     appendLog("Error training status: " + e.getMessage());
                     e.printStackTrace();
@@ -292,6 +298,31 @@ public class TrainingProgressDialog extends JDialog {
         worker.execute();
     }
 
+    private void handleStatus(TrainingStatus status) {
+        if (finished) {
+            return;
+        }
+
+        appendLog("=== STATUS DEBUG ===");
+        appendLog("Status: " + status.getStatus());
+        appendLog("Current Epoch: " + status.getCurrent_epoch());
+        appendLog("Total Epochs: " + status.getTotal_epochs());
+        appendLog("Final Metrics: " + (status.getFinal_metrics() != null ? status.getFinal_metrics().toString() : "null"));
+        appendLog("Dataset Info: " + (status.getDataset_info() != null ? status.getDataset_info().toString() : "null"));
+        appendLog("==================");
+
+        updateUI(status);
+
+        String currentStatus = status.getStatus();
+        if ("completed".equals(currentStatus) || "failed".equals(currentStatus) || "cancelled".equals(currentStatus)) {
+            finished = true;
+            if (statusUpdateTimer != null) {
+                statusUpdateTimer.stop();
+            }
+            onTrainingFinished(status);
+        }
+    }
+
     private void updateUI(TrainingStatus status) {
         String statusText = getStatusText(status);
         statusLabel.setText(statusText);
@@ -312,6 +343,10 @@ public class TrainingProgressDialog extends JDialog {
 
     private String getStatusText(TrainingStatus status) {
         switch (status.getStatus()) {
+            case "queued":
+                return String.format("Queued at position %d (estimated start %s)",
+                        status.getQueue_position() != null ? status.getQueue_position() : 0,
+                        status.getEstimated_start_time() != null ? status.getEstimated_start_time() : "unknown");
             case "initializing":
                 return "Initializing training...";
             case "preparing_data":
@@ -525,6 +560,13 @@ public class TrainingProgressDialog extends JDialog {
             if (parentDialog != null) {
                 parentDialog.onTrainingCompleted();
             }
+            if (modelRequest != null) {
+                modelRequest.setTrain_info_id(status.getTrain_info_id());
+                Map<String, Object> metrics = status.getFinal_metrics();
+                if (metrics != null && metrics.get("accuracy") instanceof Number) {
+                    modelRequest.setAccuracy(((Number) metrics.get("accuracy")).doubleValue());
+                }
+            }
             showSaveDiscardButtons();
         } else {
             showCloseButton();
@@ -12,6 +12,7 @@ public class CreateModelRequest {
     private int batch_size;
     private double learning_rate;
     private double accuracy;
+    private Integer train_info_id;
 
     public CreateModelRequest(String modelName, String modelType, String version,
                             String description, List<Integer> templateIds,
@@ -26,4 +27,8 @@ public class CreateModelRequest {
         this.learning_rate = learningRate;
         this.accuracy = accuracy;
     }
-}
\ No newline at end of file
+
+    public void setAccuracy(double accuracy) { this.accuracy = accuracy; }
+
+    public void setTrain_info_id(Integer train_info_id) { this.train_info_id = train_info_id; }
+}
@@ -14,6 +14,9 @@ public class TrainingStatus {
     private Map<String, Object> final_metrics;
     private Map<String, Object> dataset_info;
     private String model_path;
+    private Integer queue_position;
+    private String estimated_start_time;
+    private Integer train_info_id;
 
     // Getters and setters
     public String getStatus() { return status; }
@@ -48,4 +51,13 @@ public class TrainingStatus {
 
     public String getModel_path() { return model_path; }
     public void setModel_path(String model_path) { this.model_path = model_path; }
+
+    public Integer getQueue_position() { return queue_position; }
+    public void setQueue_position(Integer queue_position) { this.queue_position = queue_position; }
+
+    public String getEstimated_start_time() { return estimated_start_time; }
+    public void setEstimated_start_time(String estimated_start_time) { this.estimated_start_time = estimated_start_time; }
+
+    public Integer getTrain_info_id() { return train_info_id; }
+    public void setTrain_info_id(Integer train_info_id) { this.train_info_id = train_info_id; }
 }
\ No newline at end of file
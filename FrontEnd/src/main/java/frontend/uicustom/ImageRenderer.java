@@ -6,9 +6,15 @@ import javax.swing.*;
 import javax.swing.table.TableCellRenderer;
 import java.awt.*;
 import java.awt.image.BufferedImage;
+import java.util.HashMap;
+import java.util.Map;
 
 public class ImageRenderer extends JLabel implements TableCellRenderer {
+    private static final int THUMB_SIZE = 60;
+    
     private ApiClient apiClient;
+    // Bảng được vẽ lại liên tục, giữ icon đã tải theo imageUrl
+    private final Map<String, ImageIcon> iconCache = new HashMap<>();
     
     public ImageRenderer(ApiClient apiClient) {
         this.apiClient = apiClient;
@@ -32,10 +38,17 @@ public class ImageRenderer extends JLabel implements TableCellRenderer {
             String imageUrl = value.toString();
             
             try {
-                ImageIcon icon = loadImageIcon(imageUrl);
+                ImageIcon icon = iconCache.get(imageUrl);
+                if (icon == null) {
+                    icon = loadImageIcon(imageUrl);
+                    if (icon != null) {
+                        Image img = icon.getImage().getScaledInstance(THUMB_SIZE, THUMB_SIZE, Image.SCALE_SMOOTH);
+                        icon = new ImageIcon(img);
+                        iconCache.put(imageUrl, icon);
+                    }
+                }
                 if (icon != null) {
-                    Image img = icon.getImage().getScaledInstance(60, 60, Image.SCALE_SMOOTH);
-                    setIcon(new ImageIcon(img));
+                    setIcon(icon);
                     setText("");
                 } else {
                     setIcon(createPlaceholderIcon());
@@ -52,7 +65,7 @@ public class ImageRenderer extends JLabel implements TableCellRenderer {
     
     private ImageIcon loadImageIcon(String imageUrl) {
         try {
-            ImageIcon icon = apiClient.loadImageFromUrl(imageUrl);
+            ImageIcon icon = apiClient.loadThumbnailFromUrl(imageUrl, THUMB_SIZE);
             if (icon != null) {
                 return icon;
             } else {
@@ -0,0 +1,135 @@
+"""Đo độ trễ khi có nhiều request song song tới một endpoint có truy vấn DB.
+
+So sánh trước/sau khi chuyển DAO sang executor riêng:
+
+    # trước: chạy DAO trực tiếp trong event loop
+    TEMPLATE_DB_ASYNC_EXECUTOR=false python template_service.py
+    python benchmarks/concurrency_benchmark.py --url http://localhost:8003/templates/1
+
+    # sau (mặc định)
+    python template_service.py
+    python benchmarks/concurrency_benchmark.py --url http://localhost:8003/templates/1
+
+Song song với tải chính, script gọi /health liên tục; khi event loop bị chặn
+bởi truy vấn DB thì độ trễ của /health tăng theo.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, errors, elapsed=None):
+    line = (f"{name:<8} n={len(latencies):<5} errors={errors:<4} "
+            f"p50={percentile(latencies, 50):8.1f}ms "
+            f"p95={percentile(latencies, 95):8.1f}ms "
+            f"p99={percentile(latencies, 99):8.1f}ms "
+            f"max={max(latencies, default=0.0):8.1f}ms")
+    if elapsed:
+        line += f" throughput={len(latencies) / elapsed:7.1f} req/s"
+    print(line)
+
+
+def run_load(url, concurrency, total, timeout):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(min(concurrency, total))
+
+    def one_request(index):
+        nonlocal errors
+        if index < concurrency:
+            # Các request đầu tiên xuất phát cùng lúc
+            barrier.wait()
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def probe_health(health_url, stop_event, timeout):
+    latencies = []
+    errors = 0
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        try:
+            requests.get(health_url, timeout=timeout)
+            latencies.append((time.perf_counter() - started) * 1000)
+        except requests.RequestException:
+            errors += 1
+        time.sleep(0.05)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True,
+                        help="Endpoint có truy vấn DB, vd http://localhost:8001/models")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    health_url = f"{parts.scheme}://{parts.netloc}/health"
+
+    stop_event = threading.Event()
+    probe_result = {}
+    probe = threading.Thread(
+        target=lambda: probe_result.update(
+            zip(("latencies", "errors"),
+                probe_health(health_url, stop_event, args.timeout))),
+        daemon=True)
+    probe.start()
+
+    latencies, errors, elapsed = run_load(
+        args.url, args.concurrency, args.requests, args.timeout)
+
+    stop_event.set()
+    probe.join()
+
+    print(f"{args.requests} requests, {args.concurrency} parallel -> {args.url}")
+    summarize("load", latencies, errors, elapsed)
+    summarize("health", probe_result.get("latencies", []),
+              probe_result.get("errors", 0))
+
+    try:
+        stats = requests.get(
+            f"{parts.scheme}://{parts.netloc}/db/pool-stats", timeout=5).json()
+        print(f"pool     {stats}")
+    except (requests.RequestException, ValueError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Đo throughput của POST /models/{id}/predict khi có nhiều request đồng thời.
+
+So sánh micro-batching với inference từng request:
+
+    # từng request một
+    INFERENCE_MAX_BATCH=1 python model_service.py
+    python benchmarks/inference_benchmark.py --model-id 1 --image template-service/images/gianlan1.jpg
+
+    # micro-batching (mặc định)
+    python model_service.py
+    python benchmarks/inference_benchmark.py --model-id 1 --image template-service/images/gianlan1.jpg
+
+Không có torch / ultralytics: chạy service qua benchmarks/simulated_model.py (xem README).
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from concurrency_benchmark import summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--model-id", type=int, required=True)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        image_bytes = f.read()
+    predict_url = f"{args.url}/models/{args.model_id}/predict"
+
+    # Request đầu tiên load model vào cache, không tính vào kết quả
+    requests.post(predict_url, files={"file": ("image.jpg", image_bytes)}, timeout=120)
+
+    latencies = []
+    batch_sizes = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                predict_url, files={"file": ("image.jpg", image_bytes)}, timeout=120)
+            response.raise_for_status()
+            batch_size = response.json().get("batch_size", 1)
+            ok = True
+        except (requests.RequestException, ValueError):
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+                batch_sizes.append(batch_size)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one_request, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.requests} predictions, {args.concurrency} parallel -> {predict_url}")
+    summarize("predict", latencies, errors, elapsed)
+    if batch_sizes:
+        print(f"avg batch size {sum(batch_sizes) / len(batch_sizes):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Chạy model service với connection pool giả lập độ trễ DB cố định.
+
+Dùng để đo ảnh hưởng của việc chạy DAO trong event loop khi không có sẵn
+MySQL: mỗi câu truy vấn ngủ --db-latency-ms rồi trả về --rows dòng Model.
+
+    python benchmarks/simulated_db.py --port 8101 --inline   # trước
+    python benchmarks/simulated_db.py --port 8102            # sau
+    python benchmarks/concurrency_benchmark.py --url http://localhost:8101/models
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "model-service")
+
+
+class SimulatedCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        time.sleep(self.pool.latency)
+
+    def executemany(self, query, params_list):
+        time.sleep(self.pool.latency)
+        self.rowcount = len(params_list)
+
+    def fetchone(self):
+        return self.pool.rows[0] if self.pool.rows else None
+
+    def fetchall(self):
+        return list(self.pool.rows)
+
+    def close(self):
+        pass
+
+
+class SimulatedConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, dictionary=False):
+        return SimulatedCursor(self.pool)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.pool._release()
+
+
+class SimulatedPool:
+    """Thay cho MySQLConnectionPool: giới hạn pool_size connection như pool thật"""
+
+    latency = 0.02
+    rows = []
+
+    def __init__(self, pool_name=None, pool_size=5, **kwargs):
+        from mysql.connector.errors import PoolError
+        self._error = PoolError
+        self._available = pool_size
+        self._lock = threading.Lock()
+
+    def get_connection(self):
+        with self._lock:
+            if self._available <= 0:
+                raise self._error("Failed getting connection; pool exhausted")
+            self._available -= 1
+        return SimulatedConnection(self)
+
+    def _release(self):
+        with self._lock:
+            self._available += 1
+
+
+def model_rows(count):
+    now = datetime.now()
+    return [{"idModel": index, "modelName": f"model-{index}", "modelType": "FraudDetection",
+             "version": "v1.0.0", "description": "", "lastUpdate": now, "idInfo": None}
+            for index in range(1, count + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--inline", action="store_true",
+                        help="Chạy DAO trực tiếp trong event loop (hành vi trước khi có executor)")
+    args = parser.parse_args()
+
+    os.environ["MODEL_DB_ASYNC_EXECUTOR"] = "false" if args.inline else "true"
+    sys.path.insert(0, SERVICE_DIR)
+    os.chdir(SERVICE_DIR)
+
+    SimulatedPool.latency = args.db_latency_ms / 1000
+    SimulatedPool.rows = model_rows(args.rows)
+    from mysql.connector import pooling
+    pooling.MySQLConnectionPool = SimulatedPool
+
+    import uvicorn
+    import model_service
+    uvicorn.run(model_service.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Chạy model service với model YOLO giả lập bằng numpy và DB giả lập.
+
+Dùng để đo micro-batching của /models/{id}/predict khi không có sẵn torch /
+ultralytics: model giả resize ảnh về imgsz, chia patch 16x16 rồi chạy ba lớp
+matmul (khoảng 0.4 GFLOP / ảnh ở 320). Cả batch được xếp thành một ma trận nên
+mỗi lần predict chỉ có một lượt tiền xử lý + BLAS, giống model.predict(list ảnh).
+
+    INFERENCE_MAX_BATCH=1 python benchmarks/simulated_model.py --port 8111   # từng request
+    python benchmarks/simulated_model.py --port 8112                         # micro-batching
+    python benchmarks/inference_benchmark.py --url http://localhost:8111 --model-id 1 \\
+        --image template-service/images/gianlan1.jpg
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from simulated_db import SimulatedPool, model_rows, SERVICE_DIR
+
+
+class SimulatedResult:
+    boxes = None
+
+    def __init__(self, orig_shape):
+        self.orig_shape = orig_shape
+
+
+class SimulatedYOLO:
+    """Thay cho ultralytics.YOLO: predict(list ảnh PIL) trả về một result / ảnh"""
+
+    PATCH = 16
+
+    def __init__(self, seed=0):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        dim = 3 * self.PATCH * self.PATCH
+        self.weights = [rng.standard_normal((dim, 384), dtype=np.float32) * 0.02,
+                        rng.standard_normal((384, 384), dtype=np.float32) * 0.02,
+                        rng.standard_normal((384, 6), dtype=np.float32) * 0.02]
+        # ultralytics.YOLO cũng không thread-safe; báo lỗi nếu bị gọi đồng thời
+        self._busy = threading.Lock()
+
+    def predict(self, images, conf=0.25, imgsz=640, verbose=False):
+        import numpy as np
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("SimulatedYOLO.predict called concurrently")
+        try:
+            patch = self.PATCH
+            batch = np.stack([np.asarray(image.resize((imgsz, imgsz)), dtype=np.float32) / 255.0
+                              for image in images])
+            grid = imgsz // patch
+            patches = batch.reshape(len(images), grid, patch, grid, patch, 3) \
+                .transpose(0, 1, 3, 2, 4, 5).reshape(-1, 3 * patch * patch)
+            features = np.maximum(patches @ self.weights[0], 0)
+            features = np.maximum(features @ self.weights[1], 0)
+            features @ self.weights[2]
+            return [SimulatedResult((image.height, image.width)) for image in images]
+        finally:
+            self._busy.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8111)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SERVICE_DIR)
+    os.chdir(SERVICE_DIR)
+
+    SimulatedPool.latency = 0.001
+    SimulatedPool.rows = model_rows(1)
+    from mysql.connector import pooling
+    pooling.MySQLConnectionPool = SimulatedPool
+
+    weights_path = os.path.join(tempfile.mkdtemp(), "best.pt")
+    open(weights_path, 'wb').close()
+    model = SimulatedYOLO()
+
+    import inference
+    import model_service
+    inference.ModelCache.get = lambda self, path: model
+    model_service.find_model_weights = lambda model_info: weights_path
+
+    import uvicorn
+    uvicorn.run(model_service.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,30 @@ class Config:
     DB_NAME = os.getenv("MODEL_DB_NAME", "model_db")
     DB_USER = os.getenv("MODEL_DB_USER", "root")
     DB_PASSWORD = os.getenv("MODEL_DB_PASSWORD", "")
+    DB_POOL_NAME = "model_pool"
+    DB_POOL_SIZE = int(os.getenv("MODEL_DB_POOL_SIZE", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("MODEL_DB_POOL_TIMEOUT", "5"))
+    DB_EXECUTOR_WORKERS = int(os.getenv("MODEL_DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+    # Tắt để chạy DAO trực tiếp trong event loop (dùng khi đo so sánh)
+    DB_ASYNC_EXECUTOR = os.getenv("MODEL_DB_ASYNC_EXECUTOR", "True").lower() in ('true', '1', 't')
 
     # Services
     TEMPLATE_SERVICE_URL = os.getenv(
         "TEMPLATE_SERVICE_URL", "http://localhost:8003")
 
+    # Phân trang /models
+    MODEL_PAGE_SIZE = int(os.getenv("MODEL_PAGE_SIZE", "50"))
+    MODEL_MAX_PAGE_SIZE = int(os.getenv("MODEL_MAX_PAGE_SIZE", "500"))
+
+    # Weights do train service lưu
+    SHARED_MODEL_DIR = os.getenv("SHARED_MODEL_DIR", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared_model"))
+
+    # Inference: cache model đã load và micro-batching
+    INFERENCE_CACHE_MAX_BYTES = int(os.getenv("INFERENCE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+    INFERENCE_MAX_WAIT = float(os.getenv("INFERENCE_MAX_WAIT", "0.02"))
+    INFERENCE_IMAGE_SIZE = int(os.getenv("INFERENCE_IMAGE_SIZE", "640"))
+
     DEBUG = os.getenv("DEBUG", "True").lower() in ('true', '1', 't')
     BASE_DIR = os.path.dirname(os.path.dirname(__file__))
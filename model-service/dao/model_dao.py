@@ -4,42 +4,66 @@ from dao.train_info_dao import TrainInfoDAO
 
 
 class ModelDAO:
+    # Model và TrainInfo được load cùng nhau bằng một LEFT JOIN
+    SELECT_MODEL = """
+        SELECT m.*, t.idInfo, t.epoch, t.learningRate, t.batchSize, t.mae,
+               t.mse, t.trainDuration, t.accuracy, t.timeTrain
+        FROM Model m
+        LEFT JOIN TrainInfo t ON t.idInfo = m.trainInfoId
+    """
+
     def __init__(self):
         self.db_util = DatabaseUtil()
         self.train_info_dao = TrainInfoDAO()
 
     def get_all(self):
         try:
-            query = "SELECT * FROM Model ORDER BY lastUpdate DESC"
+            query = self.SELECT_MODEL + " ORDER BY m.lastUpdate DESC"
             rows = self.db_util.execute_query(query, fetchall=True)
 
-            models = []
-            for row in rows:
-                model = self._row_to_model(row)
-                if row['trainInfoId']:
-                    model.trainInfo = self.train_info_dao.get_by_id(
-                        row['trainInfoId'])
-                models.append(model)
-
-            return models
+            return [self._row_to_model(row) for row in rows]
         except Exception as e:
             print(f"Error in get_all: {e}")
             raise
 
+    def get_page(self, model_type=None, descending=True, limit=50, cursor=None):
+        """Phân trang keyset trên (lastUpdate, idModel), có lọc theo modelType"""
+        try:
+            conditions = []
+            params = []
+
+            if model_type:
+                conditions.append("m.modelType = %s")
+                params.append(model_type)
+
+            if cursor:
+                last_update, model_id = cursor
+                op = "<" if descending else ">"
+                conditions.append(
+                    f"(m.lastUpdate {op} %s OR (m.lastUpdate = %s AND m.idModel {op} %s))")
+                params.extend([last_update, last_update, model_id])
+
+            direction = "DESC" if descending else "ASC"
+            query = self.SELECT_MODEL
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += f" ORDER BY m.lastUpdate {direction}, m.idModel {direction} LIMIT %s"
+            params.append(limit)
+
+            rows = self.db_util.execute_query(
+                query, tuple(params), fetchall=True)
+
+            return [self._row_to_model(row) for row in rows] if rows else []
+        except Exception as e:
+            print(f"Error in get_page: {e}")
+            raise
+
     def get_by_id(self, model_id):
         try:
-            query = "SELECT * FROM Model WHERE idModel = %s"
+            query = self.SELECT_MODEL + " WHERE m.idModel = %s"
             row = self.db_util.execute_query(query, (model_id,), fetchone=True)
 
-            if not row:
-                return None
-
-            model = self._row_to_model(row)
-            if row['trainInfoId']:
-                model.trainInfo = self.train_info_dao.get_by_id(
-                    row['trainInfoId'])
-
-            return model
+            return self._row_to_model(row) if row else None
         except Exception as e:
             print(f"Error in get_by_id: {e}")
             raise
@@ -47,29 +71,26 @@ class ModelDAO:
     def get_by_name_and_version(self, model_name, version):
         """Kiểm tra xem model với tên và version đã tồn tại chưa"""
         try:
-            query = "SELECT * FROM Model WHERE modelName = %s AND version = %s"
+            query = self.SELECT_MODEL + \
+                " WHERE m.modelName = %s AND m.version = %s"
             row = self.db_util.execute_query(
                 query, (model_name, version), fetchone=True)
 
-            if not row:
-                return None
-
-            model = self._row_to_model(row)
-            if row['trainInfoId']:
-                model.trainInfo = self.train_info_dao.get_by_id(
-                    row['trainInfoId'])
-
-            return model
+            return self._row_to_model(row) if row else None
         except Exception as e:
             print(f"Error in get_by_name_and_version: {e}")
             raise
 
-    def create(self, model):
+    def create(self, model, cursor=None):
         try:
             # Tạo train info trước nếu có
             train_info_id = None
-            if model.trainInfo:
-                train_info_id = self.train_info_dao.create(model.trainInfo)
+            if model.trainInfo and model.trainInfo.idInfo:
+                # TrainInfo đã được train service tạo sẵn (kèm TrainingLost)
+                train_info_id = model.trainInfo.idInfo
+            elif model.trainInfo:
+                train_info_id = self.train_info_dao.create(
+                    model.trainInfo, cursor=cursor)
 
             query = """
             INSERT INTO Model (modelName, modelType, version, description, trainInfoId)
@@ -78,11 +99,25 @@ class ModelDAO:
             params = (model.modelName, model.modelType, model.version,
                       model.description, train_info_id)
 
-            return self.db_util.execute_query(query, params, commit=True)
+            return self.db_util.execute_query(query, params, commit=True, cursor=cursor)
         except Exception as e:
             print(f"Error in create: {e}")
             raise
 
+    def create_with_training_data(self, model, template_ids, description=None):
+        """Tạo TrainInfo, Model và TrainingData trong cùng một transaction"""
+        try:
+            from dao.training_data_dao import TrainingDataDAO
+
+            with self.db_util.transaction() as cursor:
+                model_id = self.create(model, cursor=cursor)
+                TrainingDataDAO().create_many(
+                    model_id, template_ids, description, cursor=cursor)
+            return model_id
+        except Exception as e:
+            print(f"Error in create_with_training_data: {e}")
+            raise
+
     def update(self, model):
         """Update existing model"""
         try:
@@ -115,7 +150,7 @@ class ModelDAO:
             raise
 
     def _row_to_model(self, row):
-        return Model(
+        model = Model(
             idModel=row['idModel'],
             modelName=row['modelName'],
             modelType=row['modelType'],
@@ -123,3 +158,6 @@ class ModelDAO:
             description=row['description'],
             lastUpdate=row['lastUpdate']
         )
+        if row.get('idInfo') is not None:
+            model.trainInfo = self.train_info_dao._row_to_train_info(row)
+        return model
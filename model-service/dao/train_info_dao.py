@@ -16,7 +16,7 @@ class TrainInfoDAO:
             print(f"Error in get_by_id: {e}")
             raise
 
-    def create(self, train_info):
+    def create(self, train_info, cursor=None):
         try:
             query = """
             INSERT INTO TrainInfo (epoch, learningRate, batchSize, mae, mse, trainDuration, accuracy, timeTrain)
@@ -26,7 +26,7 @@ class TrainInfoDAO:
                       train_info.mae, train_info.mse, train_info.trainDuration,
                       train_info.accuracy, train_info.timeTrain)
 
-            return self.db_util.execute_query(query, params, commit=True)
+            return self.db_util.execute_query(query, params, commit=True, cursor=cursor)
         except Exception as e:
             print(f"Error in create: {e}")
             raise
@@ -3,6 +3,9 @@ from models.training_data import TrainingData
 
 
 class TrainingDataDAO:
+    # Số dòng tối đa trong một câu INSERT
+    BATCH_SIZE = 1000
+
     def __init__(self):
         self.db_util = DatabaseUtil()
 
@@ -19,6 +22,30 @@ class TrainingDataDAO:
             print(f"Error in create: {e}")
             raise
 
+    def create_many(self, model_id, template_ids, description=None, cursor=None):
+        """Insert nhiều dòng TrainingData bằng multi-row INSERT"""
+        try:
+            if not template_ids:
+                return 0
+
+            for start in range(0, len(template_ids), self.BATCH_SIZE):
+                chunk = template_ids[start:start + self.BATCH_SIZE]
+                placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+                query = f"""
+                INSERT INTO TrainingData (description, modelId, fraudTemplateId)
+                VALUES {placeholders}
+                """
+                params = []
+                for template_id in chunk:
+                    params.extend([description, model_id, template_id])
+                self.db_util.execute_query(
+                    query, tuple(params), commit=True, cursor=cursor)
+
+            return len(template_ids)
+        except Exception as e:
+            print(f"Error in create_many: {e}")
+            raise
+
     def get_by_model_id(self, model_id):
         try:
             query = "SELECT * FROM TrainingData WHERE modelId = %s"
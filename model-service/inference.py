@@ -0,0 +1,366 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from config import Config
+
+
+def make_model_id(model_name, version):
+    """Id thư mục train của train service (cùng công thức với train_model.make_model_id,
+    tests/test_inference.py kiểm tra hai bản cho cùng kết quả)"""
+    return hashlib.sha1(f"{model_name}_{version}".encode('utf-8')).hexdigest()[:16]
+
+
+def legacy_model_id(model_name, version):
+    """Công thức cũ của train service (train_model.legacy_model_id)"""
+    return str(zlib.crc32(f"{model_name}_{version}".encode('utf-8')) % 10000 + 1000)
+
+
+def _read_status(folder):
+    try:
+        with open(os.path.join(Config.SHARED_MODEL_DIR, folder, 'status.json'),
+                  'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _owned_by(status, model):
+    """Thư mục cũ có thể bị model khác (trùng id) ghi đè, kiểm tra tên và version"""
+    return (status is not None and status.get('model_name') == model.modelName and
+            status.get('version') in (None, model.version))
+
+
+# Cache model -> weights: (đường dẫn, mtime thư mục weights, mtime file)
+_weights_cache = {}
+_weights_cache_lock = threading.Lock()
+
+
+def find_model_weights(model):
+    """Tìm weights của model trong thư mục shared_model.
+
+    Thư mục suy ra từ tên + version theo công thức hiện tại được kiểm tra trước;
+    sau đó mới tới công thức cũ (nếu status.json đúng là của model này) và cuối
+    cùng là quét các thư mục theo train_info_id trong status.json. Artifact đã
+    được promote trong export.json (vd. bản INT8) được dùng thay cho best.pt.
+
+    Kết quả được cache theo model và bị bỏ khi mtime của thư mục weights (file
+    được thêm, đổi tên, export.json được ghi lại bằng os.replace) hoặc của
+    chính file weights thay đổi.
+    """
+    key = (model.modelName, model.version,
+           model.trainInfo.idInfo if model.trainInfo else None)
+    with _weights_cache_lock:
+        cached = _weights_cache.get(key)
+    if cached is not None:
+        path, dir_mtime, file_mtime = cached
+        if _mtime(os.path.dirname(path)) == dir_mtime and _mtime(path) == file_mtime:
+            return path
+
+    path = _locate_weights(model)
+    with _weights_cache_lock:
+        if path is None:
+            _weights_cache.pop(key, None)
+        else:
+            _weights_cache[key] = (path, _mtime(os.path.dirname(path)), _mtime(path))
+    return path
+
+
+def _locate_weights(model):
+    path = _weights_in(make_model_id(model.modelName, model.version))
+    if path is not None:
+        return path
+
+    legacy_id = legacy_model_id(model.modelName, model.version)
+    if _owned_by(_read_status(legacy_id), model):
+        path = _weights_in(legacy_id)
+        if path is not None:
+            return path
+
+    if model.trainInfo and model.trainInfo.idInfo is not None and \
+            os.path.isdir(Config.SHARED_MODEL_DIR):
+        for folder in os.listdir(Config.SHARED_MODEL_DIR):
+            status = _read_status(folder)
+            if status is not None and status.get('train_info_id') == model.trainInfo.idInfo:
+                path = _weights_in(folder)
+                if path is not None:
+                    return path
+    return None
+
+
+def _weights_in(folder):
+    weights_dir = os.path.join(Config.SHARED_MODEL_DIR, folder, 'train', 'weights')
+    serving_path = _serving_artifact(weights_dir)
+    if serving_path is not None:
+        return serving_path
+    for filename in ('best.pt', 'last.pt'):
+        path = os.path.join(weights_dir, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _serving_artifact(weights_dir):
+    try:
+        with open(os.path.join(weights_dir, 'export.json'), 'r', encoding='utf-8') as f:
+            export_info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    serving = export_info.get('serving')
+    if not serving or serving == 'pytorch':
+        return None
+    artifact = export_info.get('artifacts', {}).get(serving) or {}
+    if not artifact.get('path'):
+        return None
+    # Đường dẫn tuyệt đối do train service ghi, tìm lại theo tên file trong weights_dir
+    path = os.path.join(weights_dir, os.path.basename(artifact['path']))
+    return path if os.path.exists(path) else None
+
+
+class ModelCache:
+    """Giữ các model YOLO đã load theo LRU, giới hạn tổng bộ nhớ tham số"""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = Config.INFERENCE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, weights_path):
+        # Weights được train lại thì mtime đổi, model cũ bị thay
+        key = (weights_path, os.path.getmtime(weights_path))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry["model"]
+
+        from ultralytics import YOLO
+        model = YOLO(weights_path, task='detect')
+        size = _model_bytes(model, weights_path)
+
+        with self._lock:
+            self._stats["misses"] += 1
+            for old_key in [k for k in self._entries if k[0] == weights_path]:
+                self._total_bytes -= self._entries.pop(old_key)["size"]
+            self._entries[key] = {"model": model, "size": size}
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted["size"]
+                self._stats["evictions"] += 1
+        return model
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        models=len(self._entries),
+                        size_bytes=self._total_bytes,
+                        max_bytes=self.max_bytes)
+
+
+class MicroBatcher:
+    """Gom các request predict đồng thời của cùng một model thành một batch.
+
+    Batch được chạy khi đủ max_batch ảnh hoặc khi request đầu tiên đã chờ
+    max_wait giây. Thread xử lý tự dừng khi không có request trong idle_timeout.
+    Mỗi file weights chỉ có một batcher: model YOLO trong ModelCache được dùng
+    chung và không thread-safe, nên chỉ thread của batcher gọi model.predict.
+    Request khác image_size được chạy thành các lượt predict riêng trong batch.
+    """
+
+    def __init__(self, weights_path, model_cache, max_batch=None,
+                 max_wait=None, idle_timeout=60, on_exit=None):
+        self.weights_path = weights_path
+        self.model_cache = model_cache
+        self.max_batch = max_batch or Config.INFERENCE_MAX_BATCH
+        self.max_wait = Config.INFERENCE_MAX_WAIT if max_wait is None else max_wait
+        self.idle_timeout = idle_timeout
+        self.on_exit = on_exit
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._loop, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, conf, image_size):
+        future = Future()
+        self._queue.put((image, conf, image_size, future))
+        return future
+
+    def _loop(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                if self.on_exit is not None and self.on_exit(self):
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        groups = OrderedDict()
+        for request in batch:
+            groups.setdefault(request[2], []).append(request)
+
+        try:
+            model = self.model_cache.get(self.weights_path)
+        except Exception as e:
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for image_size, group in groups.items():
+            try:
+                started = time.time()
+                # Chạy với conf thấp nhất trong nhóm rồi lọc lại theo từng request
+                results = model.predict(
+                    [image for image, _, _, _ in group],
+                    conf=min(conf for _, conf, _, _ in group),
+                    imgsz=image_size,
+                    verbose=False)
+                inference_ms = round((time.time() - started) * 1000, 2)
+                inference_stats.record_batch(len(group), inference_ms)
+
+                for (_, conf, _, future), result in zip(group, results):
+                    future.set_result({
+                        "boxes": _result_boxes(result, conf),
+                        "image_width": int(result.orig_shape[1]),
+                        "image_height": int(result.orig_shape[0]),
+                        "inference_ms": inference_ms,
+                        "batch_size": len(group)
+                    })
+            except Exception as e:
+                for _, _, _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+class InferenceStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "images": 0, "inference_ms_total": 0.0}
+
+    def record_batch(self, size, inference_ms):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["images"] += size
+            self._stats["inference_ms_total"] += inference_ms
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = (round(stats["images"] / stats["batches"], 2)
+                                   if stats["batches"] else 0.0)
+        stats["avg_ms_per_image"] = (round(stats["inference_ms_total"] / stats["images"], 2)
+                                     if stats["images"] else 0.0)
+        return stats
+
+
+class Predictor:
+    def __init__(self):
+        self.model_cache = ModelCache()
+        self._lock = threading.Lock()
+        self._batchers = {}
+
+    def predict(self, weights_path, image, conf=0.25, image_size=None):
+        """Đưa ảnh vào micro-batch của model, trả về Future chứa kết quả"""
+        with self._lock:
+            batcher = self._batchers.get(weights_path)
+            if batcher is None:
+                batcher = MicroBatcher(weights_path, self.model_cache,
+                                       on_exit=self._remove_batcher)
+                self._batchers[weights_path] = batcher
+            return batcher.submit(image, conf, image_size or Config.INFERENCE_IMAGE_SIZE)
+
+    def stats(self):
+        with self._lock:
+            active = len(self._batchers)
+        return dict(inference_stats.stats(),
+                    active_batchers=active,
+                    model_cache=self.model_cache.stats())
+
+    def _remove_batcher(self, batcher):
+        # Chỉ dừng khi không còn request nào vừa được đưa vào
+        with self._lock:
+            if not batcher._queue.empty():
+                return False
+            if self._batchers.get(batcher.weights_path) is batcher:
+                del self._batchers[batcher.weights_path]
+            return True
+
+
+def _result_boxes(result, conf):
+    """Box theo định dạng của BoundingBox: tâm và kích thước chuẩn hóa 0-1, kèm pixel"""
+    boxes = []
+    if result.boxes is None:
+        return boxes
+    for xywhn, xywh, score, cls in zip(result.boxes.xywhn.tolist(),
+                                       result.boxes.xywh.tolist(),
+                                       result.boxes.conf.tolist(),
+                                       result.boxes.cls.tolist()):
+        if score < conf:
+            continue
+        boxes.append({
+            "xCenter": round(xywhn[0], 6),
+            "yCenter": round(xywhn[1], 6),
+            "width": round(xywhn[2], 6),
+            "height": round(xywhn[3], 6),
+            "xPixel": int(round(xywh[0])),
+            "yPixel": int(round(xywh[1])),
+            "widthPixel": int(round(xywh[2])),
+            "heightPixel": int(round(xywh[3])),
+            "confidence": round(score, 4),
+            "classId": int(cls)
+        })
+    return boxes
+
+
+def _model_bytes(model, weights_path):
+    try:
+        return sum(tensor.numel() * tensor.element_size()
+                   for tensor in list(model.model.parameters()) + list(model.model.buffers()))
+    except Exception:
+        # Model ONNX/OpenVINO: ước lượng theo kích thước file
+        try:
+            return os.path.getsize(weights_path)
+        except OSError:
+            return 0
+
+
+inference_stats = InferenceStats()
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = Predictor()
+        return _predictor
@@ -1,8 +1,11 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
+import asyncio
+import io
 import requests
 from datetime import datetime
 
@@ -10,8 +13,10 @@ from dao.model_dao import ModelDAO
 from dao.training_data_dao import TrainingDataDAO
 from models.model import Model
 from models.train_info import TrainInfo
-from models.training_data import TrainingData
 from config import Config
+from utils.db_util import DatabaseUtil
+from utils.db_executor import run_db
+from inference import get_predictor, find_model_weights
 
 app = FastAPI(title="Model Service", version="1.0.0")
 
@@ -37,6 +42,7 @@ class ModelCreateRequest(BaseModel):
     batch_size: int = 16
     learning_rate: float = 0.001
     accuracy: float = 0.85
+    train_info_id: Optional[int] = None
 
 
 class ModelResponse(BaseModel):
@@ -64,18 +70,59 @@ async def root():
 
 
 @app.get("/models", response_model=List[ModelResponse])
-async def get_all_models():
+async def get_all_models(response: Response, model_type: Optional[str] = None,
+                         sort: str = "desc", limit: Optional[int] = None,
+                         cursor: Optional[str] = None):
     try:
-        models = model_dao.get_all()
+        if sort not in ("asc", "desc"):
+            raise HTTPException(
+                status_code=400, detail="sort must be 'asc' or 'desc'")
+        if limit is not None and limit <= 0:
+            raise HTTPException(
+                status_code=400, detail="limit must be greater than 0")
+
+        if model_type is None and limit is None and cursor is None and sort == "desc":
+            models = await run_db(model_dao.get_all)
+            return [ModelResponse(**model.to_dict()) for model in models]
+
+        page_size = min(limit or Config.MODEL_PAGE_SIZE,
+                        Config.MODEL_MAX_PAGE_SIZE)
+
+        models = await run_db(
+            model_dao.get_page,
+            model_type=model_type,
+            descending=(sort == "desc"),
+            limit=page_size,
+            cursor=parse_model_cursor(cursor) if cursor else None
+        )
+        if len(models) == page_size:
+            response.headers["X-Next-Cursor"] = make_model_cursor(models[-1])
         return [ModelResponse(**model.to_dict()) for model in models]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def make_model_cursor(model):
+    last_update = model.lastUpdate.strftime('%Y-%m-%d %H:%M:%S') if isinstance(
+        model.lastUpdate, datetime) else str(model.lastUpdate)
+    return f"{last_update}_{model.idModel}"
+
+
+def parse_model_cursor(cursor):
+    try:
+        last_update, model_id = cursor.rsplit("_", 1)
+        return datetime.strptime(last_update, '%Y-%m-%d %H:%M:%S'), int(model_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.post("/models")
 async def create_model(model_request: ModelCreateRequest):
     try:
-        existing_model = model_dao.get_by_name_and_version(
+        existing_model = await run_db(
+            model_dao.get_by_name_and_version,
             model_request.model_name,
             model_request.version
         )
@@ -88,6 +135,7 @@ async def create_model(model_request: ModelCreateRequest):
 
         # Tạo train info
         train_info = TrainInfo(
+            idInfo=model_request.train_info_id,
             epoch=model_request.epochs,
             learningRate=model_request.learning_rate,
             batchSize=model_request.batch_size,
@@ -104,16 +152,13 @@ async def create_model(model_request: ModelCreateRequest):
             trainInfo=train_info
         )
 
-        model_id = model_dao.create(model)
-
-        # Tạo training data cho các templates
-        for template_id in model_request.template_ids:
-            training_data = TrainingData(
-                modelId=model_id,
-                fraudTemplateId=template_id,
-                description=f"Training data for {model_request.model_name}"
-            )
-            training_data_dao.create(training_data)
+        # Tạo model và training data cho các templates trong một transaction
+        model_id = await run_db(
+            model_dao.create_with_training_data,
+            model,
+            model_request.template_ids,
+            description=f"Training data for {model_request.model_name}"
+        )
 
         return {"success": True, "model_id": model_id, "message": "Model created successfully"}
 
@@ -134,7 +179,8 @@ async def create_model(model_request: ModelCreateRequest):
 @app.get("/check-model-exists/{model_name}/{version}")
 async def check_model_exists(model_name: str, version: str):
     try:
-        existing_model = model_dao.get_by_name_and_version(model_name, version)
+        existing_model = await run_db(
+            model_dao.get_by_name_and_version, model_name, version)
         return {
             "exists": existing_model is not None,
             "model_id": existing_model.idModel if existing_model else None
@@ -143,11 +189,57 @@ async def check_model_exists(model_name: str, version: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def decode_image(data):
+    from PIL import Image
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+@app.post("/models/{model_id}/predict")
+async def predict(model_id: int, file: UploadFile = File(...), conf: float = 0.25,
+                  image_size: Optional[int] = None):
+    """Chạy model đã train trên một ảnh, box trả về cùng định dạng với BoundingBox"""
+    try:
+        model = await run_db(model_dao.get_by_id, model_id)
+        if not model:
+            raise HTTPException(status_code=404, detail="Model not found")
+
+        # Tra thư mục và giải mã ảnh đều là I/O / CPU chặn, không chạy trên event loop
+        weights_path = await run_in_threadpool(find_model_weights, model)
+        if weights_path is None:
+            raise HTTPException(
+                status_code=404, detail="No trained weights found for this model")
+
+        data = await file.read()
+        try:
+            image = await run_in_threadpool(decode_image, data)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+
+        future = get_predictor().predict(weights_path, image, conf, image_size)
+        result = await asyncio.wrap_future(future)
+        return dict(result, model_id=model_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/inference/stats")
+async def get_inference_stats():
+    return get_predictor().stats()
+
+
 @app.get("/model-types")
 async def get_model_types():
     return {"model_types": ["HumanDetection", "FraudDetection"]}
 
 
+@app.get("/db/pool-stats")
+async def get_db_pool_stats():
+    """Số liệu connection pool: thời gian chờ checkout, số connection đang dùng, số lần pool cạn"""
+    return DatabaseUtil().pool_stats()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "model-service"}
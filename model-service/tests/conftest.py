@@ -0,0 +1,81 @@
+import os
+import pytest
+from mysql.connector import pooling
+from utils.db_util import DatabaseUtil
+
+
+class FakeDatabase:
+    """Thay cho MySQL: mọi câu SELECT trả về rows, các câu lệnh được ghi lại trong queries"""
+
+    def __init__(self):
+        self.rows = []
+        self.queries = []
+
+    def execute(self, query, params):
+        self.queries.append((" ".join(query.split()), tuple(params or ())))
+        return [dict(row) for row in self.rows]
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.rows = self.database.execute(query, params)
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, database):
+        self.database = database
+
+    def get_connection(self):
+        return FakeConnection(self.database)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """DatabaseUtil dùng FakeDatabase thay cho connection pool MySQL"""
+    database = FakeDatabase()
+    monkeypatch.setattr(pooling, "MySQLConnectionPool",
+                        lambda **kwargs: FakePool(database))
+    DatabaseUtil()
+    monkeypatch.setattr(DatabaseUtil, "_pool", FakePool(database))
+    return database
+
+
+@pytest.fixture
+def client(fake_db, monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import model_service
+    return TestClient(model_service.app)
@@ -0,0 +1,137 @@
+import os
+import json
+import threading
+from types import SimpleNamespace
+import pytest
+import inference
+from config import Config
+from inference import (MicroBatcher, Predictor, find_model_weights, make_model_id,
+                       legacy_model_id)
+
+# Cùng bảng với train-service/tests/test_model_id.py: hai service phải suy ra cùng
+# thư mục shared_model cho cùng (tên, version), kể cả công thức crc32 cũ
+MODEL_ID_CASES = [
+    ("FraudDetector", "v1.0.0", "deb253d5e37846e9", "4485"),
+    ("model-9790", "v2", "ced180bc5c14378a", "5621"),
+    ("Phát hiện gian lận", "v1.0.0", "ecde6c00e6b8dc05", "9918"),
+]
+
+
+@pytest.mark.parametrize("name, version, model_id, legacy_id", MODEL_ID_CASES)
+def test_model_id_matches_train_service(name, version, model_id, legacy_id):
+    assert make_model_id(name, version) == model_id
+    assert legacy_model_id(name, version) == legacy_id
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SHARED_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(inference, "_weights_cache", {})
+    return tmp_path
+
+
+def make_model(name="m", version="v1", train_info_id=None):
+    train_info = SimpleNamespace(idInfo=train_info_id) if train_info_id is not None else None
+    return SimpleNamespace(modelName=name, version=version, trainInfo=train_info)
+
+
+def weights_dir(shared_dir, folder):
+    path = shared_dir / folder / "train" / "weights"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def test_direct_folder_skips_scan(shared_dir, monkeypatch):
+    model = make_model(train_info_id=7)
+    directory = weights_dir(shared_dir, make_model_id("m", "v1"))
+    (directory / "best.pt").write_bytes(b"w")
+
+    def no_scan(path):
+        raise AssertionError("shared_model should not be scanned")
+
+    monkeypatch.setattr(inference.os, "listdir", no_scan)
+    assert find_model_weights(model) == str(directory / "best.pt")
+
+
+def test_cached_until_weights_dir_changes(shared_dir, monkeypatch):
+    model = make_model()
+    directory = weights_dir(shared_dir, make_model_id("m", "v1"))
+    (directory / "last.pt").write_bytes(b"w")
+    assert find_model_weights(model) == str(directory / "last.pt")
+
+    calls = []
+    locate = inference._locate_weights
+    monkeypatch.setattr(inference, "_locate_weights",
+                        lambda model: calls.append(model) or locate(model))
+    assert find_model_weights(model) == str(directory / "last.pt")
+    assert calls == []
+
+    # best.pt mới và artifact được promote làm mtime thư mục đổi
+    (directory / "best.pt").write_bytes(b"w")
+    os.utime(directory, ns=(1, 1))
+    assert find_model_weights(model) == str(directory / "best.pt")
+
+    (directory / "best.onnx").write_bytes(b"onnx")
+    (directory / "export.json").write_text(json.dumps(
+        {"serving": "onnx", "artifacts": {"onnx": {"path": "/elsewhere/best.onnx"}}}))
+    os.utime(directory, ns=(2, 2))
+    assert find_model_weights(model) == str(directory / "best.onnx")
+    assert len(calls) == 2
+
+
+def test_scan_by_train_info_id(shared_dir):
+    directory = weights_dir(shared_dir, "1234")
+    (directory / "best.pt").write_bytes(b"w")
+    (shared_dir / "1234" / "status.json").write_text(json.dumps({"train_info_id": 7}))
+    assert find_model_weights(make_model(train_info_id=7)) == str(directory / "best.pt")
+    assert find_model_weights(make_model(train_info_id=8)) is None
+
+
+class FakeResult:
+    orig_shape = (10, 20)
+    boxes = None
+
+
+class FakeYOLO:
+    """Model giả: báo lỗi nếu bị gọi predict từ hai thread cùng lúc"""
+
+    def __init__(self):
+        self.calls = []
+        self._busy = threading.Lock()
+
+    def predict(self, images, conf, imgsz, verbose):
+        assert self._busy.acquire(blocking=False), "predict called concurrently"
+        try:
+            self.calls.append((len(images), imgsz))
+            return [FakeResult() for _ in images]
+        finally:
+            self._busy.release()
+
+
+class FakeModelCache:
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, weights_path):
+        return self.model
+
+
+def test_batch_is_grouped_by_image_size():
+    model = FakeYOLO()
+    batcher = MicroBatcher("w.pt", FakeModelCache(model), max_batch=8, max_wait=0.2)
+    futures = [batcher.submit("image", 0.25, size) for size in (320, 640, 320)]
+    results = [future.result(5) for future in futures]
+
+    assert sorted(model.calls) == [(1, 640), (2, 320)]
+    assert [result["batch_size"] for result in results] == [2, 1, 2]
+
+
+def test_one_batcher_per_weights():
+    predictor = Predictor()
+    model = FakeYOLO()
+    predictor.model_cache = FakeModelCache(model)
+    futures = [predictor.predict("w.pt", "image", 0.25, size) for size in (320, 640, None)]
+    for future in futures:
+        future.result(5)
+    assert list(predictor._batchers) == ["w.pt"]
+    assert sum(size for size, _ in model.calls) == 3
@@ -0,0 +1,67 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from models.model import Model
+
+
+def model_rows(count, last_update=datetime(2024, 5, 1, 12, 30, 0)):
+    return [{"idModel": index, "modelName": f"model-{index}", "modelType": "FraudDetection",
+             "version": "v1.0.0", "description": "", "lastUpdate": last_update,
+             "idInfo": None}
+            for index in range(count, 0, -1)]
+
+
+@pytest.fixture
+def service(fake_db):
+    import model_service
+    return model_service
+
+
+def test_cursor_round_trip(service):
+    model = Model(idModel=42, lastUpdate=datetime(2024, 5, 1, 12, 30, 5))
+    cursor = service.make_model_cursor(model)
+    assert cursor == "2024-05-01 12:30:05_42"
+    assert service.parse_model_cursor(cursor) == (datetime(2024, 5, 1, 12, 30, 5), 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "42", "2024-05-01_x", "not-a-date_42",
+                                    "2024-05-01 12:30:05"])
+def test_invalid_cursor_is_rejected(service, cursor):
+    with pytest.raises(HTTPException) as error:
+        service.parse_model_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_limit_must_be_positive(client, fake_db):
+    for params in ({"limit": 0}, {"limit": -1}, {"limit": 0, "model_type": "FraudDetection"}):
+        response = client.get("/models", params=params)
+        assert response.status_code == 400, params
+    assert fake_db.queries == []
+
+
+def test_invalid_cursor_returns_400(client, fake_db):
+    response = client.get("/models", params={"cursor": "garbage"})
+    assert response.status_code == 400
+    assert fake_db.queries == []
+
+
+def test_page_passes_cursor_and_sets_next_cursor(client, fake_db):
+    fake_db.rows = model_rows(2)
+
+    response = client.get("/models", params={"limit": 2,
+                                             "cursor": "2024-05-01 12:30:00_9"})
+    assert response.status_code == 200
+    assert [model["idModel"] for model in response.json()] == [2, 1]
+    assert response.headers["X-Next-Cursor"] == "2024-05-01 12:30:00_1"
+
+    query, params = fake_db.queries[-1]
+    assert "m.idModel <" in query and query.endswith("LIMIT %s")
+    assert params == (datetime(2024, 5, 1, 12, 30), datetime(2024, 5, 1, 12, 30), 9, 2)
+
+
+def test_short_page_has_no_next_cursor(client, fake_db):
+    fake_db.rows = model_rows(1)
+    response = client.get("/models", params={"limit": 2, "sort": "asc"})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert "ASC" in fake_db.queries[-1][0]
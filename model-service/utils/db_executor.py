@@ -0,0 +1,29 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+_db_executor = None
+_db_executor_lock = threading.Lock()
+
+
+def get_db_executor():
+    """Executor riêng cho truy vấn DB, số worker bằng kích thước pool để
+    request dư xếp hàng ở đây thay vì giữ thread chờ connection"""
+    global _db_executor
+    with _db_executor_lock:
+        if _db_executor is None:
+            _db_executor = ThreadPoolExecutor(
+                max_workers=Config.DB_EXECUTOR_WORKERS,
+                thread_name_prefix="db")
+        return _db_executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Chạy một hàm DAO (blocking) mà không chặn event loop của FastAPI"""
+    if not Config.DB_ASYNC_EXECUTOR:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), functools.partial(func, *args, **kwargs))
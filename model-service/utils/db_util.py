@@ -1,8 +1,16 @@
 import mysql.connector
 from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from config import Config
 
+# File này giống hệt nhau ở template-service, model-service và train-service;
+# phần khác nhau (tên pool, thông tin kết nối) nằm trong Config của từng service.
+# Sửa một bản thì chép nguyên file sang hai bản còn lại.
+
 
 class DatabaseUtil:
     _instance = None
@@ -11,30 +19,123 @@ class DatabaseUtil:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._local = threading.local()
+            cls._instance._stats_lock = threading.Lock()
+            # Mỗi slot ứng với một connection của pool: chờ slot thay vì thử lại liên tục
+            cls._instance._slots = threading.BoundedSemaphore(Config.DB_POOL_SIZE)
+            cls._instance._stats = {
+                "checkouts": 0,
+                "in_use": 0,
+                "max_in_use": 0,
+                "exhaustion_events": 0,
+                "timeouts": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0
+            }
             try:
                 cls._pool = pooling.MySQLConnectionPool(
-                    pool_name="model_pool",
-                    pool_size=5,
+                    pool_name=Config.DB_POOL_NAME,
+                    pool_size=Config.DB_POOL_SIZE,
                     host=Config.DB_HOST,
                     port=Config.DB_PORT,
                     user=Config.DB_USER,
                     password=Config.DB_PASSWORD,
                     database=Config.DB_NAME
                 )
-                print("Model DB connection pool created")
+                print(f"DB connection pool {Config.DB_POOL_NAME} created (size {Config.DB_POOL_SIZE})")
             except Exception as e:
-                print(f"Error creating model DB pool: {e}")
+                print(f"Error creating DB pool {Config.DB_POOL_NAME}: {e}")
                 raise
         return cls._instance
 
     def get_connection(self):
+        """Lấy connection từ pool, chờ tối đa DB_POOL_TIMEOUT giây nếu pool đang hết"""
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            self._record("exhaustion_events")
+            if not self._slots.acquire(timeout=Config.DB_POOL_TIMEOUT):
+                self._record("timeouts")
+                error = PoolError(
+                    f"No connection available in {Config.DB_POOL_NAME} "
+                    f"after {Config.DB_POOL_TIMEOUT}s")
+                print(f"Error getting connection: {error}")
+                raise error
+
         try:
-            return self._pool.get_connection()
+            conn = self._pool.get_connection()
         except Exception as e:
+            self._slots.release()
             print(f"Error getting connection: {e}")
             raise
 
-    def execute_query(self, query, params=None, fetchone=False, fetchall=False, commit=False):
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(
+                self._stats["max_in_use"], self._stats["in_use"])
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+        return conn
+
+    def release_connection(self, conn):
+        try:
+            conn.close()
+        finally:
+            self._slots.release()
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+
+    def pool_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pool_size"] = Config.DB_POOL_SIZE
+        stats["wait_ms_avg"] = (stats["wait_ms_total"] / stats["checkouts"]
+                                if stats["checkouts"] else 0.0)
+        return stats
+
+    def _record(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    @contextmanager
+    def transaction(self):
+        """Unit of work: mọi execute_query trong khối with (cùng thread) dùng chung
+        một connection và được commit một lần khi kết thúc. Lồng nhau thì dùng
+        lại transaction bên ngoài."""
+        active = getattr(self._local, 'cursor', None)
+        if active is not None:
+            yield active
+            return
+
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        self._local.cursor = cursor
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            print(f"Transaction rolled back: {e}")
+            conn.rollback()
+            raise
+        finally:
+            self._local.cursor = None
+            cursor.close()
+            self.release_connection(conn)
+
+    def execute_query(self, query, params=None, fetchone=False, fetchall=False, commit=False,
+                      cursor=None):
+        if cursor is None:
+            cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None:
+            # Chạy trong transaction của caller: không commit, không trả connection
+            cursor.execute(query, params)
+            if fetchone:
+                return cursor.fetchone()
+            elif fetchall:
+                return cursor.fetchall()
+            return cursor.lastrowid
+
         conn = None
         cursor = None
         try:
@@ -59,4 +160,31 @@ class DatabaseUtil:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self.release_connection(conn)
+
+    def execute_many(self, query, params_list):
+        """Chạy cùng một câu lệnh cho nhiều bộ tham số trong một transaction"""
+        active = getattr(self._local, 'cursor', None)
+        if active is not None:
+            active.executemany(query, params_list)
+            return active.rowcount
+
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany(query, params_list)
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            print(f"Database error: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                self.release_connection(conn)
+
@@ -30,7 +30,9 @@ CREATE TABLE Model (
     description TEXT,
     lastUpdate TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     trainInfoId INT NULL,  -- Foreign key tới TrainInfo
-    CONSTRAINT UNIQUE_MODEL_NAME_VERSION UNIQUE (modelName, version)
+    CONSTRAINT UNIQUE_MODEL_NAME_VERSION UNIQUE (modelName, version),
+    INDEX IDX_MODEL_LAST_UPDATE (lastUpdate, idModel),
+    INDEX IDX_MODEL_TYPE_LAST_UPDATE (modelType, lastUpdate, idModel)
 );
 
 -- Bảng TrainInfo
@@ -10,6 +10,40 @@ class Config:
     DB_NAME = os.getenv("TEMPLATE_DB_NAME", "template_db")
     DB_USER = os.getenv("TEMPLATE_DB_USER", "root")
     DB_PASSWORD = os.getenv("TEMPLATE_DB_PASSWORD", "")
+    DB_POOL_NAME = "template_pool"
+    DB_POOL_SIZE = int(os.getenv("TEMPLATE_DB_POOL_SIZE", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("TEMPLATE_DB_POOL_TIMEOUT", "5"))
+    DB_EXECUTOR_WORKERS = int(os.getenv("TEMPLATE_DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+    # Tắt để chạy DAO trực tiếp trong event loop (dùng khi đo so sánh)
+    DB_ASYNC_EXECUTOR = os.getenv("TEMPLATE_DB_ASYNC_EXECUTOR", "True").lower() in ('true', '1', 't')
+
+    # Phân trang /templates
+    TEMPLATE_PAGE_SIZE = int(os.getenv("TEMPLATE_PAGE_SIZE", "100"))
+    TEMPLATE_MAX_PAGE_SIZE = int(os.getenv("TEMPLATE_MAX_PAGE_SIZE", "1000"))
+    TEMPLATE_MAX_BATCH_SIZE = int(os.getenv("TEMPLATE_MAX_BATCH_SIZE", "5000"))
+
+    # Cache template đã hydrate trong process
+    TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "2000"))
+    TEMPLATE_CACHE_TTL = int(os.getenv("TEMPLATE_CACHE_TTL", "300"))
+
+    # Ảnh thu nhỏ cho bảng template
+    THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnails")
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    THUMBNAIL_MAX_WIDTH = int(os.getenv("THUMBNAIL_MAX_WIDTH", "1024"))
+    THUMBNAIL_WIDTH_STEP = int(os.getenv("THUMBNAIL_WIDTH_STEP", "32"))
+    THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+    THUMBNAIL_MAX_AGE = int(os.getenv("THUMBNAIL_MAX_AGE", str(30 * 24 * 3600)))
+
+    # Ảnh letterbox đúng kích thước train cho train service
+    TRAINING_IMAGE_CACHE_DIR = os.getenv("TRAINING_IMAGE_CACHE_DIR", "training_images")
+    TRAINING_IMAGE_CACHE_MAX_BYTES = int(os.getenv("TRAINING_IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    TRAINING_IMAGE_MAX_SIZE = int(os.getenv("TRAINING_IMAGE_MAX_SIZE", "1280"))
+    TRAINING_IMAGE_SIZE_STEP = int(os.getenv("TRAINING_IMAGE_SIZE_STEP", "32"))
+    TRAINING_IMAGE_QUALITY = int(os.getenv("TRAINING_IMAGE_QUALITY", "90"))
+    # Màu nền letterbox "R,G,B" (mặc định của ultralytics), phải trùng với
+    # LETTERBOX_COLOR của train service dùng cho ảnh calibration
+    LETTERBOX_COLOR = tuple(int(value) for value in
+                            os.getenv("LETTERBOX_COLOR", "114,114,114").split(","))
 
     DEBUG = os.getenv("DEBUG", "True").lower() in ('true', '1', 't')
     BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -16,23 +16,7 @@ class BoundingBoxDAO:
             if not rows:
                 return []
 
-            boxes = []
-            for row in rows:
-                box = BoundingBox(
-                    idBox=row['idBox'],
-                    xCenter=row['xCenter'],
-                    yCenter=row['yCenter'],
-                    width=row['width'],
-                    height=row['height'],
-                    xPixel=row['xPixel'],
-                    yPixel=row['yPixel'],
-                    widthPixel=row['widthPixel'],
-                    heightPixel=row['heightPixel'],
-                    fraudLabelId=row['fraudLabelId'],
-                    fraudTemplateId=row['fraudTemplateId']
-                )
-                boxes.append(box)
-            return boxes
+            return [self._row_to_box(row) for row in rows]
         except Exception as e:
             logging.error(f"Error in BoundingBoxDAO.get_all: {str(e)}")
             raise
@@ -96,6 +80,30 @@ class BoundingBoxDAO:
                 f"Error in BoundingBoxDAO.get_by_template_id: {str(e)}")
             raise
 
+    def get_by_template_ids(self, template_ids):
+        """Lấy bounding box của nhiều template trong một truy vấn"""
+        try:
+            if not template_ids:
+                return []
+
+            placeholders = ", ".join(["%s"] * len(template_ids))
+            query = f"""
+                SELECT * FROM BoundingBox
+                WHERE fraudTemplateId IN ({placeholders})
+                ORDER BY idBox
+            """
+            rows = self.db_util.execute_query(
+                query, tuple(template_ids), fetchall=True)
+
+            if not rows:
+                return []
+
+            return [self._row_to_box(row) for row in rows]
+        except Exception as e:
+            logging.error(
+                f"Error in BoundingBoxDAO.get_by_template_ids: {str(e)}")
+            raise
+
     def create(self, box):
         try:
             query = """
@@ -189,3 +197,18 @@ class BoundingBoxDAO:
             logging.error(
                 f"Error in BoundingBoxDAO.delete_by_template_id: {str(e)}")
             raise
+
+    def _row_to_box(self, row):
+        return BoundingBox(
+            idBox=row['idBox'],
+            xCenter=row['xCenter'],
+            yCenter=row['yCenter'],
+            width=row['width'],
+            height=row['height'],
+            xPixel=row['xPixel'],
+            yPixel=row['yPixel'],
+            widthPixel=row['widthPixel'],
+            heightPixel=row['heightPixel'],
+            fraudLabelId=row['fraudLabelId'],
+            fraudTemplateId=row['fraudTemplateId']
+        )
@@ -5,6 +5,9 @@ from utils.enums import TypeLabel
 
 
 class FraudLabelDAO:
+    # Số id tối đa trong một truy vấn IN, giống FraudTemplateDAO.BATCH_SIZE
+    BATCH_SIZE = 500
+
     def __init__(self):
         self.db_util = DatabaseUtil()
 
@@ -48,6 +51,29 @@ class FraudLabelDAO:
             logging.error(f"Error in FraudLabelDAO.get_by_id: {str(e)}")
             raise
 
+    def get_by_ids(self, label_ids):
+        """Lấy nhiều label bằng các truy vấn IN theo lô, trả về dict idLabel -> FraudLabel"""
+        try:
+            label_ids = list(dict.fromkeys(label_ids))
+            labels = {}
+            for start in range(0, len(label_ids), self.BATCH_SIZE):
+                chunk = label_ids[start:start + self.BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                query = f"SELECT * FROM FraudLabel WHERE idLabel IN ({placeholders})"
+                rows = self.db_util.execute_query(
+                    query, tuple(chunk), fetchall=True)
+
+                for row in rows or []:
+                    labels[row['idLabel']] = FraudLabel(
+                        idLabel=row['idLabel'],
+                        description=row['description'],
+                        typeLabel=row['typeLabel']
+                    )
+            return labels
+        except Exception as e:
+            logging.error(f"Error in FraudLabelDAO.get_by_ids: {str(e)}")
+            raise
+
     def get_by_template_id(self, template_id):
         try:
             query = "SELECT * FROM BoundingBox WHERE fraudTemplateId = %s"
@@ -67,3 +93,35 @@ class FraudLabelDAO:
             logging.error(
                 f"Error in FraudLabelDAO.get_by_template_id: {str(e)}")
             raise
+
+    def create(self, label):
+        try:
+            query = """
+                INSERT INTO FraudLabel (description, typeLabel, fraudTemplateId)
+                VALUES (%s, %s, %s)
+            """
+
+            type_label = label.typeLabel
+            if isinstance(type_label, TypeLabel):
+                type_label = type_label.value
+
+            params = (
+                label.description,
+                type_label,
+                label.fraudTemplateId
+            )
+
+            return self.db_util.execute_query(query, params, commit=True)
+        except Exception as e:
+            logging.error(f"Error in FraudLabelDAO.create: {str(e)}")
+            raise
+
+    def delete_by_template_id(self, template_id):
+        try:
+            query = "DELETE FROM FraudLabel WHERE fraudTemplateId = %s"
+            self.db_util.execute_query(query, (template_id,), commit=True)
+            return True
+        except Exception as e:
+            logging.error(
+                f"Error in FraudLabelDAO.delete_by_template_id: {str(e)}")
+            raise
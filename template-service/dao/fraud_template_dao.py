@@ -2,6 +2,7 @@ import logging
 from dao.bounding_box_dao import BoundingBoxDAO
 from dao.fraud_label_dao import FraudLabelDAO
 from utils.db_util import DatabaseUtil
+from template_cache import template_cache
 from models.fraud_template import FraudTemplate
 from models.fraud_label import FraudLabel
 from models.bounding_box import BoundingBox
@@ -9,6 +10,9 @@ from datetime import datetime
 
 
 class FraudTemplateDAO:
+    # Số id tối đa trong một mệnh đề IN
+    BATCH_SIZE = 500
+
     def __init__(self):
         self.db_util = DatabaseUtil()
 
@@ -20,11 +24,13 @@ class FraudTemplateDAO:
 
             if not template_rows:
                 return []
-            templates = []
-            for template_row in template_rows:
-                template_id = template_row['idTemplate']
-                template = self.get_by_id(template_id)
-                templates.append(template)
+
+            # Load toàn bộ box và label một lần rồi ghép trong bộ nhớ,
+            # số truy vấn không phụ thuộc vào số lượng template
+            boxes = BoundingBoxDAO().get_all()
+            labels = FraudLabelDAO().get_by_ids(
+                list({box.fraudLabelId for box in boxes}))
+            templates = self._build_templates(template_rows, boxes, labels)
 
             logging.info(
                 f"Retrieved {len(templates)} templates with labels and bounding boxes")
@@ -35,127 +41,197 @@ class FraudTemplateDAO:
 
     def get_by_id(self, template_id):
         try:
+            template = template_cache.get(template_id)
+            if template is not None:
+                return template
+
+            generation = template_cache.generation(template_id)
             query_template = "SELECT * FROM FraudTemplate WHERE idTemplate = %s"
             template_row = self.db_util.execute_query(
                 query_template, (template_id,), fetchone=True)
             if not template_row:
                 return None
-            template = FraudTemplate(
-                idTemplate=template_row['idTemplate'],
-                description=template_row['description'],
-                imageUrl=template_row['imageUrl'],
-                timeUpdate=template_row['timeUpdate']
-            )
-            template.labels = FraudLabelDAO().get_by_template_id(template_id)
-            template.boundingBox = BoundingBoxDAO().get_by_template_id(template_id)
+
+            template = self._hydrate_rows([template_row])[0]
+            template_cache.put(template, generation)
             return template
         except Exception as e:
             logging.error(f"Error in FraudTemplateDAO.get_by_id: {str(e)}")
             raise
 
-    def create(self, template):
+    def get_by_ids(self, template_ids):
+        """Lấy nhiều template (kèm label, box) bằng các truy vấn IN theo lô"""
+        try:
+            template_ids = list(dict.fromkeys(template_ids))
+            if not template_ids:
+                return []
+
+            cached, missing = template_cache.get_many(template_ids)
+            generations = {template_id: template_cache.generation(template_id)
+                           for template_id in missing}
+
+            templates = list(cached.values())
+            for start in range(0, len(missing), self.BATCH_SIZE):
+                chunk = missing[start:start + self.BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                query = f"""
+                    SELECT * FROM FraudTemplate
+                    WHERE idTemplate IN ({placeholders})
+                    ORDER BY idTemplate
+                """
+                template_rows = self.db_util.execute_query(
+                    query, tuple(chunk), fetchall=True)
+                if template_rows:
+                    for template in self._hydrate_rows(template_rows):
+                        template_cache.put(
+                            template, generations[template.idTemplate])
+                        templates.append(template)
+
+            templates.sort(key=lambda template: template.idTemplate)
+            return templates
+        except Exception as e:
+            logging.error(f"Error in FraudTemplateDAO.get_by_ids: {str(e)}")
+            raise
+
+    def get_page(self, after_id=0, limit=100):
+        """Phân trang theo keyset trên idTemplate"""
         try:
             query = """
-                INSERT INTO FraudTemplate (description, imageUrl, timeUpdate)
-                VALUES (%s, %s, %s)
+                SELECT * FROM FraudTemplate
+                WHERE idTemplate > %s
+                ORDER BY idTemplate
+                LIMIT %s
             """
+            template_rows = self.db_util.execute_query(
+                query, (after_id, limit), fetchall=True)
 
-            time_update = template.timeUpdate
-            if isinstance(time_update, datetime):
-                time_update = time_update.strftime('%Y-%m-%d %H:%M:%S')
+            if not template_rows:
+                return []
 
-            params = (
-                template.description,
-                template.imageUrl,
-                time_update
-            )
+            return self._hydrate_rows(template_rows)
+        except Exception as e:
+            logging.error(f"Error in FraudTemplateDAO.get_page: {str(e)}")
+            raise
 
-            template_id = self.db_util.execute_query(
-                query, params, commit=True)
+    def iter_all(self, after_id=0, chunk_size=100):
+        """Duyệt toàn bộ template theo từng chunk, không giữ cả bảng trong bộ nhớ"""
+        while True:
+            templates = self.get_page(after_id, chunk_size)
+            if not templates:
+                return
+            for template in templates:
+                yield template
+            if len(templates) < chunk_size:
+                return
+            after_id = templates[-1].idTemplate
 
-            # Lưu các FraudLabel
-            if template.labels:
-                from dao.fraud_label_dao import FraudLabelDAO
-                fraud_label_dao = FraudLabelDAO()
+    def create(self, template):
+        try:
+            # Một unit of work: toàn bộ câu lệnh dùng chung connection, commit một lần
+            with self.db_util.transaction():
+                query = """
+                    INSERT INTO FraudTemplate (description, imageUrl, timeUpdate)
+                    VALUES (%s, %s, %s)
+                """
 
-                for label in template.labels:
-                    label.fraudTemplateId = template_id
-                    label_id = fraud_label_dao.create(label)
+                time_update = template.timeUpdate
+                if isinstance(time_update, datetime):
+                    time_update = time_update.strftime('%Y-%m-%d %H:%M:%S')
 
-                    # Update labelId for any boxes that reference this label
-                    for box in template.boundingBox:
-                        if hasattr(box, 'tempLabelId') and box.tempLabelId == label.tempId:
-                            box.fraudLabelId = label_id
+                params = (
+                    template.description,
+                    template.imageUrl,
+                    time_update
+                )
 
-            if template.boundingBox:
-                from dao.bounding_box_dao import BoundingBoxDAO
-                bounding_box_dao = BoundingBoxDAO()
+                template_id = self.db_util.execute_query(
+                    query, params, commit=True)
+
+                # Lưu các FraudLabel
+                if template.labels:
+                    from dao.fraud_label_dao import FraudLabelDAO
+                    fraud_label_dao = FraudLabelDAO()
+
+                    for label in template.labels:
+                        label.fraudTemplateId = template_id
+                        label_id = fraud_label_dao.create(label)
 
-                for box in template.boundingBox:
-                    box.fraudTemplateId = template_id
-                    bounding_box_dao.create(box)
+                        # Update labelId for any boxes that reference this label
+                        for box in template.boundingBox:
+                            if hasattr(box, 'tempLabelId') and box.tempLabelId == label.tempId:
+                                box.fraudLabelId = label_id
+
+                if template.boundingBox:
+                    from dao.bounding_box_dao import BoundingBoxDAO
+                    bounding_box_dao = BoundingBoxDAO()
+
+                    for box in template.boundingBox:
+                        box.fraudTemplateId = template_id
+                        bounding_box_dao.create(box)
 
-            return template_id
+                return template_id
         except Exception as e:
             logging.error(f"Error in FraudTemplateDAO.create: {str(e)}")
             raise
 
     def update(self, template):
         try:
-            query = """
-                UPDATE FraudTemplate
-                SET description = %s, imageUrl = %s, timeUpdate = %s
-                WHERE idTemplate = %s
-            """
+            with self.db_util.transaction():
+                query = """
+                    UPDATE FraudTemplate
+                    SET description = %s, imageUrl = %s, timeUpdate = %s
+                    WHERE idTemplate = %s
+                """
 
-            time_update = template.timeUpdate
-            if isinstance(time_update, datetime):
-                time_update = time_update.strftime('%Y-%m-%d %H:%M:%S')
+                time_update = template.timeUpdate
+                if isinstance(time_update, datetime):
+                    time_update = time_update.strftime('%Y-%m-%d %H:%M:%S')
 
-            params = (
-                template.description,
-                template.imageUrl,
-                time_update,
-                template.idTemplate
-            )
+                params = (
+                    template.description,
+                    template.imageUrl,
+                    time_update,
+                    template.idTemplate
+                )
 
-            self.db_util.execute_query(query, params, commit=True)
+                self.db_util.execute_query(query, params, commit=True)
 
-            # Xóa tất cả các BoundingBox cũ (will cascade delete through labels)
-            from dao.bounding_box_dao import BoundingBoxDAO
-            bounding_box_dao = BoundingBoxDAO()
+                # Xóa tất cả các BoundingBox cũ (will cascade delete through labels)
+                from dao.bounding_box_dao import BoundingBoxDAO
+                bounding_box_dao = BoundingBoxDAO()
 
-            query_boxes = """
-                DELETE FROM BoundingBox 
-                WHERE fraudLabelId IN (
-                    SELECT idLabel FROM FraudLabel WHERE fraudTemplateId = %s
-                )
-            """
-            self.db_util.execute_query(
-                query_boxes, (template.idTemplate,), commit=True)
+                query_boxes = """
+                    DELETE FROM BoundingBox 
+                    WHERE fraudLabelId IN (
+                        SELECT idLabel FROM FraudLabel WHERE fraudTemplateId = %s
+                    )
+                """
+                self.db_util.execute_query(
+                    query_boxes, (template.idTemplate,), commit=True)
 
-            # Xóa tất cả các FraudLabel cũ
-            from dao.fraud_label_dao import FraudLabelDAO
-            fraud_label_dao = FraudLabelDAO()
-            fraud_label_dao.delete_by_template_id(template.idTemplate)
+                # Xóa tất cả các FraudLabel cũ
+                from dao.fraud_label_dao import FraudLabelDAO
+                fraud_label_dao = FraudLabelDAO()
+                fraud_label_dao.delete_by_template_id(template.idTemplate)
 
-            # Tạo lại các FraudLabel
-            if template.labels:
-                for label in template.labels:
-                    label.fraudTemplateId = template.idTemplate
-                    label_id = fraud_label_dao.create(label)
+                # Tạo lại các FraudLabel
+                if template.labels:
+                    for label in template.labels:
+                        label.fraudTemplateId = template.idTemplate
+                        label_id = fraud_label_dao.create(label)
 
-                    # Update labelId for any boxes that reference this label
-                    for box in template.boundingBox:
-                        if hasattr(box, 'tempLabelId') and box.tempLabelId == label.tempId:
-                            box.fraudLabelId = label_id
+                        # Update labelId for any boxes that reference this label
+                        for box in template.boundingBox:
+                            if hasattr(box, 'tempLabelId') and box.tempLabelId == label.tempId:
+                                box.fraudLabelId = label_id
 
-            # Tạo lại các BoundingBox
-            if template.boundingBox:
-                for box in template.boundingBox:
-                    box.fraudTemplateId = template.idTemplate
-                    bounding_box_dao.create(box)
+                # Tạo lại các BoundingBox
+                if template.boundingBox:
+                    for box in template.boundingBox:
+                        box.fraudTemplateId = template.idTemplate
+                        bounding_box_dao.create(box)
 
+            template_cache.invalidate(template.idTemplate)
             return True
         except Exception as e:
             logging.error(f"Error in FraudTemplateDAO.update: {str(e)}")
@@ -163,26 +239,58 @@ class FraudTemplateDAO:
 
     def delete(self, template_id):
         try:
-            # First delete all bounding boxes related to this template's labels
-            query_boxes = """
-                DELETE FROM BoundingBox 
-                WHERE fraudLabelId IN (
-                    SELECT idLabel FROM FraudLabel WHERE fraudTemplateId = %s
-                )
-            """
-            self.db_util.execute_query(
-                query_boxes, (template_id,), commit=True)
+            with self.db_util.transaction():
+                # First delete all bounding boxes related to this template's labels
+                query_boxes = """
+                    DELETE FROM BoundingBox 
+                    WHERE fraudLabelId IN (
+                        SELECT idLabel FROM FraudLabel WHERE fraudTemplateId = %s
+                    )
+                """
+                self.db_util.execute_query(
+                    query_boxes, (template_id,), commit=True)
 
-            # Then delete all labels related to this template
-            query_labels = "DELETE FROM FraudLabel WHERE fraudTemplateId = %s"
-            self.db_util.execute_query(
-                query_labels, (template_id,), commit=True)
+                # Then delete all labels related to this template
+                query_labels = "DELETE FROM FraudLabel WHERE fraudTemplateId = %s"
+                self.db_util.execute_query(
+                    query_labels, (template_id,), commit=True)
 
-            # Finally delete the template
-            query = "DELETE FROM FraudTemplate WHERE idTemplate = %s"
-            self.db_util.execute_query(query, (template_id,), commit=True)
+                # Finally delete the template
+                query = "DELETE FROM FraudTemplate WHERE idTemplate = %s"
+                self.db_util.execute_query(query, (template_id,), commit=True)
 
+            template_cache.invalidate(template_id)
             return True
         except Exception as e:
             logging.error(f"Error in FraudTemplateDAO.delete: {str(e)}")
             raise
+
+    def _hydrate_rows(self, template_rows):
+        """Load box và label cho một nhóm template với số truy vấn cố định"""
+        template_ids = [row['idTemplate'] for row in template_rows]
+        boxes = BoundingBoxDAO().get_by_template_ids(template_ids)
+        labels = FraudLabelDAO().get_by_ids(
+            list({box.fraudLabelId for box in boxes}))
+        return self._build_templates(template_rows, boxes, labels)
+
+    def _build_templates(self, template_rows, boxes, labels_by_id):
+        """Ghép template với bounding box và label đã được load sẵn"""
+        boxes_by_template = {}
+        for box in boxes:
+            boxes_by_template.setdefault(box.fraudTemplateId, []).append(box)
+
+        templates = []
+        for row in template_rows:
+            template = FraudTemplate(
+                idTemplate=row['idTemplate'],
+                description=row['description'],
+                imageUrl=row['imageUrl'],
+                timeUpdate=row['timeUpdate']
+            )
+            template.boundingBox = boxes_by_template.get(row['idTemplate'], [])
+            # Mỗi box đi kèm một label, giữ nguyên thứ tự như get_by_template_id
+            template.labels = [labels_by_id.get(box.fraudLabelId)
+                               for box in template.boundingBox]
+            templates.append(template)
+
+        return templates
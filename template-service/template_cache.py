@@ -0,0 +1,113 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from config import Config
+
+
+class TemplateCache:
+    """Cache LRU + TTL cho FraudTemplate đã hydrate (kèm label, box).
+
+    Entry được giữ theo idTemplate cùng với timeUpdate của bản đã cache.
+    Mỗi lần invalidate tăng generation của id đó, nên kết quả của một lần
+    đọc DB bắt đầu trước khi template bị sửa/xóa sẽ không được ghi đè vào cache.
+    Object trả về được dùng chung giữa các request, caller không được sửa.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = (Config.TEMPLATE_CACHE_MAX_ENTRIES
+                            if max_entries is None else max_entries)
+        self.ttl = Config.TEMPLATE_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._stats = {"hits": 0, "misses": 0, "expired": 0,
+                       "evictions": 0, "invalidations": 0}
+
+    def generation(self, template_id):
+        """Lấy trước khi đọc DB, truyền lại cho put()"""
+        with self._lock:
+            return self._generations.get(template_id, 0)
+
+    def get(self, template_id):
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if time.time() - entry["cached_at"] >= self.ttl:
+                del self._entries[template_id]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(template_id)
+            self._stats["hits"] += 1
+            return entry["template"]
+
+    def get_many(self, template_ids):
+        """Trả về (dict id -> template đã cache, danh sách id chưa có)"""
+        found = {}
+        missing = []
+        for template_id in template_ids:
+            template = self.get(template_id)
+            if template is None:
+                missing.append(template_id)
+            else:
+                found[template_id] = template
+        return found, missing
+
+    def put(self, template, generation=None):
+        if self.max_entries <= 0:
+            return
+        template_id = template.idTemplate
+        version = _version(template.timeUpdate)
+
+        with self._lock:
+            if (generation is not None and
+                    generation != self._generations.get(template_id, 0)):
+                # Template đã bị sửa/xóa trong lúc đang đọc DB
+                return
+            entry = self._entries.get(template_id)
+            if entry is not None and entry["version"] > version:
+                return
+
+            self._entries[template_id] = {
+                "template": template,
+                "version": version,
+                "cached_at": time.time()
+            }
+            self._entries.move_to_end(template_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, template_id):
+        with self._lock:
+            self._generations[template_id] = self._generations.get(template_id, 0) + 1
+            if self._entries.pop(template_id, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            for template_id in self._entries:
+                self._generations[template_id] = self._generations.get(template_id, 0) + 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        max_entries=self.max_entries,
+                        ttl_seconds=self.ttl,
+                        hit_ratio=round(self._stats["hits"] / lookups, 4) if lookups else 0.0)
+
+
+def _version(time_update):
+    if isinstance(time_update, datetime):
+        return time_update.strftime('%Y-%m-%d %H:%M:%S')
+    return str(time_update or "")
+
+
+template_cache = TemplateCache()
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
 import os
+import re
+import json
 import shutil
+from urllib.parse import urlsplit
 
 from dao.fraud_template_dao import FraudTemplateDAO
+from config import Config
+from utils.db_util import DatabaseUtil
+from utils.db_executor import run_db
+from template_cache import template_cache
+from thumbnail_cache import ThumbnailCache
+from training_image_cache import TrainingImageCache, letterbox_boxes
 
 app = FastAPI(title="Template Service", version="1.0.0")
 
@@ -21,10 +31,12 @@ app.add_middleware(
 )
 
 IMAGES_DIR = "images"
-
-app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+# Một entity tag trong If-None-Match: "abc", W/"abc" hoặc *
+ENTITY_TAG = re.compile(r'(?:W/)?"[^"]*"|\*')
 
 template_dao = FraudTemplateDAO()
+thumbnail_cache = ThumbnailCache(IMAGES_DIR)
+training_image_cache = TrainingImageCache(IMAGES_DIR)
 
 
 class TemplateResponse(BaseModel):
@@ -34,6 +46,18 @@ class TemplateResponse(BaseModel):
     timeUpdate: str
     labels: List[dict] = []
     boundingBox: List[dict] = []
+    trainingImage: Optional[dict] = None
+
+
+class TemplateBatchRequest(BaseModel):
+    template_ids: List[int]
+    # Nếu có: kèm thông tin ảnh letterbox ở kích thước train và box đã chỉnh tọa độ
+    training_size: Optional[int] = None
+
+
+class TemplateBatchResponse(BaseModel):
+    templates: List[TemplateResponse] = []
+    missing: List[int] = []
 
 
 # @app.get("/images/{filename}")
@@ -54,24 +78,107 @@ class TemplateResponse(BaseModel):
 #         raise HTTPException(status_code=500, detail=str(e))
 
 
+def etag_matches(if_none_match, etag):
+    """If-None-Match khớp ETag hay không, theo so sánh yếu của RFC 7232:
+    tách danh sách tag, bỏ tiền tố W/ rồi so bằng; * khớp mọi ETag"""
+    if not if_none_match:
+        return False
+    tags = ENTITY_TAG.findall(if_none_match)
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
+
+
+# Khai báo trước khi mount /images, nếu không StaticFiles sẽ nhận luôn đường dẫn này
+@app.get("/images/{name}/thumb")
+async def get_thumbnail(name: str, request: Request, w: int = 128):
+    if os.path.basename(name) != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid image name")
+    if w <= 0:
+        raise HTTPException(status_code=400, detail="w must be greater than 0")
+
+    width = thumbnail_cache.normalize_width(w)
+    try:
+        result = await run_in_threadpool(thumbnail_cache.get, name, width)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Cannot create thumbnail: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path, etag = result
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={Config.THUMBNAIL_MAX_AGE}"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+
+
 @app.get("/")
 async def root():
     return {"message": "Template Service is running"}
 
 
 @app.get("/templates", response_model=List[TemplateResponse])
-async def get_all_templates():
+async def get_all_templates(response: Response, after_id: Optional[int] = None,
+                            limit: Optional[int] = None, stream: bool = False,
+                            chunk_size: Optional[int] = None):
     try:
-        templates = template_dao.get_all()
+        if limit is not None and limit <= 0:
+            raise HTTPException(
+                status_code=400, detail="limit must be greater than 0")
+        if chunk_size is not None and chunk_size <= 0:
+            raise HTTPException(
+                status_code=400, detail="chunk_size must be greater than 0")
+
+        if stream:
+            # NDJSON: mỗi template một dòng, đọc DB theo từng chunk_size template;
+            # limit (nếu có) là tổng số template được trả về
+            return StreamingResponse(
+                stream_templates(after_id or 0,
+                                 chunk_size or Config.TEMPLATE_PAGE_SIZE, limit),
+                media_type="application/x-ndjson"
+            )
+
+        if after_id is None and limit is None:
+            templates = await run_db(template_dao.get_all)
+            return [TemplateResponse(**template.to_dict()) for template in templates]
+
+        page_size = min(limit or Config.TEMPLATE_PAGE_SIZE,
+                        Config.TEMPLATE_MAX_PAGE_SIZE)
+        templates = await run_db(
+            template_dao.get_page, after_id or 0, page_size)
+        if len(templates) == page_size:
+            response.headers["X-Next-After-Id"] = str(templates[-1].idTemplate)
         return [TemplateResponse(**template.to_dict()) for template in templates]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def stream_templates(after_id, chunk_size, limit=None):
+    chunk_size = min(chunk_size, Config.TEMPLATE_MAX_PAGE_SIZE)
+    if limit is not None:
+        chunk_size = min(chunk_size, limit)
+    for count, template in enumerate(template_dao.iter_all(after_id, chunk_size), start=1):
+        yield json.dumps(
+            TemplateResponse(**template.to_dict()).model_dump(),
+            ensure_ascii=False) + "\n"
+        if limit is not None and count >= limit:
+            return
+
+
 @app.get("/templates/{template_id}")
 async def get_template(template_id: int):
     try:
-        template = template_dao.get_by_id(template_id)
+        template = await run_db(template_dao.get_by_id, template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
         return template.to_dict()
@@ -79,6 +186,105 @@ async def get_template(template_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/templates/batch", response_model=TemplateBatchResponse)
+async def get_templates_batch(batch_request: TemplateBatchRequest):
+    try:
+        if len(batch_request.template_ids) > Config.TEMPLATE_MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {Config.TEMPLATE_MAX_BATCH_SIZE} template ids per request")
+
+        templates = await run_db(
+            template_dao.get_by_ids, batch_request.template_ids)
+        found = {template.idTemplate for template in templates}
+        missing = [template_id for template_id in dict.fromkeys(batch_request.template_ids)
+                   if template_id not in found]
+
+        template_responses = [TemplateResponse(**template.to_dict())
+                              for template in templates]
+        if batch_request.training_size:
+            size = training_image_cache.normalize_size(
+                batch_request.training_size)
+            await run_in_threadpool(
+                attach_training_images, template_responses, size)
+
+        return TemplateBatchResponse(
+            templates=template_responses,
+            missing=missing
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def image_name(image_url):
+    return os.path.basename(urlsplit(image_url).path)
+
+
+def attach_training_images(template_responses, size):
+    for template in template_responses:
+        geometry = training_image_cache.geometry(
+            image_name(template.imageUrl), size)
+        if geometry is None:
+            continue
+        template.trainingImage = dict(
+            geometry,
+            url=f"/templates/{template.idTemplate}/training-image?size={size}",
+            boundingBox=letterbox_boxes(template.boundingBox, geometry))
+
+
+@app.get("/templates/{template_id}/training-image")
+async def get_training_image(template_id: int, request: Request, size: int = 640):
+    """Ảnh template đã letterbox về size x size, sinh một lần rồi cache trên đĩa"""
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="size must be greater than 0")
+
+    template = await run_db(template_dao.get_by_id, template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    size = training_image_cache.normalize_size(size)
+    name = image_name(template.imageUrl)
+    try:
+        result = await run_in_threadpool(training_image_cache.get, name, size)
+        geometry = await run_in_threadpool(training_image_cache.geometry, name, size)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Cannot create training image: {str(e)}")
+    if result is None or geometry is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path, etag = result
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={Config.THUMBNAIL_MAX_AGE}",
+        "X-Letterbox-Size": str(size),
+        "X-Letterbox-Scale": str(geometry["scale"]),
+        "X-Letterbox-Pad": f"{geometry['padX']},{geometry['padY']}"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+@app.get("/template-cache/stats")
+async def get_template_cache_stats():
+    return template_cache.stats()
+
+
+@app.get("/thumbnail-cache/stats")
+async def get_thumbnail_cache_stats():
+    return {"thumbnails": thumbnail_cache.stats(),
+            "training_images": training_image_cache.stats()}
+
+
+@app.get("/db/pool-stats")
+async def get_db_pool_stats():
+    """Số liệu connection pool: thời gian chờ checkout, số connection đang dùng, số lần pool cạn"""
+    return DatabaseUtil().pool_stats()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "template-service"}
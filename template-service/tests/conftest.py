@@ -0,0 +1,121 @@
+import os
+import re
+import pytest
+from mysql.connector import pooling
+from utils.db_util import DatabaseUtil
+from template_cache import template_cache
+
+SELECT = re.compile(
+    r"SELECT \* FROM (\w+)"
+    r"(?: WHERE (\w+) (=|>|IN) (\([^)]*\)|%s))?"
+    r"(?: ORDER BY (\w+)( DESC)?)?"
+    r"(?: LIMIT %s)?$", re.IGNORECASE)
+
+
+class FakeDatabase:
+    """Bảng trong bộ nhớ thay cho MySQL, hiểu các câu SELECT đơn giản của DAO.
+
+    Mọi câu lệnh được ghi lại trong queries để test đếm số truy vấn.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.queries = []
+
+    def insert(self, table, **row):
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def execute(self, query, params):
+        query = " ".join(query.split())
+        params = tuple(params or ())
+        self.queries.append((query, params))
+
+        match = SELECT.match(query)
+        if match is None:
+            raise NotImplementedError(f"FakeDatabase does not support: {query}")
+        table, column, operator, _, order_by, descending = match.groups()
+        rows = list(self.tables.get(table, []))
+
+        values = list(params)
+        if column is not None:
+            if operator == "IN":
+                wanted = set(values[:len(values) - query.endswith("LIMIT %s")])
+                rows = [row for row in rows if row[column] in wanted]
+            elif operator == "=":
+                rows = [row for row in rows if row[column] == values[0]]
+            else:
+                rows = [row for row in rows if row[column] > values[0]]
+        if order_by is not None:
+            rows.sort(key=lambda row: row[order_by], reverse=bool(descending))
+        if query.endswith("LIMIT %s"):
+            rows = rows[:values[-1]]
+        return [dict(row) for row in rows]
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.rows = self.database.execute(query, params)
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, database):
+        self.database = database
+
+    def get_connection(self):
+        return FakeConnection(self.database)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """DatabaseUtil dùng FakeDatabase thay cho connection pool MySQL"""
+    database = FakeDatabase()
+    monkeypatch.setattr(pooling, "MySQLConnectionPool",
+                        lambda **kwargs: FakePool(database))
+    DatabaseUtil()
+    monkeypatch.setattr(DatabaseUtil, "_pool", FakePool(database))
+    template_cache.clear()
+    yield database
+    template_cache.clear()
+
+
+@pytest.fixture
+def client(fake_db, monkeypatch):
+    """TestClient của template service; thư mục ảnh được đọc theo đường dẫn tương đối"""
+    from fastapi.testclient import TestClient
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import template_service
+    return TestClient(template_service.app)
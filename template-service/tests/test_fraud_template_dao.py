@@ -0,0 +1,86 @@
+from datetime import datetime
+from dao.bounding_box_dao import BoundingBoxDAO
+from dao.fraud_label_dao import FraudLabelDAO
+from dao.fraud_template_dao import FraudTemplateDAO
+from models.fraud_template import FraudTemplate
+
+
+def seed_templates(database, count, boxes_per_template=2):
+    box_id = label_id = 0
+    for template_id in range(1, count + 1):
+        database.insert("FraudTemplate", idTemplate=template_id,
+                        description=f"template {template_id}",
+                        imageUrl=f"/images/gianlan{template_id}.jpg",
+                        timeUpdate=datetime(2024, 1, template_id % 28 + 1))
+        for index in range(boxes_per_template):
+            box_id += 1
+            label_id += 1
+            database.insert("FraudLabel", idLabel=label_id,
+                            description=f"label {label_id}",
+                            typeLabel="literal" if index % 2 else "HumanDetect",
+                            fraudTemplateId=template_id)
+            database.insert("BoundingBox", idBox=box_id,
+                            xCenter=0.5, yCenter=0.5, width=0.1 * (index + 1), height=0.2,
+                            xPixel=100, yPixel=120, widthPixel=30, heightPixel=40,
+                            fraudLabelId=label_id, fraudTemplateId=template_id)
+
+
+def hydrate_per_template(template_id):
+    """Cách hydrate cũ: mỗi template một lượt truy vấn box và label riêng"""
+    row = FraudTemplateDAO().db_util.execute_query(
+        "SELECT * FROM FraudTemplate WHERE idTemplate = %s", (template_id,), fetchone=True)
+    return FraudTemplate(
+        idTemplate=row['idTemplate'],
+        description=row['description'],
+        imageUrl=row['imageUrl'],
+        timeUpdate=row['timeUpdate'],
+        labels=FraudLabelDAO().get_by_template_id(template_id),
+        boundingBox=BoundingBoxDAO().get_by_template_id(template_id)
+    ).to_dict()
+
+
+def test_get_all_uses_fixed_number_of_queries(fake_db):
+    seed_templates(fake_db, 3)
+    assert len(FraudTemplateDAO().get_all()) == 3
+    # template, box, label
+    assert len(fake_db.queries) == 3
+
+    fake_db.queries.clear()
+    fake_db.tables.clear()
+    seed_templates(fake_db, 40, boxes_per_template=4)
+    assert len(FraudTemplateDAO().get_all()) == 40
+    assert len(fake_db.queries) == 3
+
+
+def test_get_all_matches_per_template_hydration(fake_db):
+    seed_templates(fake_db, 5, boxes_per_template=3)
+    expected = [hydrate_per_template(template_id) for template_id in range(1, 6)]
+
+    assert [template.to_dict() for template in FraudTemplateDAO().get_all()] == expected
+
+
+def test_get_by_ids_queries_once_per_chunk_and_uses_cache(fake_db, monkeypatch):
+    seed_templates(fake_db, 7)
+    monkeypatch.setattr(FraudTemplateDAO, "BATCH_SIZE", 3)
+    dao = FraudTemplateDAO()
+
+    templates = dao.get_by_ids([7, 1, 2, 3, 4, 5, 6, 1])
+    # 3 chunk, mỗi chunk: template, box, label
+    assert len(fake_db.queries) == 9
+    assert [template.idTemplate for template in templates] == list(range(1, 8))
+    assert [template.to_dict() for template in templates] == \
+        [hydrate_per_template(template_id) for template_id in range(1, 8)]
+
+    fake_db.queries.clear()
+    dao.get_by_ids([1, 2, 3])
+    assert fake_db.queries == []
+
+
+def test_label_lookup_is_chunked(fake_db, monkeypatch):
+    monkeypatch.setattr(FraudLabelDAO, "BATCH_SIZE", 4)
+    seed_templates(fake_db, 5, boxes_per_template=2)
+
+    labels = FraudLabelDAO().get_by_ids(list(range(1, 11)) + [3])
+    assert sorted(labels) == list(range(1, 11))
+    label_queries = [params for query, params in fake_db.queries if "FROM FraudLabel" in query]
+    assert [len(params) for params in label_queries] == [4, 4, 2]
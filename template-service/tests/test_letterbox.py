@@ -0,0 +1,55 @@
+import pytest
+from PIL import Image
+from training_image_cache import TrainingImageCache, letterbox_boxes, letterbox_geometry
+
+
+def test_landscape_geometry_pads_top_and_bottom():
+    geometry = letterbox_geometry(400, 200, 640)
+    assert geometry == {"size": 640, "scale": 1.6, "width": 640, "height": 320,
+                        "padX": 0, "padY": 160}
+
+
+def test_boxes_follow_scale_and_padding():
+    geometry = letterbox_geometry(400, 200, 640)
+    boxes = [{"xCenter": 0.5, "yCenter": 0.5, "width": 0.5, "height": 0.5, "label": "a"},
+             {"xCenter": 0.25, "yCenter": 0.25, "width": 0.1, "height": 0.2}]
+
+    adjusted = letterbox_boxes(boxes, geometry)
+    assert adjusted[0] == {"xCenter": 0.5, "yCenter": 0.5, "width": 0.5, "height": 0.25,
+                           "label": "a"}
+    assert adjusted[1] == {"xCenter": 0.25, "yCenter": 0.375, "width": 0.1, "height": 0.1}
+    # Box đầu vào không bị sửa
+    assert boxes[1]["yCenter"] == 0.25
+
+
+def test_portrait_geometry_pads_left_and_right():
+    geometry = letterbox_geometry(300, 600, 320)
+    adjusted = letterbox_boxes(
+        [{"xCenter": 0.0, "yCenter": 1.0, "width": 1.0, "height": 1.0}], geometry)
+    assert adjusted == [{"xCenter": 0.25, "yCenter": 1.0, "width": 0.5, "height": 1.0}]
+
+
+def test_adjusted_box_matches_rendered_image(tmp_path):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    # Ô đỏ chiếm [100, 200) x [50, 100) trong ảnh 400 x 200
+    image = Image.new("RGB", (400, 200), (255, 255, 255))
+    image.paste((255, 0, 0), (100, 50, 200, 100))
+    image.save(images_dir / "a.png")
+
+    cache = TrainingImageCache(str(images_dir), str(tmp_path / "cache"))
+    path, _ = cache.get("a.png", 320)
+    geometry = cache.geometry("a.png", 320)
+    box = letterbox_boxes([{"xCenter": 0.375, "yCenter": 0.375,
+                            "width": 0.25, "height": 0.25}], geometry)[0]
+
+    with Image.open(path) as rendered:
+        assert rendered.size == (320, 320)
+        x, y = box["xCenter"] * 320, box["yCenter"] * 320
+        red, green, _ = rendered.getpixel((round(x), round(y)))
+        assert red > 200 and green < 60
+        # Ngay ngoài cạnh trái của box là nền trắng
+        left = (box["xCenter"] - box["width"] / 2) * 320
+        assert rendered.getpixel((round(left) - 4, round(y)))[1] > 200
+        # Viền letterbox phía trên
+        assert rendered.getpixel((160, 10)) == pytest.approx((114, 114, 114), abs=3)
@@ -0,0 +1,53 @@
+from datetime import datetime
+from models.fraud_template import FraudTemplate
+from template_cache import TemplateCache
+
+
+def template(template_id, time_update=datetime(2024, 1, 1)):
+    return FraudTemplate(idTemplate=template_id, timeUpdate=time_update)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TemplateCache(max_entries=2, ttl=60)
+    cache.put(template(1))
+    cache.put(template(2))
+    assert cache.get(1) is not None
+    cache.put(template(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = TemplateCache(max_entries=10, ttl=0)
+    cache.put(template(1))
+    assert cache.get(1) is None
+    stats = cache.stats()
+    assert (stats["expired"], stats["entries"]) == (1, 0)
+
+
+def test_invalidated_read_is_not_cached():
+    cache = TemplateCache(max_entries=10, ttl=60)
+    generation = cache.generation(1)
+    # Template bị sửa trong lúc request khác đang đọc DB
+    cache.invalidate(1)
+    cache.put(template(1), generation)
+    assert cache.get(1) is None
+
+    cache.put(template(1), cache.generation(1))
+    assert cache.get(1) is not None
+
+
+def test_older_version_does_not_replace_newer():
+    cache = TemplateCache(max_entries=10, ttl=60)
+    newer = template(1, datetime(2024, 2, 1))
+    cache.put(newer)
+    cache.put(template(1, datetime(2024, 1, 1)))
+    assert cache.get(1) is newer
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = TemplateCache(max_entries=0, ttl=60)
+    cache.put(template(1))
+    assert cache.get(1) is None
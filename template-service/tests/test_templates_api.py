@@ -0,0 +1,42 @@
+import json
+from test_fraud_template_dao import seed_templates
+
+
+def template_queries(fake_db):
+    return [query for query, _ in fake_db.queries if "FROM FraudTemplate" in query]
+
+
+def test_limit_must_be_positive(client, fake_db):
+    for params in ({"limit": 0}, {"limit": -1}, {"limit": 0, "stream": True},
+                   {"stream": True, "chunk_size": 0}):
+        response = client.get("/templates", params=params)
+        assert response.status_code == 400, params
+    assert fake_db.queries == []
+
+
+def test_page_sets_next_cursor(client, fake_db):
+    seed_templates(fake_db, 5, boxes_per_template=1)
+
+    response = client.get("/templates", params={"limit": 2, "after_id": 1})
+    assert [template["idTemplate"] for template in response.json()] == [2, 3]
+    assert response.headers["X-Next-After-Id"] == "3"
+
+    response = client.get("/templates", params={"limit": 2, "after_id": 3})
+    assert [template["idTemplate"] for template in response.json()] == [4, 5]
+
+
+def test_stream_uses_chunk_size_and_limit_separately(client, fake_db):
+    seed_templates(fake_db, 7, boxes_per_template=1)
+
+    response = client.get("/templates", params={"stream": True, "chunk_size": 3})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [template["idTemplate"] for template in lines] == list(range(1, 8))
+    # 3 + 3 + 1 template
+    assert len(template_queries(fake_db)) == 3
+
+    fake_db.queries.clear()
+    response = client.get("/templates",
+                          params={"stream": True, "chunk_size": 3, "limit": 4, "after_id": 1})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [template["idTemplate"] for template in lines] == [2, 3, 4, 5]
+    assert len(template_queries(fake_db)) == 2
@@ -0,0 +1,110 @@
+import os
+import pytest
+from PIL import Image
+from thumbnail_cache import ThumbnailCache
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    path = tmp_path / "images"
+    path.mkdir()
+    for index in range(3):
+        Image.new("RGB", (400, 300), (index * 80, 0, 0)).save(path / f"{index}.jpg")
+    return path
+
+
+def test_etag_matching(fake_db):
+    from template_service import etag_matches
+    etag = '"abc-128"'
+    assert etag_matches('"abc-128"', etag)
+    assert etag_matches('W/"abc-128"', etag)
+    assert etag_matches('"other", W/"abc-128"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('', etag)
+    # Trước đây là phép tìm chuỗi con nên các tag này cũng khớp
+    assert not etag_matches('"abc-1280"', etag)
+    assert not etag_matches('"x"abc-128"', etag)
+    assert not etag_matches('abc-128', etag)
+
+
+def test_thumbnail_not_modified(client, images_dir, tmp_path, monkeypatch):
+    import template_service
+    monkeypatch.setattr(template_service, "thumbnail_cache",
+                        ThumbnailCache(str(images_dir), str(tmp_path / "thumbs")))
+
+    response = client.get("/images/0.jpg/thumb", params={"w": 100})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    for header in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        response = client.get("/images/0.jpg/thumb", params={"w": 100},
+                              headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+    response = client.get("/images/0.jpg/thumb", params={"w": 100},
+                          headers={"If-None-Match": etag[:-1] + '0"'})
+    assert response.status_code == 200
+
+
+def test_least_recently_used_thumbnail_is_evicted(images_dir, tmp_path):
+    probe = ThumbnailCache(str(images_dir), str(tmp_path / "probe"))
+    probe.get("0.jpg", 128)
+    one = probe.stats()["size_bytes"]
+
+    cache = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"), max_bytes=int(one * 2.5))
+    first, _ = cache.get("0.jpg", 128)
+    second, _ = cache.get("1.jpg", 128)
+    cache.get("0.jpg", 128)
+    cache.get("2.jpg", 128)
+
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"]) == (2, 1, 1)
+
+
+def test_replaced_source_gets_new_variant(images_dir, tmp_path):
+    cache = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"))
+    _, etag = cache.get("0.jpg", 128)
+    Image.new("RGB", (500, 300)).save(images_dir / "0.jpg")
+    os.utime(images_dir / "0.jpg", ns=(1, 1))
+    _, new_etag = cache.get("0.jpg", 128)
+    assert new_etag != etag
+    assert cache.get("missing.jpg", 128) is None
+
+
+def test_existing_thumbnails_are_reloaded_within_budget(images_dir, tmp_path):
+    cache = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"))
+    for index in range(3):
+        cache.get(f"{index}.jpg", 128)
+    total = cache.stats()["size_bytes"]
+
+    reloaded = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"), max_bytes=total - 1)
+    assert reloaded.stats()["entries"] == 2
+    assert len(os.listdir(tmp_path / "thumbs")) == 2
+
+
+def test_regenerated_thumbnail_is_counted_once(images_dir, tmp_path):
+    cache = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"))
+    path, _ = cache.get("0.jpg", 128)
+    size = cache.stats()["size_bytes"]
+
+    # File bị xoá ngoài cache nhưng entry vẫn còn trong _entries
+    os.remove(path)
+    cache.get("0.jpg", 128)
+    stats = cache.stats()
+    assert (stats["entries"], stats["size_bytes"], stats["generated"]) == (1, size, 2)
+
+
+def test_failed_render_releases_key_lock(images_dir, tmp_path, monkeypatch):
+    cache = ThumbnailCache(str(images_dir), str(tmp_path / "thumbs"))
+
+    def broken(source_path, path, width):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache, "_render", broken)
+    with pytest.raises(OSError):
+        cache.get("0.jpg", 128)
+    assert cache._key_locks == {}
+    assert cache.stats()["entries"] == 0
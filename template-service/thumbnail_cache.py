@@ -0,0 +1,129 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageOps
+from config import Config
+
+
+class ThumbnailCache:
+    """Sinh và cache ảnh thu nhỏ của ảnh template trên đĩa.
+
+    Mỗi biến thể được đặt tên theo (tên ảnh, chiều rộng, mtime + size của ảnh
+    gốc), nên khi ảnh gốc bị thay thì ảnh thu nhỏ cũ không còn được dùng và sẽ
+    bị LRU loại bỏ khi tổng dung lượng vượt max_bytes.
+    """
+
+    def __init__(self, images_dir, cache_dir=None, max_bytes=None):
+        self.images_dir = images_dir
+        self.cache_dir = cache_dir or Config.THUMBNAIL_CACHE_DIR
+        self.max_bytes = Config.THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "generated": 0, "evictions": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def normalize_width(self, width):
+        """Làm tròn lên bội số của THUMBNAIL_WIDTH_STEP để giới hạn số biến thể"""
+        step = Config.THUMBNAIL_WIDTH_STEP
+        width = max(step, min(width, Config.THUMBNAIL_MAX_WIDTH))
+        return -(-width // step) * step
+
+    def get(self, name, width):
+        """Trả về (thumb_path, etag), hoặc None nếu ảnh gốc không tồn tại"""
+        source_path = os.path.join(self.images_dir, name)
+        try:
+            source_stat = os.stat(source_path)
+        except FileNotFoundError:
+            return None
+
+        digest = hashlib.sha1(
+            f"{name}|{width}|{source_stat.st_mtime_ns}|{source_stat.st_size}".encode('utf-8')
+        ).hexdigest()[:20]
+        key = f"{digest}_{width}.jpg"
+        path = os.path.join(self.cache_dir, key)
+        etag = f'"{digest}-{width}"'
+
+        with self._lock:
+            if key in self._entries and os.path.exists(path):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return path, etag
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Nhiều request cùng một biến thể chỉ sinh ảnh một lần
+        try:
+            with key_lock:
+                with self._lock:
+                    if key in self._entries and os.path.exists(path):
+                        self._entries.move_to_end(key)
+                        self._stats["hits"] += 1
+                        return path, etag
+
+                size = self._render(source_path, path, width)
+
+                with self._lock:
+                    # File của entry cũ có thể đã bị xoá ngoài cache: trừ size cũ trước
+                    self._total_bytes += size - self._entries.get(key, 0)
+                    self._entries[key] = size
+                    self._entries.move_to_end(key)
+                    self._stats["generated"] += 1
+                    self._evict(keep=key)
+        finally:
+            # Lỗi khi sinh ảnh cũng phải bỏ lock của key, nếu không _key_locks phình ra
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+        return path, etag
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        size_bytes=self._total_bytes,
+                        max_bytes=self.max_bytes)
+
+    def _render(self, source_path, path, width):
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            # Không phóng to ảnh nhỏ hơn chiều rộng yêu cầu
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            image.save(temp_path, "JPEG",
+                       quality=Config.THUMBNAIL_QUALITY, optimize=True)
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._total_bytes -= self._entries.pop(key)
+            self._stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, key))
+            except FileNotFoundError:
+                pass
+
+    def _load_existing(self):
+        """Nạp lại các ảnh đã sinh, thứ tự LRU theo thời gian truy cập"""
+        files = []
+        for key in os.listdir(self.cache_dir):
+            if not key.endswith(".jpg"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, key))
+            files.append((stat.st_atime, key, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
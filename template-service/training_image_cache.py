@@ -0,0 +1,105 @@
+import os
+import threading
+from PIL import Image, ImageOps
+from config import Config
+from thumbnail_cache import ThumbnailCache
+
+
+def letterbox_geometry(width, height, size):
+    """Kích thước sau khi scale và phần viền khi đặt ảnh vào khung size x size"""
+    scale = min(size / width, size / height)
+    new_width = max(1, round(width * scale))
+    new_height = max(1, round(height * scale))
+    return {
+        "size": size,
+        "scale": round(scale, 6),
+        "width": new_width,
+        "height": new_height,
+        "padX": (size - new_width) // 2,
+        "padY": (size - new_height) // 2
+    }
+
+
+def letterbox_boxes(boxes, geometry):
+    """Đổi tọa độ chuẩn hóa (0-1) của box theo ảnh gốc sang ảnh đã letterbox"""
+    size = geometry["size"]
+    adjusted = []
+    for box in boxes:
+        box = dict(box)
+        box["xCenter"] = round(
+            (box["xCenter"] * geometry["width"] + geometry["padX"]) / size, 6)
+        box["yCenter"] = round(
+            (box["yCenter"] * geometry["height"] + geometry["padY"]) / size, 6)
+        box["width"] = round(box["width"] * geometry["width"] / size, 6)
+        box["height"] = round(box["height"] * geometry["height"] / size, 6)
+        adjusted.append(box)
+    return adjusted
+
+
+class TrainingImageCache(ThumbnailCache):
+    """Ảnh template đã letterbox về đúng kích thước train (size x size).
+
+    Dùng chung cơ chế cache đĩa và LRU của ThumbnailCache, chỉ khác cách sinh ảnh.
+    """
+
+    def __init__(self, images_dir, cache_dir=None, max_bytes=None):
+        super().__init__(
+            images_dir,
+            cache_dir or Config.TRAINING_IMAGE_CACHE_DIR,
+            Config.TRAINING_IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+        self._dimensions = {}
+        self._dimensions_lock = threading.Lock()
+
+    def normalize_size(self, size):
+        step = Config.TRAINING_IMAGE_SIZE_STEP
+        size = max(step, min(size, Config.TRAINING_IMAGE_MAX_SIZE))
+        return -(-size // step) * step
+
+    def geometry(self, name, size):
+        """Thông số letterbox của ảnh gốc ở kích thước size, None nếu không có ảnh.
+
+        Chỉ đọc header ảnh (không decode), kết quả được nhớ theo mtime của file.
+        """
+        source_path = os.path.join(self.images_dir, name)
+        try:
+            mtime = os.stat(source_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._dimensions_lock:
+            cached = self._dimensions.get(name)
+        if cached is None or cached[0] != mtime:
+            with Image.open(source_path) as image:
+                width, height = image.size
+                if _has_rotation(image):
+                    width, height = height, width
+            cached = (mtime, width, height)
+            with self._dimensions_lock:
+                self._dimensions[name] = cached
+
+        return letterbox_geometry(cached[1], cached[2], size)
+
+    def _render(self, source_path, path, size):
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            geometry = letterbox_geometry(image.width, image.height, size)
+            resized = image.resize(
+                (geometry["width"], geometry["height"]), Image.LANCZOS)
+
+            canvas = Image.new("RGB", (size, size), Config.LETTERBOX_COLOR)
+            canvas.paste(resized, (geometry["padX"], geometry["padY"]))
+
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            canvas.save(temp_path, "JPEG", quality=Config.TRAINING_IMAGE_QUALITY)
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+
+def _has_rotation(image):
+    # EXIF Orientation 5-8 đổi chỗ chiều rộng và chiều cao
+    try:
+        return image.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+    except Exception:
+        return False
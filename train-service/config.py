@@ -4,6 +4,16 @@ load_dotenv()
 
 
 class Config:
+    # Train service ghi TrainInfo/TrainingLost vào database của model service
+    DB_HOST = os.getenv("MODEL_DB_HOST", "localhost")
+    DB_PORT = int(os.getenv("MODEL_DB_PORT", "3306"))
+    DB_NAME = os.getenv("MODEL_DB_NAME", "model_db")
+    DB_USER = os.getenv("MODEL_DB_USER", "root")
+    DB_PASSWORD = os.getenv("MODEL_DB_PASSWORD", "")
+    DB_POOL_NAME = "train_pool"
+    DB_POOL_SIZE = int(os.getenv("TRAIN_DB_POOL_SIZE", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("TRAIN_DB_POOL_TIMEOUT", "5"))
+
     TEMPLATE_SERVICE_URL = os.getenv(
         "TEMPLATE_SERVICE_URL", "http://localhost:8003")
     MODEL_SERVICE_URL = os.getenv("MODEL_SERVICE_URL", "http://localhost:8001")
@@ -14,5 +24,96 @@ class Config:
     DEFAULT_EPOCH = int(os.getenv("DEFAULT_EPOCH", "100"))
     DEFAULT_BATCH_SIZE = int(os.getenv("DEFAULT_BATCH_SIZE", "16"))
     DEFAULT_LEARNING_RATE = float(os.getenv("DEFAULT_LEARNING_RATE", "0.001"))
+    DEFAULT_IMAGE_SIZE = int(os.getenv("DEFAULT_IMAGE_SIZE", "640"))
+    TRAIN_OPTIMIZER = os.getenv("TRAIN_OPTIMIZER", "AdamW")
+    # Số layer backbone của YOLOv8 bị đóng băng khi fine-tune với freeze_backbone
+    BACKBONE_FREEZE_LAYERS = int(os.getenv("BACKBONE_FREEZE_LAYERS", "10"))
+
+    # Tải template song song
+    DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+    DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "2"))
+    DOWNLOAD_RETRY_BACKOFF = float(os.getenv("DOWNLOAD_RETRY_BACKOFF", "0.5"))
+    TEMPLATE_BATCH_SIZE = int(os.getenv("TEMPLATE_BATCH_SIZE", "500"))
+
+    # Cache ảnh template dùng chung giữa các lần train
+    IMAGE_CACHE_DIR = os.getenv(
+        "IMAGE_CACHE_DIR", os.path.join(BASE_DIR, "image_cache"))
+    IMAGE_CACHE_MAX_BYTES = int(
+        os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    IMAGE_CACHE_REVALIDATE_AFTER = int(
+        os.getenv("IMAGE_CACHE_REVALIDATE_AFTER", "3600"))
+    # Chu kỳ (giây) quét lại dung lượng cache trên đĩa, vì các worker cùng ghi vào cache
+    IMAGE_CACHE_RESCAN_INTERVAL = int(
+        os.getenv("IMAGE_CACHE_RESCAN_INTERVAL", "60"))
+    # Tải ảnh đã letterbox sẵn ở kích thước train thay vì ảnh gốc
+    USE_TRAINING_IMAGES = os.getenv(
+        "USE_TRAINING_IMAGES", "True").lower() in ('true', '1', 't')
+
+    # Cho phép dùng symlink khi không tạo được hardlink/reflink
+    DATASET_ALLOW_SYMLINK = os.getenv(
+        "DATASET_ALLOW_SYMLINK", "False").lower() in ('true', '1', 't')
+
+    # Kho dataset dựng sẵn, dùng lại khi tập template không đổi
+    DATASET_STORE_DIR = os.getenv(
+        "DATASET_STORE_DIR", os.path.join(BASE_DIR, "dataset_store"))
+    DATASET_STORE_MAX_BYTES = int(
+        os.getenv("DATASET_STORE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+
+    # Scheduler cho các job train
+    MAX_CONCURRENT_TRAININGS = int(os.getenv("MAX_CONCURRENT_TRAININGS", "1"))
+    MAX_TRAINING_QUEUE_DEPTH = int(os.getenv("MAX_TRAINING_QUEUE_DEPTH", "10"))
+    ESTIMATED_EPOCH_SECONDS = float(os.getenv("ESTIMATED_EPOCH_SECONDS", "10"))
+    # Thời gian chờ worker tự dừng trước khi terminate
+    CANCEL_GRACE_SECONDS = float(os.getenv("CANCEL_GRACE_SECONDS", "30"))
+
+    # Chu kỳ ghi trạng thái job từ bộ nhớ xuống status.json (giây)
+    STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "10"))
+
+    # Server-Sent Events
+    EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+    # Số epoch giữa hai lần ghi TrainingLost xuống database
+    METRICS_FLUSH_EPOCHS = int(os.getenv("METRICS_FLUSH_EPOCHS", "25"))
+
+    # Hyperparameter sweep: tổng số core dành cho các trial chạy song song
+    SWEEP_CPU_BUDGET = int(os.getenv("SWEEP_CPU_BUDGET", str(os.cpu_count() or 1)))
+    SWEEP_MAX_PARALLEL = int(os.getenv("SWEEP_MAX_PARALLEL", "4"))
+    SWEEP_MAX_TRIALS = int(os.getenv("SWEEP_MAX_TRIALS", "50"))
+    # Không prune trial trước epoch này
+    SWEEP_PRUNE_AFTER_EPOCHS = int(os.getenv("SWEEP_PRUNE_AFTER_EPOCHS", "3"))
+    # Trial xếp sau job train thường trong hàng đợi của scheduler
+    SWEEP_PRIORITY = int(os.getenv("SWEEP_PRIORITY", "-1"))
+    # Số trial hoàn thành tốt nhất được giữ lại thư mục model và TrainInfo
+    SWEEP_KEEP_TRIALS = int(os.getenv("SWEEP_KEEP_TRIALS", "1"))
+    # Chờ bao lâu trước khi đưa trial vào lại khi hàng đợi scheduler đầy (giây)
+    SWEEP_RETRY_SECONDS = float(os.getenv("SWEEP_RETRY_SECONDS", "10"))
+    SWEEP_DIR = os.getenv("SWEEP_DIR", os.path.join(BASE_DIR, "sweeps"))
+
+    # Export sau khi train: ONNX (thêm "openvino" để export cả OpenVINO IR)
+    EXPORT_AFTER_TRAINING = os.getenv(
+        "EXPORT_AFTER_TRAINING", "True").lower() in ('true', '1', 't')
+    EXPORT_FORMATS = [name.strip() for name in
+                      os.getenv("EXPORT_FORMATS", "onnx").split(",") if name.strip()]
+    # Sai lệch tối đa cho phép giữa output export và PyTorch (tương đối theo độ lớn output)
+    EXPORT_PARITY_TOLERANCE = float(os.getenv("EXPORT_PARITY_TOLERANCE", "0.001"))
+    EXPORT_BENCHMARK_BATCH = int(os.getenv("EXPORT_BENCHMARK_BATCH", "8"))
+    EXPORT_BENCHMARK_RUNS = int(os.getenv("EXPORT_BENCHMARK_RUNS", "10"))
+    EXPORT_BENCHMARK_WARMUP = int(os.getenv("EXPORT_BENCHMARK_WARMUP", "2"))
+
+    # Lượng tử hóa INT8 sau khi export (cũng chạy được qua POST /quantize/{model_id})
+    QUANTIZE_AFTER_EXPORT = os.getenv(
+        "QUANTIZE_AFTER_EXPORT", "False").lower() in ('true', '1', 't')
+    QUANTIZE_CALIBRATION_IMAGES = int(os.getenv("QUANTIZE_CALIBRATION_IMAGES", "100"))
+    # mAP50 được phép giảm tối đa để bản INT8 được promote làm artifact phục vụ
+    QUANTIZE_MAX_MAP_DROP = float(os.getenv("QUANTIZE_MAX_MAP_DROP", "0.01"))
+    # Tập đánh giá nhỏ hơn mức này thì mAP không đủ tin cậy, bản INT8 không được promote
+    QUANTIZE_MIN_EVAL_IMAGES = int(os.getenv("QUANTIZE_MIN_EVAL_IMAGES", "20"))
+    # Màu nền letterbox "R,G,B" (mặc định của ultralytics), phải trùng với
+    # LETTERBOX_COLOR của template service dùng cho ảnh train
+    LETTERBOX_COLOR = tuple(int(value) for value in
+                            os.getenv("LETTERBOX_COLOR", "114,114,114").split(","))
+    # Giữ lớp Detect cuối ở FP32
+    QUANTIZE_EXCLUDE_HEAD = os.getenv(
+        "QUANTIZE_EXCLUDE_HEAD", "True").lower() in ('true', '1', 't')
 
     DEBUG = os.getenv("DEBUG", "True").lower() in ('true', '1', 't')
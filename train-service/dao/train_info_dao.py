@@ -0,0 +1,59 @@
+from utils.db_util import DatabaseUtil
+from models.train_info import TrainInfo
+
+
+class TrainInfoDAO:
+    def __init__(self):
+        self.db_util = DatabaseUtil()
+
+    def create(self, train_info):
+        try:
+            query = """
+            INSERT INTO TrainInfo (epoch, learningRate, batchSize, mae, mse, trainDuration, accuracy, timeTrain)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            params = (train_info.epoch, train_info.learningRate, train_info.batchSize,
+                      train_info.mae, train_info.mse, train_info.trainDuration,
+                      train_info.accuracy, train_info.timeTrain)
+
+            return self.db_util.execute_query(query, params, commit=True)
+        except Exception as e:
+            print(f"Error in create: {e}")
+            raise
+
+    def update_result(self, train_info_id, epoch, accuracy, train_duration):
+        """Cập nhật kết quả cuối cùng sau khi train xong"""
+        try:
+            query = """
+            UPDATE TrainInfo
+            SET epoch = %s, accuracy = %s, trainDuration = %s
+            WHERE idInfo = %s
+            """
+            params = (epoch, accuracy, train_duration, train_info_id)
+
+            self.db_util.execute_query(query, params, commit=True)
+            return True
+        except Exception as e:
+            print(f"Error in update_result: {e}")
+            raise
+
+    def delete_if_unused(self, train_info_id):
+        """Xóa TrainInfo cùng TrainingLost của nó nếu chưa có Model nào gắn vào.
+
+        Dùng cho job kết thúc mà không để lại model (lỗi, bị hủy, trial bị loại).
+        """
+        try:
+            with self.db_util.transaction():
+                used = self.db_util.execute_query(
+                    "SELECT 1 FROM Model WHERE trainInfoId = %s LIMIT 1",
+                    (train_info_id,), fetchone=True)
+                if used:
+                    return False
+                self.db_util.execute_query(
+                    "DELETE FROM TrainingLost WHERE trainInfoId = %s", (train_info_id,))
+                self.db_util.execute_query(
+                    "DELETE FROM TrainInfo WHERE idInfo = %s", (train_info_id,))
+            return True
+        except Exception as e:
+            print(f"Error in delete_if_unused: {e}")
+            raise
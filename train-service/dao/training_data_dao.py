@@ -0,0 +1,25 @@
+import logging
+from utils.db_util import DatabaseUtil
+
+
+class TrainingDataDAO:
+    def __init__(self):
+        self.db_util = DatabaseUtil()
+
+    def get_template_ids_by_train_info_id(self, train_info_id):
+        """Template id trong TrainingData của model được lưu với TrainInfo của job train"""
+        try:
+            query = """
+                SELECT td.fraudTemplateId
+                FROM TrainingData td
+                JOIN Model m ON m.idModel = td.modelId
+                WHERE m.trainInfoId = %s
+                ORDER BY td.idTrainingData
+            """
+            rows = self.db_util.execute_query(
+                query, (train_info_id,), fetchall=True)
+            return [row['fraudTemplateId'] for row in rows] if rows else []
+        except Exception as e:
+            logging.error(
+                f"Error in TrainingDataDAO.get_template_ids_by_train_info_id: {str(e)}")
+            raise
@@ -0,0 +1,41 @@
+import logging
+from utils.db_util import DatabaseUtil
+from models.training_lost import TrainingLost
+
+
+class TrainingLostDAO:
+    def __init__(self):
+        self.db_util = DatabaseUtil()
+
+    def create_many(self, training_losts):
+        """Ghi nhiều epoch trong một transaction bằng executemany"""
+        try:
+            if not training_losts:
+                return 0
+
+            query = """
+                INSERT INTO TrainingLost (epoch, lost, trainInfoId)
+                VALUES (%s, %s, %s)
+            """
+
+            params_list = [
+                (training_lost.epoch, training_lost.lost, training_lost.trainInfoId)
+                for training_lost in training_losts
+            ]
+
+            return self.db_util.execute_many(query, params_list)
+        except Exception as e:
+            logging.error(f"Error in TrainingLostDAO.create_many: {str(e)}")
+            raise
+
+    def delete_after_epoch(self, train_info_id, epoch):
+        """Xóa loss của các epoch sau epoch cho trước (dùng khi resume từ checkpoint)"""
+        try:
+            query = "DELETE FROM TrainingLost WHERE trainInfoId = %s AND epoch > %s"
+            self.db_util.execute_query(
+                query, (train_info_id, epoch), commit=True)
+            return True
+        except Exception as e:
+            logging.error(
+                f"Error in TrainingLostDAO.delete_after_epoch: {str(e)}")
+            raise
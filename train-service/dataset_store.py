@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from config import Config
+
+# Tăng khi đổi cách dựng dataset để các dataset cũ không bị dùng lại
+DATASET_LAYOUT_VERSION = 1
+
+
+def dataset_fingerprint(template_ids, metadata, image_size):
+    """Fingerprint của một dataset: template id, timeUpdate, ảnh và box của từng template"""
+    digest = hashlib.sha1()
+    digest.update(f"v{DATASET_LAYOUT_VERSION}|{image_size}".encode('utf-8'))
+    for template_id in template_ids:
+        template_data = metadata.get(template_id)
+        if template_data is None:
+            digest.update(f"|{template_id}:missing".encode('utf-8'))
+            continue
+        source = template_data.get('trainingImage') or template_data
+        digest.update(json.dumps([
+            template_id,
+            template_data.get('timeUpdate'),
+            source.get('url') or template_data.get('imageUrl'),
+            source.get('boundingBox', [])
+        ], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+class DatasetStore:
+    """Kho dataset YOLO dùng chung giữa các job, khóa theo fingerprint.
+
+    Job train trỏ thẳng vào thư mục trong kho, nên file labels.cache mà
+    ultralytics sinh ra ở lần train đầu cũng được dùng lại ở các lần sau.
+    Khi vượt max_bytes, dataset ít dùng nhất và không có job nào đang dùng
+    sẽ bị xóa.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, store_dir=None, max_bytes=None):
+        self.store_dir = store_dir or Config.DATASET_STORE_DIR
+        self.max_bytes = Config.DATASET_STORE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_use = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._load_existing()
+
+    def acquire(self, fingerprint):
+        """Trả về (dataset_dir, manifest) nếu đã có dataset, đồng thời giữ nó khỏi bị xóa"""
+        dataset_dir = os.path.join(self.store_dir, fingerprint)
+        with self._lock:
+            if fingerprint not in self._entries or not os.path.isdir(dataset_dir):
+                self._entries.pop(fingerprint, None)
+                self._stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(fingerprint)
+            self._in_use[fingerprint] = self._in_use.get(fingerprint, 0) + 1
+            self._stats["hits"] += 1
+
+        manifest = self._read_manifest(dataset_dir)
+        # labels.cache có thể đã được thêm sau lần dựng đầu tiên
+        size = _dir_size(dataset_dir)
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries[fingerprint] = size
+        _touch(os.path.join(dataset_dir, self.MANIFEST_FILE))
+        return dataset_dir, manifest
+
+    def staging_dir(self, fingerprint):
+        path = os.path.join(
+            self.store_dir, f".{fingerprint}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def final_dir(self, fingerprint):
+        return os.path.join(self.store_dir, fingerprint)
+
+    def commit(self, fingerprint, staging_dir, manifest):
+        """Đưa dataset vừa dựng vào kho và giữ nó cho job hiện tại"""
+        dataset_dir = self.final_dir(fingerprint)
+        manifest = dict(manifest, fingerprint=fingerprint, created_at=time.time())
+        with open(os.path.join(staging_dir, self.MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(staging_dir, dataset_dir)
+        except OSError:
+            # Job khác đã dựng cùng dataset trước, dùng bản đó
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            manifest = self._read_manifest(dataset_dir) or manifest
+
+        size = _dir_size(dataset_dir)
+        with self._lock:
+            self._entries[fingerprint] = size
+            self._entries.move_to_end(fingerprint)
+            self._in_use[fingerprint] = self._in_use.get(fingerprint, 0) + 1
+            evicted = self._evict()
+        for path in evicted:
+            shutil.rmtree(path, ignore_errors=True)
+        return dataset_dir, manifest
+
+    def release(self, fingerprint):
+        if not fingerprint:
+            return
+        with self._lock:
+            count = self._in_use.get(fingerprint, 0) - 1
+            if count > 0:
+                self._in_use[fingerprint] = count
+            else:
+                self._in_use.pop(fingerprint, None)
+            evicted = self._evict()
+        for path in evicted:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        datasets=len(self._entries),
+                        in_use=len(self._in_use),
+                        size_bytes=sum(self._entries.values()),
+                        max_bytes=self.max_bytes)
+
+    def _evict(self):
+        """Chọn các dataset cần xóa (gọi khi đang giữ lock), trả về danh sách thư mục"""
+        evicted = []
+        total = sum(self._entries.values())
+        for fingerprint in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if fingerprint in self._in_use:
+                continue
+            total -= self._entries.pop(fingerprint)
+            self._stats["evictions"] += 1
+            evicted.append(os.path.join(self.store_dir, fingerprint))
+        return evicted
+
+    def _read_manifest(self, dataset_dir):
+        try:
+            with open(os.path.join(dataset_dir, self.MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_existing(self):
+        datasets = []
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            if name.startswith('.'):
+                # Thư mục tạm của lần dựng bị gián đoạn
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            manifest_path = os.path.join(path, self.MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                continue
+            datasets.append((os.path.getmtime(manifest_path), name, _dir_size(path)))
+
+        for _, name, size in sorted(datasets):
+            self._entries[name] = size
+        for path in self._evict():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+_dataset_store = None
+_dataset_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    global _dataset_store
+    with _dataset_store_lock:
+        if _dataset_store is None:
+            _dataset_store = DatasetStore()
+        return _dataset_store
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import statistics
+from datetime import datetime
+from config import Config
+
+EXPORT_FILE = "export.json"
+
+
+def export_model(weights_path, image_size=None, formats=None):
+    """Export weights sang ONNX (và OpenVINO nếu được yêu cầu) cạnh file .pt.
+
+    Mỗi artifact được kiểm tra output so với PyTorch và đo latency trên CPU
+    với batch 1 và batch EXPORT_BENCHMARK_BATCH. Kết quả được ghi vào
+    export.json trong thư mục weights và trả về dạng dict.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    image_size = image_size or Config.DEFAULT_IMAGE_SIZE
+    formats = formats or Config.EXPORT_FORMATS
+    batch = Config.EXPORT_BENCHMARK_BATCH
+
+    yolo = YOLO(weights_path)
+    torch_model = yolo.model.float().eval()
+
+    inputs = benchmark_inputs(image_size)
+
+    def run_torch(array):
+        with torch.no_grad():
+            output = torch_model(torch.from_numpy(array))
+        return (output[0] if isinstance(output, (list, tuple)) else output).numpy()
+
+    reference = run_torch(inputs[1])
+    artifacts = {
+        "pytorch": {
+            "path": weights_path,
+            "size_bytes": os.path.getsize(weights_path),
+            "latency_ms": benchmark_latency(run_torch, inputs)
+        }
+    }
+
+    for export_format in formats:
+        started = time.time()
+        try:
+            runner, path = _export(yolo, export_format, image_size)
+            output = runner(inputs[1])
+            artifacts[export_format] = {
+                "path": path,
+                "size_bytes": _path_size(path),
+                "export_seconds": round(time.time() - started, 2),
+                "parity": _parity(reference, output),
+                "latency_ms": benchmark_latency(runner, inputs)
+            }
+        except Exception as e:
+            artifacts[export_format] = {"error": str(e)}
+
+    valid = {name: artifact for name, artifact in artifacts.items()
+             if "latency_ms" in artifact and
+             artifact.get("parity", {"passed": True})["passed"]}
+    fastest = min(valid, key=lambda name: valid[name]["latency_ms"]["batch_1"]) \
+        if valid else None
+
+    result = {
+        "image_size": image_size,
+        "benchmark_batch": batch,
+        "exported_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "artifacts": artifacts,
+        "fastest": fastest,
+        # Artifact model service dùng để predict, chỉ đổi khi được promote
+        "serving": "pytorch"
+    }
+    weights_dir = os.path.dirname(weights_path)
+    keep_promoted_artifacts(read_export_file(weights_dir), result)
+    write_export_file(weights_dir, result)
+    return result
+
+
+# Artifact do quantize_model sinh ra, export lại không tạo lại các file này
+QUANTIZED_ARTIFACTS = ("onnx_int8", "onnx_int8_candidate")
+
+
+def keep_promoted_artifacts(previous, result):
+    """Export lại không được lặng lẽ hạ bản INT8 đã promote về pytorch: giữ các
+    artifact INT8 của export.json cũ (nếu file còn) và artifact đang phục vụ"""
+    if not previous:
+        return result
+    artifacts = result["artifacts"]
+    for name in QUANTIZED_ARTIFACTS:
+        artifact = (previous.get("artifacts") or {}).get(name)
+        if artifact and os.path.exists(artifact.get("path", "")):
+            artifacts[name] = artifact
+    serving = previous.get("serving")
+    if serving in artifacts and "error" not in artifacts[serving]:
+        result["serving"] = serving
+    return result
+
+
+def read_export_file(weights_dir):
+    try:
+        with open(os.path.join(weights_dir, EXPORT_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_export_file(weights_dir, export_info):
+    export_file = os.path.join(weights_dir, EXPORT_FILE)
+    temp_file = export_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(export_info, f, indent=2)
+    os.replace(temp_file, export_file)
+
+
+def benchmark_inputs(image_size):
+    """Input cố định cho parity và benchmark: batch 1 và batch EXPORT_BENCHMARK_BATCH"""
+    import numpy as np
+
+    batch = Config.EXPORT_BENCHMARK_BATCH
+    rng = np.random.default_rng(0)
+    return {
+        1: rng.random((1, 3, image_size, image_size), dtype=np.float32),
+        batch: rng.random((batch, 3, image_size, image_size), dtype=np.float32)
+    }
+
+
+def onnx_runner(path):
+    """Hàm chạy một batch numpy qua model ONNX bằng onnxruntime trên CPU"""
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(
+        path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    def run(array):
+        return session.run(None, {input_name: array})[0]
+    return run
+
+
+def _export(yolo, export_format, image_size):
+    """Export một định dạng, trả về (hàm chạy batch numpy, đường dẫn artifact)"""
+    if export_format == "onnx":
+        # dynamic để cùng một file chạy được cả batch 1 và batch lớn
+        path = yolo.export(format="onnx", imgsz=image_size, dynamic=True)
+        return onnx_runner(path), path
+
+    if export_format == "openvino":
+        from openvino.runtime import Core
+
+        path = yolo.export(format="openvino", imgsz=image_size, dynamic=True)
+        xml_path = next(os.path.join(path, name) for name in os.listdir(path)
+                        if name.endswith(".xml"))
+        compiled = Core().compile_model(xml_path, "CPU")
+
+        def run(array):
+            return next(iter(compiled(array).values()))
+        return run, path
+
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def _parity(reference, output):
+    import numpy as np
+
+    difference = np.abs(reference - output)
+    scale = max(1.0, float(np.abs(reference).max()))
+    max_abs_diff = float(difference.max())
+    return {
+        "max_abs_diff": round(max_abs_diff, 6),
+        "mean_abs_diff": round(float(difference.mean()), 6),
+        "tolerance": Config.EXPORT_PARITY_TOLERANCE,
+        "passed": max_abs_diff <= Config.EXPORT_PARITY_TOLERANCE * scale
+    }
+
+
+def benchmark_latency(run, inputs):
+    """Median latency (ms) sau vài lần chạy khởi động"""
+    latency = {}
+    for batch, array in inputs.items():
+        for _ in range(Config.EXPORT_BENCHMARK_WARMUP):
+            run(array)
+        timings = []
+        for _ in range(Config.EXPORT_BENCHMARK_RUNS):
+            started = time.perf_counter()
+            run(array)
+            timings.append((time.perf_counter() - started) * 1000)
+        latency[f"batch_{batch}"] = round(statistics.median(timings), 2)
+        if batch > 1:
+            latency["per_image_batched"] = round(
+                latency[f"batch_{batch}"] / batch, 2)
+    return latency
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa trong tiến trình
+    fcntl = None
+
+
+class ImageCache:
+    """Cache ảnh template dùng chung cho mọi lần train.
+
+    Mỗi ảnh được lưu theo key (template id + timeUpdate + imageUrl), nên khi
+    template được cập nhật thì key đổi và ảnh cũ sẽ bị LRU loại bỏ dần.
+    Entry quá hạn được kiểm tra lại bằng ETag / If-Modified-Since.
+
+    API và các worker train là những tiến trình riêng cùng ghi vào cache_dir,
+    nên không có index chung: mỗi ảnh <key>.jpg có file <key>.json chứa ETag /
+    Last-Modified, được ghi bằng os.replace. mtime của ảnh là thời điểm dùng
+    gần nhất; dung lượng và thứ tự LRU được đọc lại từ đĩa khi dọn cache, dưới
+    file lock dùng chung giữa các tiến trình.
+    """
+
+    LOCK_FILE = ".lock"
+
+    def __init__(self, cache_dir=None, max_bytes=None, revalidate_after=None,
+                 rescan_interval=None):
+        self.cache_dir = cache_dir or Config.IMAGE_CACHE_DIR
+        self.max_bytes = Config.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.revalidate_after = (Config.IMAGE_CACHE_REVALIDATE_AFTER
+                                 if revalidate_after is None else revalidate_after)
+        self.rescan_interval = (Config.IMAGE_CACHE_RESCAN_INTERVAL
+                                if rescan_interval is None else rescan_interval)
+        self._lock = threading.Lock()
+        # Ước lượng dung lượng: lần quét gần nhất + phần tiến trình này ghi thêm
+        self._total_bytes = 0
+        self._scanned_at = 0
+        self._stats = {"hits": 0, "misses": 0,
+                       "revalidated": 0, "evictions": 0,
+                       "bytes_downloaded": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._evict()
+
+    def fetch(self, template_id, time_update, image_url, session):
+        """Trả về (cache_path, downloaded_bytes, hit)"""
+        key = self._make_key(template_id, time_update, image_url)
+        path = os.path.join(self.cache_dir, key + ".jpg")
+
+        entry = self._read_meta(key) if os.path.exists(path) else None
+        if entry:
+            _touch(path)
+            if time.time() - entry["validated_at"] < self.revalidate_after:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return path, 0, True
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(image_url, headers=headers, timeout=30)
+
+        if entry and response.status_code == 304 and os.path.exists(path):
+            self._write_meta(key, dict(entry, validated_at=time.time()))
+            with self._lock:
+                self._stats["hits"] += 1
+                self._stats["revalidated"] += 1
+            return path, 0, True
+
+        response.raise_for_status()
+        content = response.content
+
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+
+        with self._lock:
+            with self._file_lock():
+                replaced = _file_size(path) or 0
+                os.replace(temp_path, path)
+                self._write_meta(key, {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "validated_at": time.time()
+                })
+                self._total_bytes += len(content) - replaced
+                if self._total_bytes > self.max_bytes or \
+                        time.time() - self._scanned_at >= self.rescan_interval:
+                    self._evict(keep=key)
+            self._stats["misses"] += 1
+            self._stats["bytes_downloaded"] += len(content)
+
+        return path, len(content), False
+
+    def stats(self):
+        with self._lock:
+            entries = self._scan()
+            return dict(self._stats,
+                        entries=len(entries),
+                        size_bytes=sum(size for _, _, size in entries),
+                        max_bytes=self.max_bytes)
+
+    def _make_key(self, template_id, time_update, image_url):
+        digest = hashlib.sha1(
+            f"{time_update}|{image_url}".encode('utf-8')).hexdigest()[:16]
+        return f"{template_id}_{digest}"
+
+    def _evict(self, keep=None):
+        """Quét lại cache trên đĩa và xóa ảnh ít dùng nhất cho tới khi đủ ngân sách
+        (gọi khi đang giữ cả _lock lẫn file lock)"""
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        count = len(entries)
+        for _, key, size in entries:
+            if total <= self.max_bytes or count <= 1:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= size
+            count -= 1
+            self._stats["evictions"] += 1
+        self._total_bytes = total
+        self._scanned_at = time.time()
+
+    def _scan(self):
+        """Các ảnh đang có trong cache: [(mtime, key, size)] theo thứ tự dùng cũ nhất trước"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for item in it:
+                if not item.name.endswith(".jpg"):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, item.name[:-len(".jpg")], stat.st_size))
+        entries.sort()
+        return entries
+
+    def _remove(self, key):
+        for suffix in (".jpg", ".json"):
+            try:
+                os.remove(os.path.join(self.cache_dir, key + suffix))
+            except FileNotFoundError:
+                pass
+
+    def _read_meta(self, key):
+        try:
+            with open(os.path.join(self.cache_dir, key + ".json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key, entry):
+        meta_path = os.path.join(self.cache_dir, key + ".json")
+        temp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, meta_path)
+        except Exception as e:
+            print(f"Error saving image cache entry {key}: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        """Khóa độc quyền cache_dir giữa các tiến trình"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.cache_dir, self.LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache()
+        return _image_cache
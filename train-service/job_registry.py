@@ -0,0 +1,153 @@
+import os
+import copy
+import threading
+import time
+from datetime import datetime
+from config import Config
+from train_model import write_status_file, read_status_file
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Trạng thái export / quantize (ModelTaskJob) trong status của job đã train xong
+MODEL_TASK_FIELDS = ("export_info", "quantization_info")
+
+
+class JobRegistry:
+    """Giữ trạng thái các job train trong bộ nhớ để /status không phải đọc đĩa.
+
+    Trạng thái được ghi xuống status.json theo chu kỳ flush_interval, hoặc
+    ngay lập tức khi job chuyển sang trạng thái kết thúc.
+    """
+
+    def __init__(self, base_dir=None, flush_interval=None):
+        self.base_dir = base_dir or Config.SHARED_MODEL_DIR
+        self.flush_interval = (Config.STATUS_FLUSH_INTERVAL
+                               if flush_interval is None else flush_interval)
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+        flusher = threading.Thread(
+            target=self._flush_loop, name="status-flusher", daemon=True)
+        flusher.start()
+
+    def update(self, status_file, status_data):
+        model_id = str(status_data.get('model_id'))
+        terminal = status_data.get('status') in TERMINAL_STATUSES
+
+        with self._lock:
+            entry = self._jobs.setdefault(model_id, {
+                "file": status_file, "last_flush": 0.0})
+            entry["file"] = status_file
+            entry["status"] = copy.deepcopy(status_data)
+            entry["dirty"] = True
+            due = time.time() - entry["last_flush"] >= self.flush_interval
+
+        if terminal or due:
+            self.flush(model_id)
+
+    def get(self, model_id):
+        model_id = str(model_id)
+        with self._lock:
+            entry = self._jobs.get(model_id)
+            if entry:
+                return copy.deepcopy(entry["status"])
+
+        # Chưa có trong bộ nhớ: đọc từ đĩa một lần rồi giữ lại
+        status_file = os.path.join(self.base_dir, model_id, 'status.json')
+        status_data = read_status_file(status_file)
+        if status_data is None:
+            return None
+
+        with self._lock:
+            self._jobs.setdefault(model_id, {
+                "file": status_file, "status": status_data,
+                "dirty": False, "last_flush": time.time()})
+            return copy.deepcopy(self._jobs[model_id]["status"])
+
+    def claim_task(self, model_id, field, busy_fields=MODEL_TASK_FIELDS):
+        """Đặt status[field] = {"status": "queued"} cho job đã train xong nếu không
+        field nào trong busy_fields đang queued/running.
+
+        Kiểm tra và ghi trong cùng _lock trên bản trong registry (không phải bản
+        copy của get()), nên hai request đồng thời chỉ một request thắng.
+        Trả về (status đã cập nhật, giá trị cũ của field), hoặc (None, None) nếu
+        không claim được.
+        """
+        model_id = str(model_id)
+        if self.get(model_id) is None:
+            return None, None
+
+        with self._lock:
+            entry = self._jobs.get(model_id)
+            if entry is None or entry["status"].get('status') != 'completed':
+                return None, None
+            if any((entry["status"].get(name) or {}).get('status') in ('queued', 'running')
+                   for name in busy_fields):
+                return None, None
+            previous = entry["status"].get(field)
+            entry["status"][field] = {"status": "queued"}
+            entry["dirty"] = True
+            return copy.deepcopy(entry["status"]), previous
+
+    def forget(self, model_id):
+        with self._lock:
+            self._jobs.pop(str(model_id), None)
+
+    def flush(self, model_id=None):
+        with self._lock:
+            model_ids = [str(model_id)] if model_id is not None else list(self._jobs)
+            pending = []
+            for key in model_ids:
+                entry = self._jobs.get(key)
+                if entry and entry["dirty"]:
+                    entry["dirty"] = False
+                    entry["last_flush"] = time.time()
+                    pending.append((entry["file"], copy.deepcopy(entry["status"])))
+
+        for status_file, status_data in pending:
+            write_status_file(status_file, status_data)
+
+    def recover(self):
+        """Nạp lại trạng thái từ status.json khi service khởi động.
+
+        Job đang dở dang lúc service dừng không còn worker nào chạy nên được
+        đánh dấu failed.
+        """
+        if not os.path.isdir(self.base_dir):
+            return
+
+        for model_id in os.listdir(self.base_dir):
+            status_file = os.path.join(self.base_dir, model_id, 'status.json')
+            status_data = read_status_file(status_file)
+            if status_data is None:
+                continue
+
+            # Export / quantize đang chờ hoặc chạy cũng mất worker
+            interrupted_tasks = [
+                field for field in MODEL_TASK_FIELDS
+                if (status_data.get(field) or {}).get('status') in ('queued', 'running')]
+
+            if status_data.get('status') not in TERMINAL_STATUSES:
+                status_data['status'] = 'failed'
+                status_data['error'] = 'Training interrupted by service restart'
+                status_data['end_time'] = datetime.now().strftime(
+                    '%Y-%m-%d %H:%M:%S')
+                write_status_file(status_file, status_data)
+            elif interrupted_tasks:
+                for field in interrupted_tasks:
+                    status_data[field] = {
+                        'status': 'failed',
+                        'error': 'Task interrupted by service restart'}
+                write_status_file(status_file, status_data)
+
+            with self._lock:
+                self._jobs[model_id] = {
+                    "file": status_file, "status": status_data,
+                    "dirty": False, "last_flush": time.time()}
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing training status: {e}")
@@ -0,0 +1,171 @@
+import os
+from config import Config
+from export_model import (export_model, onnx_runner, benchmark_inputs, benchmark_latency,
+                          read_export_file, write_export_file)
+
+INT8_FILENAME = "best_int8.onnx"
+# Bản INT8 chưa được promote không ghi đè bản đang phục vụ
+INT8_CANDIDATE_FILENAME = "best_int8.candidate.onnx"
+
+
+def load_calibration_image(path, size):
+    """Đọc ảnh, letterbox về size x size và chuẩn hóa như tiền xử lý của ultralytics"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        scale = min(size / image.width, size / image.height)
+        width = max(1, round(image.width * scale))
+        height = max(1, round(image.height * scale))
+        canvas = Image.new("RGB", (size, size), Config.LETTERBOX_COLOR)
+        canvas.paste(image.resize((width, height), Image.BILINEAR),
+                     ((size - width) // 2, (size - height) // 2))
+
+    array = np.asarray(canvas, dtype=np.float32) / 255.0
+    return array.transpose(2, 0, 1)[None]
+
+
+class TemplateCalibrationReader:
+    """Nguồn dữ liệu calibration cho onnxruntime: mỗi lần get_next trả về một ảnh template"""
+
+    def __init__(self, input_name, image_paths, image_size):
+        self.input_name = input_name
+        self.image_paths = image_paths
+        self.image_size = image_size
+        self._iterator = iter(image_paths)
+
+    def get_next(self):
+        for path in self._iterator:
+            try:
+                return {self.input_name: load_calibration_image(path, self.image_size)}
+            except Exception as e:
+                print(f"Error loading calibration image {path}: {e}")
+        return None
+
+    def rewind(self):
+        self._iterator = iter(self.image_paths)
+
+
+def quantize_model(weights_path, calibration_images, data_yaml, work_dir, max_map_drop=None,
+                   eval_images=None, min_eval_images=None):
+    """Lượng tử hóa INT8 (static, QDQ) model ONNX FP32 của weights_path.
+
+    Scale của activation được calibrate trên calibration_images. Bản INT8 được so
+    với FP32 về mAP trên tập val của data_yaml (eval_images ảnh) và về latency;
+    chỉ được promote làm artifact phục vụ (export.json "serving") khi tập val có
+    ít nhất min_eval_images ảnh và mAP50 giảm không quá max_map_drop.
+    """
+    import onnxruntime
+    from onnxruntime.quantization import (quantize_static, QuantFormat, QuantType,
+                                          CalibrationMethod)
+
+    max_map_drop = Config.QUANTIZE_MAX_MAP_DROP if max_map_drop is None else max_map_drop
+    min_eval_images = (Config.QUANTIZE_MIN_EVAL_IMAGES
+                       if min_eval_images is None else min_eval_images)
+    weights_dir = os.path.dirname(weights_path)
+    os.makedirs(work_dir, exist_ok=True)
+
+    export_info = read_export_file(weights_dir) or {}
+    fp32_artifact = export_info.get("artifacts", {}).get("onnx") or {}
+    if not os.path.exists(fp32_artifact.get("path") or ""):
+        export_info = export_model(weights_path, formats=["onnx"])
+        fp32_artifact = export_info["artifacts"]["onnx"]
+        if "error" in fp32_artifact:
+            raise RuntimeError(f"ONNX export failed: {fp32_artifact['error']}")
+    fp32_path = fp32_artifact["path"]
+    image_size = export_info["image_size"]
+
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    candidate_path = os.path.join(weights_dir, INT8_CANDIDATE_FILENAME)
+    quantize_static(
+        fp32_path, candidate_path,
+        TemplateCalibrationReader(input_name, calibration_images, image_size),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=_head_nodes(weights_path, fp32_path)
+        if Config.QUANTIZE_EXCLUDE_HEAD else [])
+
+    inputs = benchmark_inputs(image_size)
+    fp32 = _evaluate(fp32_path, data_yaml, image_size, work_dir, "val_fp32")
+    fp32["latency_ms"] = benchmark_latency(onnx_runner(fp32_path), inputs)
+    int8 = _evaluate(candidate_path, data_yaml, image_size, work_dir, "val_int8")
+    int8["latency_ms"] = benchmark_latency(onnx_runner(candidate_path), inputs)
+
+    map50_drop = round(fp32["map50"] - int8["map50"], 4)
+    promotion_blocked = promotion_blocker(map50_drop, max_map_drop,
+                                          eval_images, min_eval_images)
+    promoted = promotion_blocked is None
+    int8_path = candidate_path
+    if promoted:
+        int8_path = os.path.join(weights_dir, INT8_FILENAME)
+        os.replace(candidate_path, int8_path)
+    fp32["path"] = fp32_path
+    int8["path"] = int8_path
+    fp32["size_bytes"] = os.path.getsize(fp32_path)
+    int8["size_bytes"] = os.path.getsize(int8_path)
+
+    result = {
+        "image_size": image_size,
+        "calibration_images": len(calibration_images),
+        "fp32": fp32,
+        "int8": int8,
+        "map50_drop": map50_drop,
+        "map50_95_drop": round(fp32["map50_95"] - int8["map50_95"], 4),
+        "speedup": {key: round(fp32["latency_ms"][key] / int8["latency_ms"][key], 2)
+                    for key in fp32["latency_ms"] if int8["latency_ms"].get(key)},
+        "size_ratio": round(int8["size_bytes"] / fp32["size_bytes"], 3),
+        "max_map_drop": max_map_drop,
+        "eval_images": eval_images,
+        "min_eval_images": min_eval_images,
+        "promoted": promoted,
+        "promotion_blocked": promotion_blocked
+    }
+
+    artifacts = export_info.setdefault("artifacts", {})
+    if promoted:
+        artifacts["onnx_int8"] = dict(int8, map50_drop=map50_drop)
+        artifacts.pop("onnx_int8_candidate", None)
+        export_info["serving"] = "onnx_int8"
+    else:
+        artifacts["onnx_int8_candidate"] = dict(int8, map50_drop=map50_drop)
+    result["serving"] = export_info.get("serving", "pytorch")
+    write_export_file(weights_dir, export_info)
+    return result
+
+
+def promotion_blocker(map50_drop, max_map_drop, eval_images, min_eval_images):
+    """Lý do không promote bản INT8, None nếu được promote"""
+    if eval_images is None or eval_images < min_eval_images:
+        return (f"Evaluation set has {eval_images or 0} images, "
+                f"at least {min_eval_images} required")
+    if map50_drop > max_map_drop:
+        return f"mAP50 dropped by {map50_drop}, more than {max_map_drop}"
+    return None
+
+
+def _head_nodes(weights_path, onnx_path):
+    """Node của lớp Detect cuối (giải mã box, sigmoid class) được giữ FP32"""
+    import onnx
+    from ultralytics import YOLO
+
+    head_index = len(YOLO(weights_path).model.model) - 1
+    prefix = f"/model.{head_index}/"
+    return [node.name for node in onnx.load(onnx_path).graph.node
+            if node.name.startswith(prefix)]
+
+
+def _evaluate(model_path, data_yaml, image_size, work_dir, name):
+    from ultralytics import YOLO
+
+    metrics = YOLO(model_path, task='detect').val(
+        data=data_yaml, imgsz=image_size, batch=1, project=work_dir, name=name,
+        exist_ok=True, plots=False, verbose=False)
+    return {
+        "map50": round(float(metrics.box.map50), 4),
+        "map50_95": round(float(metrics.box.map), 4)
+    }
@@ -0,0 +1,489 @@
+import os
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timedelta
+from config import Config
+from training_metrics import flush_relayed_losses
+from train_model import (prepare_training, prepare_resume, run_training_process,
+                         run_model_task_process, safe_update_status, get_training_status,
+                         release_dataset, discard_train_info)
+
+# spawn để worker process không kế thừa thread/lock của FastAPI process
+_mp_context = multiprocessing.get_context("spawn")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class DuplicateJobError(Exception):
+    pass
+
+
+class TrainingJob:
+    # Job train có status.json riêng, được ghi trạng thái queued khi đang chờ
+    writes_queue_status = True
+
+    def __init__(self, model_id, model_name, model_type, version, template_ids,
+                 epochs, batch_size, image_size, learning_rate, priority=0,
+                 warm_start=None, resume_status=None, cpu_threads=None, export=None,
+                 tag=None, cpu_budget=None, on_finish=None, pool="training"):
+        self.model_id = str(model_id)
+        self.model_name = model_name
+        self.model_type = model_type
+        self.version = version
+        self.template_ids = template_ids
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.image_size = image_size
+        self.learning_rate = learning_rate
+        self.priority = priority
+        self.warm_start = warm_start
+        # Status của lần train bị dừng, nếu job này là resume từ last.pt
+        self.resume_status = resume_status
+        self.cpu_threads = cpu_threads
+        # None: theo Config.EXPORT_AFTER_TRAINING
+        self.export = export
+        # Nhóm của job (vd. "sweep:<id>"), hiện trong /queue
+        self.tag = tag
+        # Tổng số core cho job: cpu_threads được chia theo số job đang chạy lúc bắt đầu
+        self.cpu_budget = cpu_budget
+        # Gọi on_finish(job) khi job rời scheduler (chạy xong hoặc bị bỏ khỏi hàng đợi)
+        self.on_finish = on_finish
+        # Nhóm slot của scheduler: "training" (MAX_CONCURRENT_TRAININGS) hoặc "sweep"
+        self.pool = pool
+        self.submit_time = datetime.now()
+        self.start_time = None
+        self.cancel_event = _mp_context.Event()
+        self.process = None
+
+    def run(self):
+        """Chuẩn bị dữ liệu trong thread hiện tại, sau đó train trong worker process riêng"""
+        if self.resume_status:
+            status = prepare_resume(self.resume_status)
+        else:
+            status = prepare_training(
+                self.model_id, self.model_name, self.epochs, self.template_ids,
+                self.image_size, self.version)
+        if status["status"] != "running":
+            return {'success': False, 'message': status.get('error')}
+
+        # Lưu lại để resume dùng đúng tham số của lần train này
+        status["batch_size"] = self.batch_size
+        status["learning_rate"] = self.learning_rate
+        if self.warm_start:
+            status["warm_start"] = dict(self.warm_start)
+        if self.cpu_threads:
+            status["cpu_threads"] = self.cpu_threads
+        if self.export is not None:
+            status["export"] = self.export
+
+        try:
+            return self._train(status)
+        finally:
+            release_dataset(status)
+
+    def _train(self, status):
+        status_file = os.path.join(status["model_dir"], 'status.json')
+        if self.cancel_event.is_set():
+            status["status"] = "cancelled"
+            status["end_time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            safe_update_status(status_file, status)
+            return {'success': False, 'message': 'Training cancelled'}
+
+        # Worker không ghi đĩa, mọi trạng thái được gửi về registry của process này
+        event_queue = _mp_context.Queue()
+        relay = threading.Thread(
+            target=self._relay_events, args=(event_queue,), daemon=True)
+        relay.start()
+
+        self.process = _mp_context.Process(
+            target=run_training_process,
+            args=(status, self.epochs, self.batch_size,
+                  self.cancel_event, event_queue, self.learning_rate),
+            name=f"train-{self.model_id}"
+        )
+        self.process.start()
+        self.process.join()
+
+        event_queue.put(None)
+        relay.join()
+
+        # Worker bị kill (OOM, terminate) sẽ không kịp ghi trạng thái cuối
+        final_status = get_training_status(self.model_id)
+        if final_status.get("status") == "not_found":
+            final_status = status
+        if final_status.get("status") != "completed":
+            # Không còn checkpoint thì bỏ TrainInfo, ngược lại ghi nốt loss cho lần resume
+            if discard_train_info(final_status) or flush_relayed_losses(final_status):
+                safe_update_status(status_file, final_status)
+        if final_status.get("status") not in ("completed", "failed", "cancelled"):
+            final_status["status"] = ("cancelled" if self.cancel_event.is_set()
+                                      else "failed")
+            if final_status["status"] == "failed":
+                final_status["error"] = f"Training worker exited with code {self.process.exitcode}"
+            final_status["end_time"] = datetime.now().strftime(
+                '%Y-%m-%d %H:%M:%S')
+            safe_update_status(status_file, final_status)
+
+        return {'success': final_status["status"] == "completed",
+                'model_id': self.model_id}
+
+    def cancel(self):
+        """Báo worker dừng ở batch kế tiếp, quá thời gian chờ thì terminate"""
+        self.cancel_event.set()
+        process = self.process
+        if process is not None and process.is_alive():
+            threading.Thread(target=self._terminate_after_grace,
+                             args=(process,), daemon=True).start()
+
+    def _terminate_after_grace(self, process):
+        process.join(Config.CANCEL_GRACE_SECONDS)
+        if process.is_alive():
+            process.terminate()
+            process.join(5)
+        if process.is_alive():
+            process.kill()
+
+    def _relay_events(self, event_queue):
+        while True:
+            item = event_queue.get()
+            if item is None:
+                return
+            status_file, status_data = item
+            if self.cancel_event.is_set() and \
+                    status_data.get("status") in ("running", "cancelled"):
+                # Job chỉ là cancelled khi worker đã thoát (xem _train)
+                status_data["status"] = "cancelling"
+                status_data.pop("end_time", None)
+            safe_update_status(status_file, status_data)
+
+class ModelTaskJob(TrainingJob):
+    """Export hoặc lượng tử hóa model đã train xong (task "export" / "quantize").
+
+    Chạy trong worker process spawn riêng qua cùng hàng đợi với job train, nên
+    chịu chung giới hạn MAX_CONCURRENT_TRAININGS. Id của job là
+    "<model_id>-<task>"; trạng thái nằm trong status[info_field] của job train,
+    đã được JobRegistry.claim_task đặt thành queued trước khi submit.
+    """
+
+    writes_queue_status = False
+    INFO_FIELDS = {"export": "export_info", "quantize": "quantization_info"}
+
+    def __init__(self, model_id, task, options=None, priority=0):
+        super().__init__(f"{model_id}-{task}", None, None, None, [],
+                         0, None, None, None, priority=priority, tag=task)
+        self.target_id = str(model_id)
+        self.task = task
+        self.info_field = self.INFO_FIELDS[task]
+        self.options = options or {}
+        self.on_finish = self._finished
+
+    @classmethod
+    def is_task_id(cls, job_id):
+        """Id dạng "<model_id>-export" / "<model_id>-quantize" của job task"""
+        prefix, _, task = str(job_id).rpartition("-")
+        return bool(prefix) and task in cls.INFO_FIELDS
+
+    def run(self):
+        status = get_training_status(self.target_id)
+        if status.get("status") != "completed":
+            return {'success': False, 'message': f"Training {self.target_id} is not completed"}
+
+        event_queue = _mp_context.Queue()
+        relay = threading.Thread(
+            target=self._relay_events, args=(event_queue,), daemon=True)
+        relay.start()
+
+        self.process = _mp_context.Process(
+            target=run_model_task_process,
+            args=(status, self.task, self.options, event_queue),
+            name=f"{self.task}-{self.target_id}"
+        )
+        self.process.start()
+        self.process.join()
+
+        event_queue.put(None)
+        relay.join()
+        return {'success': self.process.exitcode == 0, 'model_id': self.target_id}
+
+    def _finished(self, job):
+        """Worker bị hủy, bị kill hoặc job bị bỏ khỏi hàng đợi: ghi trạng thái cuối
+        thay cho worker"""
+        status = get_training_status(self.target_id)
+        info = status.get(self.info_field) or {}
+        if status.get("status") == "not_found" or \
+                info.get("status") not in ("queued", "running"):
+            return
+        if self.start_time is None or self.cancel_event.is_set():
+            status[self.info_field] = {"status": "cancelled"}
+        else:
+            exitcode = self.process.exitcode if self.process is not None else None
+            status[self.info_field] = {
+                "status": "failed",
+                "error": f"{self.task.capitalize()} worker exited with code {exitcode}"}
+        safe_update_status(os.path.join(
+            Config.SHARED_MODEL_DIR, self.target_id, 'status.json'), status)
+
+
+class TrainingScheduler:
+    """Giới hạn số job train chạy đồng thời, các job còn lại xếp hàng theo
+    priority (cao trước) rồi FIFO.
+
+    Trial của sweep (pool "sweep") có sweep_slots slot riêng, giới hạn bởi
+    ngân sách core của sweep, nên chạy song song được mà không chiếm slot của
+    job train thường (pool "training", max_concurrent slot).
+    """
+
+    def __init__(self, max_concurrent=None, max_queue_depth=None, sweep_slots=None):
+        self.max_concurrent = max_concurrent or Config.MAX_CONCURRENT_TRAININGS
+        self.sweep_slots = (min(Config.SWEEP_MAX_PARALLEL, Config.SWEEP_CPU_BUDGET)
+                            if sweep_slots is None else sweep_slots)
+        self._slots = {"training": self.max_concurrent, "sweep": self.sweep_slots}
+        self.max_queue_depth = (Config.MAX_TRAINING_QUEUE_DEPTH
+                                if max_queue_depth is None else max_queue_depth)
+        self._queue = []
+        self._running = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        # Ghi status.json của hàng đợi ngoài _condition; _publish_lock giữ thứ tự ghi
+        # và _queue_version bỏ qua bản cập nhật đã cũ
+        self._publish_lock = threading.Lock()
+        self._queue_version = 0
+        self._published_version = 0
+        # Ước lượng thời gian một epoch, cập nhật sau mỗi job hoàn thành
+        self._epoch_seconds = Config.ESTIMATED_EPOCH_SECONDS
+        self._stopping = False
+
+        self._workers = []
+        for i in range(self.max_concurrent + self.sweep_slots):
+            worker = threading.Thread(
+                target=self._worker, name=f"train-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job):
+        with self._condition:
+            if job.model_id in self._running or any(
+                    queued.model_id == job.model_id for _, _, queued in self._queue):
+                raise DuplicateJobError(
+                    f"Model {job.model_id} is already queued or training")
+
+            if not self._slots.get(job.pool):
+                raise ValueError(f"Scheduler has no slots for {job.pool} jobs")
+
+            if len(self._queue) >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"Training queue is full ({self.max_queue_depth} jobs waiting), try again later")
+
+            heapq.heappush(self._queue, (-job.priority, next(self._counter), job))
+            updates = self._queue_updates()
+            # Chỉ worker rảnh thuộc pool còn slot lấy được job, đánh thức tất cả
+            self._condition.notify_all()
+            queue_info = self._queue_info(job.model_id)
+
+        self._publish_queue(updates)
+        return queue_info
+
+    def cancel(self, model_id):
+        """Bỏ job khỏi hàng đợi hoặc dừng worker đang train.
+
+        Trả về "running" nếu job đang chạy (worker sẽ dừng sau), "queued" nếu job
+        vừa được bỏ khỏi hàng đợi, None nếu không tìm thấy.
+        """
+        with self._condition:
+            job = self._running.get(str(model_id))
+            if job is not None:
+                job.cancel()
+                return "running"
+
+            for index, (_, _, job) in enumerate(self._queue):
+                if job.model_id == str(model_id):
+                    self._queue.pop(index)
+                    heapq.heapify(self._queue)
+                    updates = self._queue_updates()
+                    break
+            else:
+                return None
+
+        self._publish_queue(updates)
+        self._finish(job)
+        return "queued"
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "sweep_slots": self.sweep_slots,
+                "max_queue_depth": self.max_queue_depth,
+                "running": list(self._running.keys()),
+                "queued": [job.model_id for _, _, job in sorted(self._queue)],
+                "tags": {job.model_id: job.tag
+                         for job in list(self._running.values()) +
+                         [queued for _, _, queued in self._queue] if job.tag},
+                "estimated_epoch_seconds": round(self._epoch_seconds, 2)
+            }
+
+    def shutdown(self, timeout=None):
+        """Dừng nhận job mới từ hàng đợi và chờ các worker thread thoát.
+
+        Job đang chạy được chạy nốt, job còn trong hàng đợi không được bắt đầu.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = None
+                while not self._stopping:
+                    job = self._take_job()
+                    if job is not None:
+                        break
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                job.start_time = datetime.now()
+                self._running[job.model_id] = job
+                if job.cpu_budget:
+                    # Chia ngân sách core cho các job cùng pool đang thực sự chạy,
+                    # không theo số slot tối đa
+                    job.cpu_threads = max(1, job.cpu_budget // self._running_in(job.pool))
+                updates = self._queue_updates()
+            # Ghi xong trước job.run() để bản queued cũ không đè trạng thái running
+            self._publish_queue(updates)
+
+            started = time.time()
+            try:
+                result = job.run()
+                if result and result.get('success') and job.epochs:
+                    elapsed = time.time() - started
+                    with self._condition:
+                        self._epoch_seconds = (0.7 * self._epoch_seconds +
+                                               0.3 * elapsed / job.epochs)
+            except Exception as e:
+                print(f"Error in training job {job.model_id}: {e}")
+            finally:
+                with self._condition:
+                    self._running.pop(job.model_id, None)
+                    updates = self._queue_updates()
+                    # Slot của pool vừa trống, job đang chờ pool này có thể chạy
+                    self._condition.notify_all()
+                self._publish_queue(updates)
+                self._finish(job)
+
+    def _take_job(self):
+        """Lấy job ưu tiên cao nhất có pool còn slot (gọi khi đang giữ _condition)"""
+        for entry in sorted(self._queue):
+            job = entry[2]
+            if self._running_in(job.pool) < self._slots.get(job.pool, 0):
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return job
+        return None
+
+    def _running_in(self, pool):
+        return sum(1 for job in self._running.values() if job.pool == pool)
+
+    def _finish(self, job):
+        if job.on_finish is None:
+            return
+        try:
+            job.on_finish(job)
+        except Exception as e:
+            print(f"Error in on_finish of training job {job.model_id}: {e}")
+
+    def _estimate_starts(self):
+        """Mô phỏng lịch chạy để ước lượng thời điểm bắt đầu của các job đang chờ"""
+        now = datetime.now()
+        slots = {pool: [] for pool in self._slots}
+        for job in self._running.values():
+            duration = timedelta(seconds=job.epochs * self._epoch_seconds)
+            slots[job.pool].append(max(job.start_time + duration, now))
+        for pool, pool_slots in slots.items():
+            pool_slots.extend([now] * (self._slots[pool] - len(pool_slots)))
+            heapq.heapify(pool_slots)
+
+        starts = {}
+        for _, _, job in sorted(self._queue):
+            pool_slots = slots.get(job.pool)
+            if not pool_slots:
+                continue
+            start = heapq.heappop(pool_slots)
+            starts[job.model_id] = start
+            heapq.heappush(pool_slots, start + timedelta(
+                seconds=job.epochs * self._epoch_seconds))
+        return starts
+
+    def _queue_info(self, model_id):
+        starts = self._estimate_starts()
+        ordered = [job.model_id for _, _, job in sorted(self._queue)]
+        if model_id not in starts:
+            return None
+        return {
+            "queue_position": ordered.index(model_id) + 1,
+            "estimated_start_time": starts[model_id].strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _queue_updates(self):
+        """Dựng trạng thái queued (vị trí, thời gian dự kiến) của các job đang chờ
+        (gọi khi đang giữ _condition), trả về (version, [(status_file, status)])"""
+        starts = self._estimate_starts()
+        updates = []
+        for position, (_, _, job) in enumerate(sorted(self._queue), start=1):
+            if not job.writes_queue_status:
+                continue
+            status_file = os.path.join(
+                Config.SHARED_MODEL_DIR, job.model_id, 'status.json')
+            queued_status = {
+                "status": "queued",
+                "model_id": job.model_id,
+                "model_name": job.model_name,
+                "version": job.version,
+                "current_epoch": 0,
+                "total_epochs": job.epochs,
+                "template_ids": job.template_ids,
+                "priority": job.priority,
+                "submit_time": job.submit_time.strftime('%Y-%m-%d %H:%M:%S'),
+                "queue_position": position,
+                "estimated_start_time": starts[job.model_id].strftime('%Y-%m-%d %H:%M:%S')
+            }
+            if job.resume_status:
+                # Giữ lịch sử của lần train trước trong lúc chờ resume
+                queued_status = dict(
+                    job.resume_status,
+                    status="queued",
+                    priority=job.priority,
+                    submit_time=queued_status["submit_time"],
+                    queue_position=position,
+                    estimated_start_time=queued_status["estimated_start_time"])
+            updates.append((status_file, queued_status))
+        self._queue_version += 1
+        return self._queue_version, updates
+
+    def _publish_queue(self, updates):
+        """Ghi các trạng thái queued đã dựng, không giữ _condition"""
+        version, statuses = updates
+        with self._publish_lock:
+            if version < self._published_version:
+                return
+            self._published_version = version
+            for status_file, queued_status in statuses:
+                safe_update_status(status_file, queued_status)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TrainingScheduler()
+        return _scheduler
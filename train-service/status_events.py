@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+
+class StatusBroadcaster:
+    """Phát thay đổi trạng thái train tới các client SSE đang nghe.
+
+    publish() có thể được gọi từ bất kỳ thread nào; mỗi subscriber là một
+    asyncio.Queue gắn với event loop của FastAPI.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, model_id):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(str(model_id), set()).add((loop, queue))
+        return queue
+
+    def unsubscribe(self, model_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(str(model_id))
+            if not subscribers:
+                return
+            subscribers.difference_update(
+                {entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                del self._subscribers[str(model_id)]
+
+    def publish(self, status_data):
+        model_id = status_data.get('model_id')
+        if model_id is None:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(model_id), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, dict(status_data))
+            except RuntimeError:
+                # Event loop đã đóng
+                pass
+
+    def _offer(self, queue, status_data):
+        # Client chậm: bỏ sự kiện cũ nhất, trạng thái mới nhất luôn được giữ
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(status_data)
+
+
+status_broadcaster = StatusBroadcaster()
@@ -0,0 +1,427 @@
+import os
+import copy
+import math
+import uuid
+import random
+import logging
+import itertools
+import threading
+import statistics
+from datetime import datetime
+from config import Config
+from train_model import (add_status_listener, get_training_status, delete_training_folder,
+                         write_status_file, read_status_file)
+from scheduler import TrainingJob, QueueFullError, get_scheduler
+
+SWEEP_PARAMS = ("epochs", "batch_size", "learning_rate", "image_size")
+
+
+def default_params():
+    return {
+        "epochs": Config.DEFAULT_EPOCH,
+        "batch_size": Config.DEFAULT_BATCH_SIZE,
+        "learning_rate": Config.DEFAULT_LEARNING_RATE,
+        "image_size": Config.DEFAULT_IMAGE_SIZE
+    }
+
+
+def build_trials(search, space, n_trials=10, seed=None):
+    """Sinh danh sách bộ tham số cho sweep.
+
+    grid: tích Descartes của các danh sách giá trị.
+    random: mỗi tham số là danh sách (chọn ngẫu nhiên) hoặc khoảng
+    {"min", "max", "log"}; lấy n_trials mẫu.
+    Raise ValueError nếu không gian tìm kiếm không hợp lệ.
+    """
+    unknown = set(space) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+    defaults = default_params()
+    if search == "grid":
+        values = []
+        for name in SWEEP_PARAMS:
+            value = space.get(name, defaults[name])
+            if isinstance(value, dict):
+                raise ValueError(f"Grid search needs a list of values for {name}")
+            values.append(value if isinstance(value, list) else [value])
+        trials = [dict(zip(SWEEP_PARAMS, combination))
+                  for combination in itertools.product(*values)]
+    elif search == "random":
+        rng = random.Random(seed)
+        trials = []
+        for _ in range(n_trials):
+            trials.append({name: _sample(rng, name, space.get(name, defaults[name]))
+                           for name in SWEEP_PARAMS})
+    else:
+        raise ValueError("search must be 'grid' or 'random'")
+
+    if not trials:
+        raise ValueError("Sweep has no trials")
+    if len(trials) > Config.SWEEP_MAX_TRIALS:
+        raise ValueError(
+            f"Sweep has {len(trials)} trials, at most {Config.SWEEP_MAX_TRIALS} allowed")
+    return trials
+
+
+def _sample(rng, name, value):
+    if isinstance(value, list):
+        return rng.choice(value)
+    if not isinstance(value, dict):
+        return value
+
+    low, high = value["min"], value["max"]
+    if value.get("log"):
+        sample = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        sample = rng.uniform(low, high)
+
+    if name == "learning_rate":
+        return float(f"{sample:.3g}")
+    if name == "image_size":
+        # Kích thước ảnh của YOLO phải là bội số của stride 32
+        return max(32, int(round(sample / 32)) * 32)
+    return max(1, int(round(sample)))
+
+
+class SweepManager:
+    """Chạy các trial của sweep qua TrainingScheduler.
+
+    Mỗi trial là một TrainingJob (tag "sweep:<id>", priority SWEEP_PRIORITY) chạy
+    trên các slot "sweep" của scheduler (min(SWEEP_MAX_PARALLEL, SWEEP_CPU_BUDGET),
+    tách khỏi MAX_CONCURRENT_TRAININGS), hiện trong /queue và hủy được bằng
+    /cancel/{trial_id}. Sweep chỉ đưa tối đa `parallel` trial vào scheduler cùng
+    lúc; số thread torch của trial được scheduler chia từ cpu_budget theo số
+    trial đang chạy khi trial bắt đầu. Trial có mAP50 tốt nhất tới epoch hiện
+    tại thấp hơn median của các trial khác ở cùng epoch sẽ bị dừng sớm (median
+    stopping). Khi sweep kết thúc, chỉ SWEEP_KEEP_TRIALS trial tốt nhất được giữ
+    thư mục model và TrainInfo. Tóm tắt sweep được ghi ra sweep_dir/<id>.json.
+    """
+
+    def __init__(self, scheduler=None, sweep_dir=None):
+        self.scheduler = scheduler or get_scheduler()
+        self.sweep_dir = sweep_dir or Config.SWEEP_DIR
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._save_lock = threading.Lock()
+        self._sweeps = {}
+        self._trials = {}
+        self._recover()
+        add_status_listener(self._on_status)
+
+    def start(self, model_name, template_ids, search="grid", space=None, n_trials=10,
+              max_parallel=None, cpu_budget=None, prune_after_epochs=None, seed=None,
+              priority=None):
+        params_list = build_trials(search, space or {}, n_trials, seed)
+
+        cpu_budget = max(1, min(cpu_budget or Config.SWEEP_CPU_BUDGET,
+                                Config.SWEEP_CPU_BUDGET))
+        if not self.scheduler.sweep_slots:
+            raise ValueError("Training scheduler has no sweep slots (SWEEP_MAX_PARALLEL)")
+        parallel = max(1, min(max_parallel or Config.SWEEP_MAX_PARALLEL,
+                              self.scheduler.sweep_slots, cpu_budget,
+                              len(params_list)))
+
+        sweep_id = uuid.uuid4().hex[:8]
+        sweep = {
+            "sweep_id": sweep_id,
+            "model_name": model_name,
+            "template_ids": template_ids,
+            "search": search,
+            "status": "running",
+            "cpu_budget": cpu_budget,
+            "parallel": parallel,
+            "priority": Config.SWEEP_PRIORITY if priority is None else priority,
+            "prune_after_epochs": (Config.SWEEP_PRUNE_AFTER_EPOCHS
+                                   if prune_after_epochs is None else prune_after_epochs),
+            "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "end_time": None,
+            "cancelled": False,
+            "trials": []
+        }
+        for index, params in enumerate(params_list, start=1):
+            sweep["trials"].append({
+                "trial_id": f"sweep-{sweep_id}-{index}",
+                "params": params,
+                "state": "pending",
+                "history": {},
+                "final_metrics": None,
+                "error": None,
+                "cpu_threads": None,
+                "pruned_at_epoch": None,
+                "duration_seconds": None,
+                "kept": True
+            })
+
+        with self._lock:
+            self._sweeps[sweep_id] = sweep
+            for trial in sweep["trials"]:
+                self._trials[trial["trial_id"]] = (sweep, trial)
+        self._save(sweep_id)
+
+        threading.Thread(target=self._run, args=(sweep,),
+                         name=f"sweep-{sweep_id}", daemon=True).start()
+        return self.summary(sweep_id)
+
+    def cancel(self, sweep_id):
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            if sweep is None:
+                return False
+            sweep["cancelled"] = True
+            trial_ids = [trial["trial_id"] for trial in sweep["trials"]
+                         if trial["state"] in ("queued", "running")]
+            self._changed.notify_all()
+        for trial_id in trial_ids:
+            self.scheduler.cancel(trial_id)
+        return True
+
+    def summary(self, sweep_id):
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            if sweep is None:
+                return None
+            result = {key: value for key, value in sweep.items()
+                      if key not in ("trials", "cancelled")}
+            result["trial_counts"] = {}
+            for trial in sweep["trials"]:
+                result["trial_counts"][trial["state"]] = \
+                    result["trial_counts"].get(trial["state"], 0) + 1
+            result["leaderboard"] = self._leaderboard(sweep)
+            return result
+
+    def list(self):
+        with self._lock:
+            sweep_ids = list(self._sweeps)
+        return [self.summary(sweep_id) for sweep_id in sweep_ids]
+
+    def _run(self, sweep):
+        pending = list(sweep["trials"])
+        with self._lock:
+            while True:
+                if sweep["cancelled"]:
+                    for trial in pending:
+                        trial["state"] = "cancelled"
+                    pending = []
+
+                active = sum(trial["state"] in ("queued", "running")
+                             for trial in sweep["trials"])
+                if not pending and not active:
+                    break
+                if pending and active < sweep["parallel"]:
+                    trial = pending[0]
+                    self._lock.release()
+                    try:
+                        submitted = self._submit(sweep, trial)
+                    finally:
+                        self._lock.acquire()
+                    if submitted:
+                        pending.pop(0)
+                        continue
+                    # Hàng đợi đầy: chờ một trial kết thúc hoặc thử lại sau
+                    self._changed.wait(Config.SWEEP_RETRY_SECONDS)
+                    continue
+                self._changed.wait()
+
+        # Dọn trial xong mới báo sweep kết thúc
+        self._collect_trials(sweep)
+        with self._lock:
+            sweep["status"] = "cancelled" if sweep["cancelled"] else "completed"
+            sweep["end_time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._save(sweep["sweep_id"])
+
+    def _submit(self, sweep, trial):
+        """Đưa trial vào scheduler, trả về False nếu hàng đợi đang đầy"""
+        params = trial["params"]
+        job = TrainingJob(
+            trial["trial_id"], sweep["model_name"], None, None,
+            sweep["template_ids"], params["epochs"], params["batch_size"],
+            params["image_size"], params["learning_rate"],
+            priority=sweep["priority"], export=False,
+            tag=f"sweep:{sweep['sweep_id']}", cpu_budget=sweep["cpu_budget"],
+            on_finish=self._on_finish, pool="sweep")
+        with self._lock:
+            trial["state"] = "queued"
+        try:
+            self.scheduler.submit(job)
+        except QueueFullError:
+            with self._lock:
+                trial["state"] = "pending"
+            return False
+        except Exception as e:
+            logging.error(f"Error submitting sweep trial {trial['trial_id']}: {e}")
+            with self._lock:
+                trial["state"] = "failed"
+                trial["error"] = str(e)
+            self._save(sweep["sweep_id"])
+            return True
+        self._save(sweep["sweep_id"])
+        return True
+
+    def _on_finish(self, job):
+        """Gọi từ thread của scheduler khi trial chạy xong hoặc bị bỏ khỏi hàng đợi"""
+        status = get_training_status(job.model_id)
+        with self._lock:
+            entry = self._trials.get(job.model_id)
+            if entry is None:
+                return
+            sweep, trial = entry
+            if job.start_time is not None:
+                trial["duration_seconds"] = int(
+                    (datetime.now() - job.start_time).total_seconds())
+            trial["final_metrics"] = status.get("final_metrics")
+            trial["error"] = status.get("error")
+            if trial["pruned_at_epoch"] is not None:
+                trial["state"] = "pruned"
+            elif job.start_time is None:
+                trial["state"] = "cancelled"
+            else:
+                trial["state"] = status.get("status", "failed")
+                if trial["state"] not in ("completed", "failed", "cancelled"):
+                    trial["state"] = "failed"
+            if trial["state"] == "failed" and trial["error"]:
+                logging.error(f"Sweep trial {job.model_id} failed: {trial['error']}")
+            self._changed.notify_all()
+        self._save(sweep["sweep_id"])
+
+    def _on_status(self, status_data):
+        model_id = str(status_data.get("model_id", ""))
+        if not model_id.startswith("sweep-"):
+            return
+
+        prune_id = None
+        with self._lock:
+            entry = self._trials.get(model_id)
+            if entry is None:
+                return
+            sweep, trial = entry
+            if trial["state"] == "queued" and \
+                    status_data.get("status") in ("preparing_data", "running"):
+                trial["state"] = "running"
+            if status_data.get("cpu_threads"):
+                trial["cpu_threads"] = status_data["cpu_threads"]
+            for metrics in status_data.get("epoch_metrics") or []:
+                if metrics.get("map50") is not None:
+                    trial["history"][metrics["epoch"]] = metrics["map50"]
+            if trial["history"] and self._should_prune(sweep, trial):
+                trial["pruned_at_epoch"] = max(trial["history"])
+                prune_id = model_id
+
+        if prune_id is not None:
+            self.scheduler.cancel(prune_id)
+
+    def _should_prune(self, sweep, trial):
+        if trial["state"] != "running" or trial["pruned_at_epoch"] is not None:
+            return False
+        epoch = max(trial["history"])
+        if epoch < sweep["prune_after_epochs"] or epoch >= trial["params"]["epochs"]:
+            return False
+
+        peers = [_best_until(other, epoch) for other in sweep["trials"]
+                 if other is not trial]
+        peers = [value for value in peers if value is not None]
+        if len(peers) < 2:
+            return False
+        return _best_until(trial, epoch) < statistics.median(peers)
+
+    def _collect_trials(self, sweep):
+        """Xóa thư mục model và TrainInfo của các trial không nằm trong
+        SWEEP_KEEP_TRIALS trial hoàn thành tốt nhất"""
+        with self._lock:
+            kept = [row["trial_id"] for row in self._leaderboard(sweep)
+                    if row["state"] == "completed"][:Config.SWEEP_KEEP_TRIALS]
+            removed = [trial for trial in sweep["trials"]
+                       if trial["trial_id"] not in kept and trial["kept"]]
+
+        for trial in removed:
+            try:
+                delete_training_folder(trial["trial_id"])
+            except Exception as e:
+                logging.error(f"Error removing sweep trial {trial['trial_id']}: {e}")
+                continue
+            with self._lock:
+                trial["kept"] = False
+
+    def _leaderboard(self, sweep):
+        rows = []
+        for trial in sweep["trials"]:
+            final_metrics = trial["final_metrics"] or {}
+            best = max(trial["history"].values(), default=None)
+            score = final_metrics.get("map50", best)
+            rows.append({
+                "trial_id": trial["trial_id"],
+                "params": trial["params"],
+                "state": trial["state"],
+                "map50": score,
+                "map50_95": final_metrics.get("map50_95"),
+                "epochs_completed": max(trial["history"], default=0),
+                "pruned_at_epoch": trial["pruned_at_epoch"],
+                "duration_seconds": trial["duration_seconds"],
+                "cpu_threads": trial["cpu_threads"],
+                "error": trial["error"],
+                # False: thư mục model và TrainInfo của trial đã bị dọn
+                "kept": trial["kept"]
+            })
+        # Trial hoàn thành xếp trước, sau đó theo mAP50 giảm dần
+        rows.sort(key=lambda row: (row["state"] != "completed",
+                                   -(row["map50"] if row["map50"] is not None else -1)))
+        for rank, row in enumerate(rows, start=1):
+            row["rank"] = rank
+        return rows
+
+    def _save(self, sweep_id):
+        """Ghi trạng thái sweep ra <sweep_dir>/<id>.json (ghi nguyên tử, lần ghi sau
+        luôn lấy snapshot mới nhất)"""
+        with self._save_lock:
+            with self._lock:
+                sweep = self._sweeps.get(sweep_id)
+                if sweep is None:
+                    return
+                snapshot = copy.deepcopy(sweep)
+            write_status_file(os.path.join(self.sweep_dir, f"{sweep_id}.json"), snapshot)
+
+    def _recover(self):
+        """Nạp các sweep đã lưu. Sweep còn dở lúc service dừng không còn trial nào
+        chạy (scheduler và worker đã mất) nên được đánh dấu failed."""
+        if not os.path.isdir(self.sweep_dir):
+            return
+        for name in sorted(os.listdir(self.sweep_dir)):
+            if not name.endswith(".json"):
+                continue
+            sweep = read_status_file(os.path.join(self.sweep_dir, name))
+            if not sweep or "sweep_id" not in sweep:
+                continue
+            interrupted = sweep.get("status") == "running"
+            for trial in sweep.get("trials", []):
+                # JSON đổi key epoch thành chuỗi
+                trial["history"] = {int(epoch): value
+                                    for epoch, value in (trial.get("history") or {}).items()}
+                if trial.get("state") in ("pending", "queued", "running"):
+                    trial["state"] = "failed"
+                    trial["error"] = "Sweep interrupted by service restart"
+            if interrupted:
+                sweep["status"] = "failed"
+                sweep["end_time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._sweeps[sweep["sweep_id"]] = sweep
+            if interrupted:
+                self._save(sweep["sweep_id"])
+
+
+def _best_until(trial, epoch):
+    values = [value for trial_epoch, value in trial["history"].items()
+              if trial_epoch <= epoch]
+    if not values or max(trial["history"]) < epoch:
+        return None
+    return max(values)
+
+
+_sweep_manager = None
+_sweep_manager_lock = threading.Lock()
+
+
+def get_sweep_manager():
+    global _sweep_manager
+    with _sweep_manager_lock:
+        if _sweep_manager is None:
+            _sweep_manager = SweepManager()
+        return _sweep_manager
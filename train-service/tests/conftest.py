@@ -0,0 +1,20 @@
+import pytest
+from config import Config
+from scheduler import TrainingScheduler
+
+
+@pytest.fixture
+def make_scheduler(tmp_path, monkeypatch):
+    """Tạo TrainingScheduler ghi status vào tmp_path; worker thread được dừng khi test kết thúc"""
+    monkeypatch.setattr(Config, "SHARED_MODEL_DIR", str(tmp_path))
+    schedulers = []
+
+    def make(**kwargs):
+        scheduler = TrainingScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown(timeout=10)
+        assert not any(worker.is_alive() for worker in scheduler._workers)
@@ -0,0 +1,119 @@
+import os
+import time
+import pytest
+from image_cache import ImageCache
+
+
+class FakeResponse:
+    def __init__(self, content=b"", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Trả về size byte cho mỗi URL, hoặc 304 khi request có If-None-Match"""
+
+    def __init__(self, size=100):
+        self.size = size
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        if headers and headers.get("If-None-Match") == f'"{url}"':
+            return FakeResponse(status_code=304)
+        return FakeResponse(b"x" * self.size, headers={"ETag": f'"{url}"'})
+
+
+def fetch(cache, session, template_id):
+    return cache.fetch(template_id, "2024-01-01", f"http://images/{template_id}.jpg", session)
+
+
+def age(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_hit_does_not_download(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=1000, revalidate_after=3600)
+    session = FakeSession()
+
+    path, downloaded, hit = fetch(cache, session, 1)
+    assert (downloaded, hit) == (100, False)
+    assert fetch(cache, session, 1) == (path, 0, True)
+    assert len(session.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=1000, revalidate_after=0)
+    session = FakeSession()
+
+    fetch(cache, session, 1)
+    _, downloaded, hit = fetch(cache, session, 1)
+    assert (downloaded, hit) == (0, True)
+    assert session.requests[-1][1]["If-None-Match"] == '"http://images/1.jpg"'
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=250, revalidate_after=3600)
+    session = FakeSession()
+
+    first, _, _ = fetch(cache, session, 1)
+    second, _, _ = fetch(cache, session, 2)
+    age(first, 20)
+    age(second, 30)
+    # Dùng lại ảnh 1 nên ảnh 2 là ảnh cũ nhất
+    fetch(cache, session, 1)
+    fetch(cache, session, 3)
+
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    assert not os.path.exists(second[:-len(".jpg")] + ".json")
+    stats = cache.stats()
+    assert (stats["entries"], stats["size_bytes"], stats["evictions"]) == (2, 200, 1)
+
+
+def test_entry_larger_than_budget_is_kept(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=50, revalidate_after=3600)
+    path, _, _ = fetch(cache, FakeSession(), 1)
+    assert os.path.exists(path)
+
+
+def test_budget_covers_files_written_by_other_processes(tmp_path):
+    """Hai instance (như API và worker train) dùng chung cache_dir"""
+    worker = ImageCache(str(tmp_path), max_bytes=250, revalidate_after=3600,
+                        rescan_interval=0)
+    api = ImageCache(str(tmp_path), max_bytes=250, revalidate_after=3600)
+    session = FakeSession()
+
+    first, _, _ = fetch(worker, session, 1)
+    age(first, 30)
+    fetch(api, session, 2)
+    # worker không tự tải ảnh 2 nhưng quét lại đĩa trước khi quyết định xóa
+    fetch(worker, session, 3)
+
+    assert not os.path.exists(first)
+    assert api.stats()["entries"] == 2
+    assert api.stats()["size_bytes"] == 200
+    # Ảnh do tiến trình khác tải vẫn là hit
+    assert fetch(worker, session, 2)[2] is True
+
+
+def test_existing_files_are_loaded_and_trimmed(tmp_path):
+    session = FakeSession()
+    cache = ImageCache(str(tmp_path), max_bytes=1000, revalidate_after=3600)
+    paths = [fetch(cache, session, template_id)[0] for template_id in (1, 2, 3)]
+    for index, path in enumerate(paths):
+        age(path, 30 - index)
+
+    reopened = ImageCache(str(tmp_path), max_bytes=250, revalidate_after=3600)
+    assert not os.path.exists(paths[0])
+    assert reopened.stats()["entries"] == 2
+    assert fetch(reopened, session, 3)[2] is True
+
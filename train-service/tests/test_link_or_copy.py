@@ -0,0 +1,57 @@
+import os
+import fcntl
+import pytest
+import train_model
+from config import Config
+
+
+def fail(*args, **kwargs):
+    raise OSError("not supported")
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src.jpg"
+    path.write_bytes(b"x" * 64)
+    return str(path)
+
+
+def test_hardlink_first(tmp_path, src):
+    dst = str(tmp_path / "dst.jpg")
+    info = {}
+    assert train_model.link_or_copy(src, dst, info) == "hardlink"
+    assert os.path.samefile(src, dst)
+    assert info == {"hardlink": 1, "bytes_saved": 64}
+
+
+def test_reflink_when_hardlink_fails(tmp_path, src, monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "link", fail)
+    monkeypatch.setattr(fcntl, "ioctl", lambda *args: calls.append(args[1]))
+    dst = str(tmp_path / "dst.jpg")
+    assert train_model.link_or_copy(src, dst) == "reflink"
+    assert calls == [train_model.FICLONE]
+
+
+def test_symlink_when_reflink_fails(tmp_path, src, monkeypatch):
+    monkeypatch.setattr(os, "link", fail)
+    monkeypatch.setattr(fcntl, "ioctl", fail)
+    monkeypatch.setattr(Config, "DATASET_ALLOW_SYMLINK", True)
+    dst = str(tmp_path / "dst.jpg")
+    info = {}
+    assert train_model.link_or_copy(src, dst, info) == "symlink"
+    assert os.readlink(dst) == os.path.abspath(src)
+    assert info == {"symlink": 1, "bytes_saved": 64}
+
+
+def test_copy_when_nothing_else_works(tmp_path, src, monkeypatch):
+    monkeypatch.setattr(os, "link", fail)
+    monkeypatch.setattr(fcntl, "ioctl", fail)
+    monkeypatch.setattr(Config, "DATASET_ALLOW_SYMLINK", False)
+    dst = tmp_path / "dst.jpg"
+    # dst cũ (vd. từ lần dựng trước) được thay thế
+    dst.write_bytes(b"old")
+    info = {}
+    assert train_model.link_or_copy(src, str(dst), info) == "copy"
+    assert not dst.is_symlink() and dst.read_bytes() == b"x" * 64
+    assert info == {"copy": 1, "bytes_written": 64}
@@ -0,0 +1,74 @@
+import json
+import pytest
+import train_model
+from config import Config
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SHARED_MODEL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_status(shared_dir, model_id, **status):
+    folder = shared_dir / model_id
+    folder.mkdir()
+    (folder / "status.json").write_text(json.dumps(dict(status, model_id=model_id)))
+
+
+# Cùng bảng với tests/test_inference.py của model-service: hai service phải suy ra cùng
+# thư mục shared_model cho cùng (tên, version), kể cả công thức crc32 cũ
+MODEL_ID_CASES = [
+    ("FraudDetector", "v1.0.0", "deb253d5e37846e9", "4485"),
+    ("model-9790", "v2", "ced180bc5c14378a", "5621"),
+    ("Phát hiện gian lận", "v1.0.0", "ecde6c00e6b8dc05", "9918"),
+]
+
+
+@pytest.mark.parametrize("name, version, model_id, legacy_id", MODEL_ID_CASES)
+def test_model_id_matches_model_service(name, version, model_id, legacy_id):
+    assert train_model.make_model_id(name, version) == model_id
+    assert train_model.legacy_model_id(name, version) == legacy_id
+
+
+def test_model_id_is_stable_and_wide():
+    model_id = train_model.make_model_id("fraud", "v1")
+    assert model_id == train_model.make_model_id("fraud", "v1")
+    assert len(model_id) == 16
+    ids = {train_model.make_model_id("fraud", f"v{index}") for index in range(20000)}
+    # Công thức cũ chỉ có 9000 giá trị
+    assert len(ids) == 20000
+
+
+def test_folder_of_another_model_is_not_overwritten(shared_dir):
+    model_id = train_model.make_model_id("fraud", "v1")
+    write_status(shared_dir, model_id, status="completed", model_name="other", version="v9")
+
+    with pytest.raises(ValueError):
+        train_model.check_model_dir_owner(model_id, "fraud", "v1")
+    with pytest.raises(ValueError):
+        train_model.prepare_training(model_id, "fraud", 1, [1], version="v1")
+    assert json.loads((shared_dir / model_id / "status.json").read_text())["model_name"] == "other"
+
+
+def test_same_model_may_retrain(shared_dir):
+    model_id = train_model.make_model_id("fraud", "v1")
+    write_status(shared_dir, model_id, status="completed", model_name="fraud", version="v1")
+    train_model.check_model_dir_owner(model_id, "fraud", "v1")
+    # status.json cũ không có version
+    write_status(shared_dir, "1234", status="completed", model_name="fraud")
+    train_model.check_model_dir_owner("1234", "fraud", "v1")
+    with pytest.raises(ValueError):
+        train_model.check_model_dir_owner(model_id, "fraud", "v2")
+
+
+def test_legacy_folder_is_found_only_for_its_owner(shared_dir):
+    legacy_id = train_model.legacy_model_id("fraud", "v1")
+    write_status(shared_dir, legacy_id, status="completed", model_name="fraud")
+    assert train_model.find_model_id("fraud", "v1") == legacy_id
+
+    # Model khác có cùng id cũ không được trỏ vào thư mục này
+    version = next(f"v{index}" for index in range(100000)
+                   if train_model.legacy_model_id("other", f"v{index}") == legacy_id)
+    assert train_model.find_model_id("other", version) == \
+        train_model.make_model_id("other", version)
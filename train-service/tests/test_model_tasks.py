@@ -0,0 +1,146 @@
+import json
+import asyncio
+import threading
+import pytest
+import train_model
+import scheduler as scheduler_module
+from config import Config
+from job_registry import JobRegistry
+from scheduler import ModelTaskJob
+
+
+@pytest.fixture
+def registry(tmp_path):
+    (tmp_path / "1").mkdir()
+    (tmp_path / "1" / "status.json").write_text(json.dumps(
+        {"model_id": "1", "status": "completed",
+         "export_info": {"status": "completed", "formats": ["onnx"]}}))
+    return JobRegistry(base_dir=str(tmp_path), flush_interval=60)
+
+
+def test_only_one_concurrent_claim_wins(registry):
+    barrier = threading.Barrier(8)
+    results = []
+
+    def claim(field):
+        barrier.wait()
+        results.append(registry.claim_task("1", field)[0] is not None)
+
+    threads = [threading.Thread(target=claim, args=(field,))
+               for field in ["export_info", "quantization_info"] * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+
+def test_claim_returns_previous_info(registry):
+    status, previous = registry.claim_task("1", "export_info")
+    assert status["export_info"] == {"status": "queued"}
+    assert previous == {"status": "completed", "formats": ["onnx"]}
+    assert registry.get("1")["export_info"] == {"status": "queued"}
+    assert registry.claim_task("1", "quantization_info") == (None, None)
+
+
+def test_claim_needs_completed_training(registry):
+    registry.update("status.json", {"model_id": "1", "status": "running"})
+    assert registry.claim_task("1", "export_info") == (None, None)
+    assert registry.claim_task("2", "export_info") == (None, None)
+
+
+def test_interrupted_task_fails_on_recover(registry, tmp_path):
+    registry.claim_task("1", "export_info")
+    registry.flush("1")
+
+    recovered = JobRegistry(base_dir=str(tmp_path), flush_interval=60)
+    recovered.recover()
+    status = recovered.get("1")
+    assert status["status"] == "completed"
+    assert status["export_info"]["status"] == "failed"
+    assert registry.claim_task("1", "export_info")[0] is None
+    assert recovered.claim_task("1", "export_info")[0] is not None
+
+
+@pytest.fixture
+def train_api(tmp_path, monkeypatch):
+    """Import train_service trên thư mục tạm: lần import đầu tạo JobRegistry và đăng
+    ký status store / listener vào train_model, được khôi phục sau test"""
+    monkeypatch.setattr(Config, "SHARED_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(train_model, "_status_store", train_model._status_store)
+    monkeypatch.setattr(train_model, "_status_listeners", list(train_model._status_listeners))
+    import train_service
+    return train_service
+
+
+@pytest.fixture
+def task_statuses(monkeypatch):
+    statuses = {"1": {"model_id": "1", "status": "completed",
+                      "export_info": {"status": "queued"}}}
+    writes = []
+
+    def record(status_file, status_data):
+        writes.append(status_file)
+        statuses[str(status_data["model_id"])] = dict(status_data)
+
+    monkeypatch.setattr(scheduler_module, "safe_update_status", record)
+    monkeypatch.setattr(scheduler_module, "get_training_status",
+                        lambda model_id: dict(statuses.get(model_id, {"status": "not_found"})))
+    return statuses, writes
+
+
+def test_task_job_queue_and_cancel(make_scheduler, task_statuses):
+    statuses, writes = task_statuses
+    scheduler = make_scheduler(max_concurrent=1, max_queue_depth=5)
+    blocker = threading.Event()
+    started = threading.Event()
+
+    class Blocking(ModelTaskJob):
+        def run(self):
+            started.set()
+            blocker.wait(5)
+            return {'success': True}
+
+    scheduler.submit(Blocking("2", "quantize"))
+    assert started.wait(5)
+    job = ModelTaskJob("1", "export", {"formats": ["onnx"]})
+    queue_info = scheduler.submit(job)
+    assert queue_info["queue_position"] == 1
+    assert scheduler.stats()["tags"]["1-export"] == "export"
+    # Job export không có status.json riêng để ghi trạng thái queued
+    assert not any("1-export" in status_file for status_file in writes)
+
+    assert scheduler.cancel("1-export") == "queued"
+    assert statuses["1"]["export_info"] == {"status": "cancelled"}
+    blocker.set()
+
+
+def test_cancel_api_reports_task_cancel(make_scheduler, train_api, task_statuses, monkeypatch):
+    statuses, _ = task_statuses
+    scheduler = make_scheduler(max_concurrent=1, max_queue_depth=5)
+    monkeypatch.setattr(train_api, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(train_api, "cancel_training", lambda *args, **kwargs:
+                        pytest.fail("task ids have no status.json of their own"))
+    blocker = threading.Event()
+    started = threading.Event()
+
+    class Blocking(ModelTaskJob):
+        def run(self):
+            started.set()
+            blocker.wait(5)
+            return {'success': True}
+
+    scheduler.submit(Blocking("2", "quantize"))
+    assert started.wait(5)
+    scheduler.submit(ModelTaskJob("1", "export", {"formats": ["onnx"]}))
+
+    result = asyncio.run(train_api.cancel_training_api("1-export"))
+    assert result == {"success": True, "message": "Task cancelled"}
+    assert statuses["1"]["export_info"] == {"status": "cancelled"}
+
+    result = asyncio.run(train_api.cancel_training_api("2-quantize"))
+    assert result == {"success": True, "message": "Task cancelling"}
+    blocker.set()
+
+    result = asyncio.run(train_api.cancel_training_api("1-export"))
+    assert result["success"] is False
@@ -0,0 +1,70 @@
+import os
+from export_model import keep_promoted_artifacts
+from quantize_model import promotion_blocker
+from train_model import build_dataset
+
+
+def test_small_eval_set_blocks_promotion():
+    assert promotion_blocker(0.0, 0.01, 5, 20) == \
+        "Evaluation set has 5 images, at least 20 required"
+    assert promotion_blocker(0.0, 0.01, None, 20) is not None
+    assert promotion_blocker(0.02, 0.01, 20, 20).startswith("mAP50 dropped")
+    assert promotion_blocker(0.01, 0.01, 20, 20) is None
+
+
+def make_downloads(tmp_path, template_ids):
+    downloads = {}
+    for template_id in template_ids:
+        path = tmp_path / f"src_{template_id}.jpg"
+        path.write_bytes(b"x")
+        downloads[template_id] = (str(path), {"boundingBox": [
+            {"xCenter": 0.5, "yCenter": 0.5, "width": 0.2, "height": 0.2}]})
+    return downloads
+
+
+def test_eval_dataset_uses_every_template(tmp_path):
+    downloads = make_downloads(tmp_path, [1, 2, 3])
+    dataset_dir = str(tmp_path / "eval")
+    info = build_dataset(dataset_dir, dataset_dir, [1, 2, 3, 4], downloads,
+                         val_template_ids=[1, 2, 3, 4])
+    assert info["val_images"] == 3
+    assert sorted(os.listdir(os.path.join(dataset_dir, "val", "labels"))) == \
+        ["img_1.txt", "img_2.txt", "img_3.txt"]
+
+
+def test_training_dataset_keeps_single_val_image(tmp_path):
+    downloads = make_downloads(tmp_path, [1, 2])
+    dataset_dir = str(tmp_path / "train")
+    info = build_dataset(dataset_dir, dataset_dir, [1, 2], downloads)
+    assert info["val_images"] == 1
+    assert os.listdir(os.path.join(dataset_dir, "val", "images")) == ["img_1.jpg"]
+
+
+def exported(onnx=None):
+    return {"artifacts": {"pytorch": {"path": "best.pt", "latency_ms": {"batch_1": 9}},
+                          "onnx": onnx or {"path": "best.onnx", "latency_ms": {"batch_1": 5}}},
+            "fastest": "onnx", "serving": "pytorch"}
+
+
+def test_reexport_keeps_promoted_int8(tmp_path):
+    int8_path = tmp_path / "best_int8.onnx"
+    int8_path.write_bytes(b"int8")
+    previous = exported()
+    previous["artifacts"]["onnx_int8"] = {"path": str(int8_path), "map50_drop": 0.004}
+    previous["artifacts"]["onnx_int8_candidate"] = {"path": str(tmp_path / "gone.onnx")}
+    previous["serving"] = "onnx_int8"
+
+    result = keep_promoted_artifacts(previous, exported())
+    assert result["serving"] == "onnx_int8"
+    assert result["artifacts"]["onnx_int8"] == previous["artifacts"]["onnx_int8"]
+    # Candidate mà file đã bị xoá thì không giữ lại
+    assert "onnx_int8_candidate" not in result["artifacts"]
+    assert result["fastest"] == "onnx"
+
+    # File INT8 mất thì quay về pytorch thay vì trỏ vào artifact không tồn tại
+    int8_path.unlink()
+    assert keep_promoted_artifacts(previous, exported())["serving"] == "pytorch"
+    previous["serving"] = "onnx"
+    assert keep_promoted_artifacts(previous, exported(onnx={"error": "failed"}))["serving"] == \
+        "pytorch"
+    assert keep_promoted_artifacts(None, exported())["serving"] == "pytorch"
@@ -0,0 +1,35 @@
+import sys
+import types
+import pytest
+import train_model
+from config import Config
+
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    """last.pt giả của job 1 bị hủy; torch.load trả về train_args"""
+    monkeypatch.setattr(Config, "SHARED_MODEL_DIR", str(tmp_path))
+    weights_dir = tmp_path / "1" / "train" / "weights"
+    weights_dir.mkdir(parents=True)
+    (weights_dir / "last.pt").write_bytes(b"")
+    saved = {"train_args": {"batch": 8, "lr0": 0.005}}
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(
+        load=lambda path, map_location=None, weights_only=None: saved))
+    return saved
+
+
+def test_train_args_come_from_status(checkpoint):
+    status = {"model_id": "1", "status": "cancelled", "batch_size": 16, "learning_rate": 0.001}
+    assert train_model.resume_train_args(status) == (16, 0.001)
+
+
+def test_train_args_fall_back_to_checkpoint(checkpoint):
+    status = {"model_id": "1", "status": "failed", "batch_size": 32}
+    assert train_model.resume_train_args(status) == (32, 0.005)
+    assert train_model.resume_train_args({"model_id": "1", "status": "failed"}) == (8, 0.005)
+
+
+def test_unrecoverable_train_args_are_rejected(checkpoint):
+    checkpoint["train_args"] = {}
+    with pytest.raises(ValueError):
+        train_model.resume_train_args({"model_id": "1", "status": "failed"})
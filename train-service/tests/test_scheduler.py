@@ -0,0 +1,84 @@
+import threading
+import pytest
+import scheduler as scheduler_module
+from scheduler import TrainingJob, DuplicateJobError
+
+
+class BlockingJob(TrainingJob):
+    """Job giả: chiếm slot cho tới khi release được set"""
+
+    def __init__(self, model_id, priority=0):
+        super().__init__(model_id, f"model-{model_id}", "FraudDetection", "v1", [1],
+                         epochs=2, batch_size=4, image_size=64, learning_rate=0.01,
+                         priority=priority)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def run(self):
+        self.started.set()
+        self.release.wait(5)
+        return {'success': True}
+
+
+def test_queue_status_is_written_outside_the_lock(monkeypatch, make_scheduler):
+    scheduler = make_scheduler(max_concurrent=1, max_queue_depth=5)
+    writes = []
+
+    def record(status_file, status_data):
+        writes.append((status_data["model_id"], status_data.get("queue_position"),
+                       scheduler._condition._is_owned()))
+
+    monkeypatch.setattr(scheduler_module, "safe_update_status", record)
+    running = BlockingJob("1")
+    scheduler.submit(running)
+    assert running.started.wait(5)
+
+    low, high = BlockingJob("2"), BlockingJob("3", priority=5)
+    scheduler.submit(low)
+    scheduler.submit(high)
+
+    assert writes[-2:] == [("3", 1, False), ("2", 2, False)]
+    assert not any(owned for _, _, owned in writes)
+    with pytest.raises(DuplicateJobError):
+        scheduler.submit(BlockingJob("2"))
+
+    assert scheduler.cancel("3")
+    assert writes[-1] == ("2", 1, False)
+    for job in (running, low, high):
+        job.release.set()
+
+
+def test_shutdown_stops_workers(make_scheduler, tmp_path):
+    scheduler = make_scheduler(max_concurrent=2, max_queue_depth=5)
+    running = BlockingJob("1")
+    scheduler.submit(running)
+    assert running.started.wait(5)
+    running.release.set()
+
+    scheduler.shutdown(timeout=5)
+    assert not any(worker.is_alive() for worker in scheduler._workers)
+    # Job gửi sau khi dừng không được chạy
+    queued = BlockingJob("2")
+    scheduler.submit(queued)
+    assert not queued.started.wait(0.2)
+
+
+def test_status_stays_cancelling_until_worker_exits(monkeypatch):
+    writes = []
+
+    def record(status_file, status_data):
+        writes.append(dict(status_data))
+
+    monkeypatch.setattr(scheduler_module, "safe_update_status", record)
+    job = BlockingJob("1")
+    events = scheduler_module._mp_context.Queue()
+    job.cancel()
+    # Worker vẫn báo running / cancelled trước khi process thoát
+    events.put(("status.json", {"model_id": "1", "status": "running"}))
+    events.put(("status.json", {"model_id": "1", "status": "cancelled",
+                                "end_time": "2024-01-01 00:00:00"}))
+    events.put(None)
+    job._relay_events(events)
+
+    assert [status["status"] for status in writes] == ["cancelling", "cancelling"]
+    assert "end_time" not in writes[-1]
@@ -0,0 +1,209 @@
+import time
+import threading
+from datetime import datetime
+import pytest
+import sweep as sweep_module
+import scheduler as scheduler_module
+from config import Config
+from scheduler import QueueFullError, TrainingJob
+from sweep import SweepManager, build_trials
+
+
+class FakeScheduler:
+    """Scheduler giả: ghi lại job được submit, job chạy xong khi test gọi finish()"""
+
+    def __init__(self, sweep_slots=2, full_once=False):
+        self.sweep_slots = sweep_slots
+        self.full_once = full_once
+        self.submitted = []
+        self.cancelled = []
+        self._condition = threading.Condition()
+
+    def submit(self, job):
+        with self._condition:
+            if self.full_once:
+                self.full_once = False
+                raise QueueFullError("full")
+            self.submitted.append(job)
+            self._condition.notify_all()
+
+    def cancel(self, model_id):
+        self.cancelled.append(model_id)
+        return "running"
+
+    def wait_for(self, count):
+        with self._condition:
+            assert self._condition.wait_for(lambda: len(self.submitted) >= count, 5)
+        return self.submitted[count - 1]
+
+
+@pytest.fixture
+def statuses(monkeypatch):
+    statuses = {}
+    monkeypatch.setattr(sweep_module, "get_training_status",
+                        lambda model_id: statuses.get(model_id, {}))
+    return statuses
+
+
+@pytest.fixture
+def deleted(monkeypatch):
+    deleted = []
+    monkeypatch.setattr(sweep_module, "delete_training_folder", deleted.append)
+    return deleted
+
+
+def finish(job, statuses, status, map50=None):
+    job.start_time = datetime.now()
+    statuses[job.model_id] = {"status": status,
+                              "final_metrics": {"map50": map50} if map50 is not None else None}
+    job.on_finish(job)
+
+
+def wait_done(manager, sweep_id):
+    # Thread của sweep kết thúc sau lần ghi trạng thái cuối cùng
+    for thread in threading.enumerate():
+        if thread.name == f"sweep-{sweep_id}":
+            thread.join(5)
+            assert not thread.is_alive(), "sweep did not finish"
+    return manager.summary(sweep_id)
+
+
+def test_grid_trials_cover_product():
+    trials = build_trials("grid", {"batch_size": [4, 8], "learning_rate": [0.01, 0.001]})
+    assert len(trials) == 4
+    assert {(trial["batch_size"], trial["learning_rate"]) for trial in trials} == \
+        {(4, 0.01), (4, 0.001), (8, 0.01), (8, 0.001)}
+    assert all(trial["epochs"] == Config.DEFAULT_EPOCH for trial in trials)
+
+
+def test_random_trials_are_seeded_and_in_range():
+    space = {"learning_rate": {"min": 0.0001, "max": 0.1, "log": True},
+             "batch_size": [4, 8, 16]}
+    trials = build_trials("random", space, n_trials=5, seed=7)
+    assert trials == build_trials("random", space, n_trials=5, seed=7)
+    assert all(0.0001 <= trial["learning_rate"] <= 0.1 for trial in trials)
+    assert all(trial["batch_size"] in (4, 8, 16) for trial in trials)
+
+
+@pytest.mark.parametrize("search, space", [
+    ("grid", {"momentum": [0.9]}),
+    ("grid", {"learning_rate": {"min": 0.001, "max": 0.1}}),
+    ("bayes", {}),
+    ("grid", {"batch_size": []}),
+])
+def test_invalid_space_is_rejected(search, space):
+    with pytest.raises(ValueError):
+        build_trials(search, space)
+
+
+def test_too_many_trials_are_rejected(monkeypatch):
+    monkeypatch.setattr(Config, "SWEEP_MAX_TRIALS", 3)
+    with pytest.raises(ValueError):
+        build_trials("grid", {"batch_size": [1, 2, 4, 8]})
+
+
+def make_trial(history, epochs=10, state="running"):
+    return {"state": state, "history": history, "pruned_at_epoch": None,
+            "params": {"epochs": epochs}}
+
+
+def test_prune_below_median_of_peers(tmp_path):
+    manager = SweepManager(scheduler=FakeScheduler(), sweep_dir=str(tmp_path))
+    weak = make_trial({1: 0.1, 2: 0.2, 3: 0.2})
+    peers = [make_trial({1: 0.3, 2: 0.5, 3: 0.6}, state="completed"),
+             make_trial({1: 0.2, 2: 0.4, 3: 0.5})]
+    sweep = {"prune_after_epochs": 3, "trials": [weak] + peers}
+
+    assert manager._should_prune(sweep, weak)
+    assert not manager._should_prune(sweep, peers[1])
+    # Chưa đủ số epoch tối thiểu
+    assert not manager._should_prune(dict(sweep, prune_after_epochs=4), weak)
+    # Cần ít nhất 2 trial khác đã tới cùng epoch
+    assert not manager._should_prune({"prune_after_epochs": 3, "trials": [weak, peers[0]]}, weak)
+
+
+def test_trials_go_through_scheduler_and_losers_are_collected(tmp_path, statuses, deleted,
+                                                              monkeypatch):
+    monkeypatch.setattr(Config, "SWEEP_CPU_BUDGET", 8)
+    monkeypatch.setattr(Config, "SWEEP_RETRY_SECONDS", 0.05)
+    scheduler = FakeScheduler(sweep_slots=2, full_once=True)
+    manager = SweepManager(scheduler=scheduler, sweep_dir=str(tmp_path))
+    summary = manager.start("m", [1], space={"batch_size": [4, 8, 16]},
+                            max_parallel=4, cpu_budget=4, priority=-3)
+    assert summary["parallel"] == 2
+
+    first = scheduler.wait_for(1)
+    second = scheduler.wait_for(2)
+    assert first.tag == f"sweep:{summary['sweep_id']}"
+    assert first.priority == -3 and first.cpu_budget == 4 and first.export is False
+    assert first.pool == "sweep"
+    # Chỉ `parallel` trial nằm trong scheduler cùng lúc
+    time.sleep(0.1)
+    assert len(scheduler.submitted) == 2
+
+    finish(first, statuses, "completed", map50=0.4)
+    third = scheduler.wait_for(3)
+    finish(second, statuses, "completed", map50=0.7)
+    finish(third, statuses, "failed")
+
+    summary = wait_done(manager, summary["sweep_id"])
+    assert summary["status"] == "completed"
+    leaderboard = summary["leaderboard"]
+    assert [row["trial_id"] for row in leaderboard] == \
+        [second.model_id, first.model_id, third.model_id]
+    assert [row["kept"] for row in leaderboard] == [True, False, False]
+    assert deleted == [first.model_id, third.model_id]
+
+    # Sweep được nạp lại từ đĩa sau khi service khởi động lại
+    reloaded = SweepManager(scheduler=FakeScheduler(), sweep_dir=str(tmp_path))
+    assert reloaded.summary(summary["sweep_id"])["leaderboard"] == leaderboard
+
+
+def test_interrupted_sweep_is_marked_failed_on_restart(tmp_path, statuses, deleted):
+    scheduler = FakeScheduler(sweep_slots=1)
+    manager = SweepManager(scheduler=scheduler, sweep_dir=str(tmp_path))
+    sweep_id = manager.start("m", [1], space={"batch_size": [4, 8]})["sweep_id"]
+    scheduler.wait_for(1)
+
+    reloaded = SweepManager(scheduler=FakeScheduler(), sweep_dir=str(tmp_path))
+    summary = reloaded.summary(sweep_id)
+    assert summary["status"] == "failed"
+    assert summary["trial_counts"] == {"failed": 2}
+
+    manager.cancel(sweep_id)
+    finish(scheduler.submitted[0], statuses, "cancelled")
+    assert wait_done(manager, sweep_id)["status"] == "cancelled"
+
+
+def test_trials_run_in_parallel_beside_training(make_scheduler, statuses, deleted,
+                                                tmp_path, monkeypatch):
+    """MAX_CONCURRENT_TRAININGS = 1 không giới hạn trial: hai trial chạy cùng lúc
+    trên slot sweep trong khi một job train thường vẫn giữ slot của nó"""
+    monkeypatch.setattr(Config, "SWEEP_CPU_BUDGET", 8)
+    monkeypatch.setattr(scheduler_module, "safe_update_status", lambda *args: True)
+    scheduler = make_scheduler(max_concurrent=1, sweep_slots=2)
+    both_running = threading.Barrier(3, timeout=5)
+    release = threading.Event()
+    threads = {}
+
+    def run(job):
+        threads[job.model_id] = job.cpu_threads
+        if job.pool == "sweep":
+            both_running.wait()
+        release.wait(5)
+        return {'success': True}
+
+    monkeypatch.setattr(TrainingJob, "run", run)
+    training = TrainingJob("train-1", "m", None, "v1", [1], 1, 4, 64, 0.01)
+    scheduler.submit(training)
+
+    manager = SweepManager(scheduler=scheduler, sweep_dir=str(tmp_path / "sweeps"))
+    sweep_id = manager.start("m", [1], space={"batch_size": [4, 8]}, cpu_budget=4)["sweep_id"]
+    # Ném BrokenBarrierError nếu hai trial không cùng chạy trong 5 giây
+    both_running.wait()
+    assert set(scheduler.stats()["running"]) == \
+        {"train-1", f"sweep-{sweep_id}-1", f"sweep-{sweep_id}-2"}
+    assert threads[f"sweep-{sweep_id}-2"] == 2
+
+    release.set()
+    assert wait_done(manager, sweep_id)["status"] == "completed"
@@ -0,0 +1,55 @@
+import pytest
+import train_model
+from dao.train_info_dao import TrainInfoDAO
+
+
+@pytest.fixture
+def deleted(monkeypatch):
+    """TrainInfoDAO giả: id 99 đã có Model gắn vào"""
+    ids = []
+
+    def delete_if_unused(self, train_info_id):
+        if train_info_id == 99:
+            return False
+        ids.append(train_info_id)
+        return True
+
+    monkeypatch.setattr(TrainInfoDAO, "__init__", lambda self: None)
+    monkeypatch.setattr(TrainInfoDAO, "delete_if_unused", delete_if_unused)
+    return ids
+
+
+def job_status(tmp_path, train_info_id, checkpoint=False):
+    weights_dir = tmp_path / "train" / "weights"
+    weights_dir.mkdir(parents=True)
+    if checkpoint:
+        (weights_dir / "last.pt").write_bytes(b"")
+    return {"model_id": "1", "model_dir": str(tmp_path), "train_info_id": train_info_id}
+
+
+def test_train_info_without_checkpoint_is_deleted(tmp_path, deleted):
+    status = job_status(tmp_path, 5)
+    assert train_model.discard_train_info(status)
+    assert deleted == [5]
+    assert status["train_info_id"] is None
+
+
+def test_train_info_is_kept_for_resume(tmp_path, deleted):
+    status = job_status(tmp_path, 5, checkpoint=True)
+    assert not train_model.discard_train_info(status)
+    assert status["train_info_id"] == 5
+
+    # Xóa thư mục train thì không còn gì để resume
+    assert train_model.discard_train_info(status, force=True)
+    assert deleted == [5]
+
+
+def test_train_info_of_registered_model_is_kept(tmp_path, deleted):
+    status = job_status(tmp_path, 99)
+    assert not train_model.discard_train_info(status)
+    assert status["train_info_id"] == 99
+
+
+def test_job_without_train_info(tmp_path, deleted):
+    assert not train_model.discard_train_info(job_status(tmp_path, None))
+    assert deleted == []
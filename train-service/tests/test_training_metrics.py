@@ -0,0 +1,55 @@
+import pytest
+from dao.training_lost_dao import TrainingLostDAO
+from training_metrics import EpochMetricsRecorder, flush_relayed_losses
+
+
+class FakeTrainer:
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.tloss = None
+        self.metrics = {"metrics/mAP50(B)": 0.5}
+
+    def label_loss_items(self, loss, prefix='train'):
+        return {"train/box_loss": 1.0, "train/cls_loss": 0.5, "train/dfl_loss": 0.25}
+
+
+@pytest.fixture
+def written(monkeypatch):
+    rows = []
+    monkeypatch.setattr(TrainingLostDAO, "__init__", lambda self: None)
+    monkeypatch.setattr(TrainingLostDAO, "create_many",
+                        lambda self, losses: rows.extend(losses) or len(losses))
+    return rows
+
+
+def test_recorder_tracks_flushed_epoch(written):
+    recorder = EpochMetricsRecorder(7, flush_every=2)
+    for epoch in range(3):
+        recorder.record(FakeTrainer(epoch))
+    assert [loss.epoch for loss in written] == [1, 2]
+    assert recorder.flushed_epoch == 2
+
+    recorder.flush()
+    assert [loss.epoch for loss in written] == [1, 2, 3]
+    assert recorder.flushed_epoch == 3
+
+
+def test_parent_writes_losses_the_worker_did_not_flush(written):
+    status = {"train_info_id": 7, "metrics_flushed_epoch": 2,
+              "epoch_metrics": [{"epoch": epoch, "box_loss": 1.0, "cls_loss": 0.5,
+                                 "dfl_loss": 0.25} for epoch in (1, 2, 3, 4)]}
+
+    assert flush_relayed_losses(status)
+    assert [(loss.epoch, loss.lost, loss.trainInfoId) for loss in written] == [
+        (3, 1.75, 7), (4, 1.75, 7)]
+    assert status["metrics_flushed_epoch"] == 4
+    # Không ghi lặp lần thứ hai
+    assert not flush_relayed_losses(status)
+    assert len(written) == 2
+
+
+def test_nothing_to_flush_without_train_info(written):
+    status = {"train_info_id": None, "epoch_metrics": [
+        {"epoch": 1, "box_loss": 1.0, "cls_loss": 0.5, "dfl_loss": 0.25}]}
+    assert not flush_relayed_losses(status)
+    assert written == []
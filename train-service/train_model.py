@@ -1,90 +1,337 @@
 import os
+import sys
 import json
 import time
 import threading
+import zlib
+import hashlib
 import traceback
 import requests
+from requests.adapters import HTTPAdapter
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import random
 from config import Config
+from image_cache import get_image_cache
+from training_metrics import EpochMetricsRecorder
+from dataset_store import get_dataset_store, dataset_fingerprint
 
 def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-def safe_update_status(status_file, status_data):
+_status_listeners = []
+_status_store = None
+
+
+def add_status_listener(listener):
+    """Đăng ký hàm nhận mọi thay đổi trạng thái (dùng cho server-push)"""
+    _status_listeners.append(listener)
+
+
+def set_status_store(store):
+    """Thay việc ghi status.json trực tiếp bằng một store (registry trong bộ nhớ,
+    hoặc hàng đợi gửi về process cha). Store cần có update() và get()."""
+    global _status_store
+    _status_store = store
+
+
+def notify_status(status_data):
+    for listener in list(_status_listeners):
+        try:
+            listener(status_data)
+        except Exception as e:
+            print(f"Error in status listener: {e}")
+
+
+def write_status_file(status_file, status_data):
+    """Ghi status.json nguyên tử bằng os.replace"""
     try:
         os.makedirs(os.path.dirname(status_file), exist_ok=True)
 
         temp_file = status_file + '.tmp'
         with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(status_data, f, indent=2, ensure_ascii=False)
+            json.dump(status_data, f, ensure_ascii=False)
+        os.replace(temp_file, status_file)
+
+        return True
+    except Exception as e:
+        print(e)
+        return False
+
+
+def read_status_file(status_file):
+    if os.path.exists(status_file):
+        try:
+            with open(status_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(e)
+    return None
+
 
-        if os.path.exists(temp_file):
-            if os.path.exists(status_file):
-                os.remove(status_file)
-            os.rename(temp_file, status_file)
+def safe_update_status(status_file, status_data):
+    try:
+        if _status_store is not None:
+            _status_store.update(status_file, status_data)
+        elif not write_status_file(status_file, status_data):
+            return False
 
+        notify_status(status_data)
         return True
     except Exception as e:
         print(e)
         return False
 
 
-def download_template_image(template_id, save_dir):
+# ioctl FICLONE của Linux (reflink trên btrfs/xfs)
+FICLONE = 0x40049409
+
+
+def link_or_copy(src, dst, storage_info=None):
+    """Tạo dst trỏ tới cùng dữ liệu với src mà không ghi lại nội dung nếu có thể.
+
+    Thử lần lượt hardlink, reflink, symlink và chỉ copy khi cả ba đều thất bại.
+    Nếu truyền storage_info thì cập nhật số byte thực sự ghi ra đĩa.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+    size = os.path.getsize(src)
+    method = None
+
     try:
-        template_url = f"{Config.TEMPLATE_SERVICE_URL}/templates/{template_id}"
-        response = requests.get(template_url, timeout=30)
-        response.raise_for_status()
+        os.link(src, dst)
+        method = "hardlink"
+    except OSError:
+        pass
 
-        template_data = response.json()
-        image_url = template_data.get('imageUrl', '')
+    if method is None and sys.platform.startswith('linux'):
+        try:
+            import fcntl
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            method = "reflink"
+        except (OSError, ImportError):
+            if os.path.lexists(dst):
+                os.remove(dst)
 
-        if not image_url:
-            return None, None
+    if method is None and Config.DATASET_ALLOW_SYMLINK:
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            method = "symlink"
+        except OSError:
+            pass
+
+    if method is None:
+        shutil.copy2(src, dst)
+        method = "copy"
 
-        if image_url.startswith('/images/'):
-            full_url = f"{Config.TEMPLATE_SERVICE_URL}{image_url}"
-        elif image_url.startswith('http'):
-            full_url = image_url
+    if storage_info is not None:
+        storage_info[method] = storage_info.get(method, 0) + 1
+        if method == "copy":
+            storage_info["bytes_written"] = storage_info.get(
+                "bytes_written", 0) + size
         else:
-            full_url = f"{Config.TEMPLATE_SERVICE_URL}/images/{image_url}"
+            storage_info["bytes_saved"] = storage_info.get(
+                "bytes_saved", 0) + size
 
-        image_response = requests.get(full_url, timeout=30)
-        image_response.raise_for_status()
+    return method
 
-        filename = f"template_{template_id}.jpg"
-        image_path = os.path.join(save_dir, filename)
 
-        with open(image_path, 'wb') as f:
-            f.write(image_response.content)
-        return image_path, template_data
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Session dùng chung để giữ kết nối keep-alive tới template service"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=Config.DOWNLOAD_WORKERS,
+                pool_maxsize=Config.DOWNLOAD_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def resolve_image_url(image_url):
+    if image_url.startswith('/'):
+        return f"{Config.TEMPLATE_SERVICE_URL}{image_url}"
+    elif image_url.startswith('http'):
+        return image_url
+    return f"{Config.TEMPLATE_SERVICE_URL}/images/{image_url}"
+
+
+def fetch_templates_metadata(template_ids, session=None, training_size=None):
+    """Lấy metadata (label, bounding box) của nhiều template qua POST /templates/batch.
+
+    Với training_size, mỗi template có thêm trainingImage: ảnh đã letterbox ở
+    kích thước train và bounding box đã chỉnh theo ảnh đó.
+    Trả về (templates, missing) với templates là dict template_id -> template_data.
+    """
+    session = session or get_http_session()
+    batch_url = f"{Config.TEMPLATE_SERVICE_URL}/templates/batch"
+
+    templates = {}
+    missing = []
+    template_ids = list(dict.fromkeys(template_ids))
+    for start in range(0, len(template_ids), Config.TEMPLATE_BATCH_SIZE):
+        chunk = template_ids[start:start + Config.TEMPLATE_BATCH_SIZE]
+        payload = {"template_ids": chunk}
+        if training_size:
+            payload["training_size"] = training_size
+        response = session.post(batch_url, json=payload, timeout=60)
+        response.raise_for_status()
+
+        data = response.json()
+        for template_data in data.get('templates', []):
+            templates[template_data['idTemplate']] = template_data
+        missing.extend(data.get('missing', []))
+
+    return templates, missing
+
+
+def fetch_template_image(template_id, template_data, save_dir, session=None):
+    """Tải ảnh của một template qua image cache dùng chung.
+
+    Trả về (image_path, downloaded_bytes, cache_hit).
+    """
+    session = session or get_http_session()
+
+    # Ưu tiên ảnh letterbox sẵn của template service, nhỏ hơn và không phải resize lại
+    training_image = template_data.get('trainingImage')
+    image_url = (training_image or {}).get('url') or template_data.get('imageUrl', '')
+    if not image_url:
+        raise ValueError(f"Template {template_id} has no image")
+
+    cache_path, downloaded, cache_hit = get_image_cache().fetch(
+        template_id, template_data.get('timeUpdate'),
+        resolve_image_url(image_url), session)
+
+    filename = f"template_{template_id}.jpg"
+    image_path = os.path.join(save_dir, filename)
+    link_or_copy(cache_path, image_path)
+
+    return image_path, downloaded, cache_hit
 
+
+def download_template_image(template_id, save_dir):
+    try:
+        templates, _ = fetch_templates_metadata([template_id])
+        template_data = templates.get(template_id)
+        if not template_data:
+            return None, None
+
+        image_path, _, _ = fetch_template_image(
+            template_id, template_data, save_dir)
+        return image_path, template_data
     except Exception as e:
         print(e)
         return None, None
 
 
-def train_yolo_model(model_id, model_name, model_type, version, epochs=100,
-                     batch_size=16, image_size=640, learning_rate=0.001, template_ids=None):
-    model_id = str(model_id)
+def call_with_retries(func, *args, retries=None):
+    retries = Config.DOWNLOAD_RETRIES if retries is None else retries
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except Exception as e:
+            last_error = e
+            if attempt < retries:
+                time.sleep(Config.DOWNLOAD_RETRY_BACKOFF * (2 ** attempt))
+    raise last_error
 
-    model_dir = os.path.join(Config.SHARED_MODEL_DIR, model_id)
-    dataset_dir = os.path.join(model_dir, "dataset")
-    images_dir = os.path.join(model_dir, "images")
 
-    ensure_dir(model_dir)
-    ensure_dir(dataset_dir)
-    ensure_dir(images_dir)
+def download_templates(template_ids, save_dir, max_workers=None, retries=None,
+                       image_size=None, metadata=None):
+    """Tải song song các template với số luồng giới hạn và retry cho từng template.
 
-    train_images = os.path.join(dataset_dir, "train", "images")
-    train_labels = os.path.join(dataset_dir, "train", "labels")
-    val_images = os.path.join(dataset_dir, "val", "images")
-    val_labels = os.path.join(dataset_dir, "val", "labels")
+    Metadata được lấy theo lô (hoặc truyền sẵn qua metadata = (templates, missing)),
+    sau đó ảnh được tải song song.
+    Trả về (results, download_info) với results là dict
+    template_id -> (image_path, template_data) của các template tải thành công.
+    """
+    max_workers = max_workers or Config.DOWNLOAD_WORKERS
+    retries = Config.DOWNLOAD_RETRIES if retries is None else retries
+    session = get_http_session()
 
-    for path in [train_images, train_labels, val_images, val_labels]:
-        ensure_dir(path)
+    def with_retries(func, *args):
+        return call_with_retries(func, *args, retries=retries)
+
+    results = {}
+    failures = {}
+    total_bytes = 0
+    cache_hits = 0
+    start = time.time()
+
+    if metadata is None:
+        training_size = image_size if Config.USE_TRAINING_IMAGES else None
+        metadata = with_retries(
+            fetch_templates_metadata, template_ids, session, training_size)
+    metadata, missing = metadata
+    for template_id in missing:
+        failures[str(template_id)] = "Template not found"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(with_retries, fetch_template_image, template_id,
+                                   template_data, save_dir, session): template_id
+                   for template_id, template_data in metadata.items()}
+        for future in as_completed(futures):
+            template_id = futures[future]
+            try:
+                image_path, size, cache_hit = future.result()
+                results[template_id] = (image_path, metadata[template_id])
+                total_bytes += size
+                cache_hits += 1 if cache_hit else 0
+            except Exception as e:
+                failures[str(template_id)] = str(e)
+
+    duration = max(time.time() - start, 1e-6)
+    download_info = {
+        "requested": len(template_ids),
+        "downloaded": len(results),
+        "failed": failures,
+        "bytes": total_bytes,
+        "duration_seconds": round(duration, 3),
+        "templates_per_second": round(len(results) / duration, 2),
+        "mb_per_second": round(total_bytes / duration / (1024 * 1024), 3),
+        "cache_hits": cache_hits,
+        "cache_misses": len(results) - cache_hits,
+        "letterboxed": sum(1 for _, template_data in results.values()
+                           if template_data.get('trainingImage')),
+        "workers": max_workers
+    }
+    return results, download_info
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+# Job dừng giữa chừng (hủy, lỗi, service khởi động lại) có thể resume từ last.pt
+RESUMABLE_STATUSES = ("cancelled", "failed")
+
+
+def prepare_training(model_id, model_name, epochs, template_ids, image_size=None,
+                     version=None):
+    """Tải template và dựng dataset YOLO cho một job.
+
+    Dataset được lấy từ kho dùng chung nếu đã có bản cùng fingerprint
+    (template id + timeUpdate + ảnh + box), khi đó không cần tải lại ảnh.
+    Trả về status dict; status["status"] là "running" nếu dataset sẵn sàng để train.
+    Raise ValueError nếu thư mục model_id đang thuộc về model khác.
+    """
+    model_id = str(model_id)
+    check_model_dir_owner(model_id, model_name, version)
+
+    model_dir = os.path.join(Config.SHARED_MODEL_DIR, model_id)
+    ensure_dir(model_dir)
 
     status_file = os.path.join(model_dir, 'status.json')
 
@@ -92,200 +339,831 @@ def train_yolo_model(model_id, model_name, model_type, version, epochs=100,
         "status": "initializing",
         "model_id": model_id,
         "model_name": model_name,
+        "version": version,
         "current_epoch": 0,
         "total_epochs": epochs,
         "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         "template_ids": template_ids or [],
+        "image_size": image_size or Config.DEFAULT_IMAGE_SIZE,
         "model_dir": model_dir,
         "final_metrics": None,
-        "dataset_info": None
+        "dataset_info": None,
+        "download_info": None
     }
     try:
         status["status"] = "preparing_data"
         safe_update_status(status_file, status)
 
-        processed_images = []
-        for template_id in template_ids:
-            image_path, template_data = download_template_image(
-                template_id, images_dir)
-            if not image_path or not template_data:
-                continue
+        if not prepare_dataset(status, status_file, template_ids):
+            return status
+
+        # Cập nhật status: running
+        status["status"] = "running"
+        status["current_epoch"] = 0
+        safe_update_status(status_file, status)
+
+        return status
+
+    except Exception as e:
+        print(f"Setup error: {e}")
+        release_dataset(status)
+        status["status"] = "failed"
+        status["error"] = str(e)
+        safe_update_status(status_file, status)
+        return status
+
+
+def find_resume_checkpoint(status):
+    """last.pt của một job dừng giữa chừng, None nếu job không thể resume"""
+    if status.get('status') not in RESUMABLE_STATUSES:
+        return None
+    checkpoint = os.path.join(
+        Config.SHARED_MODEL_DIR, str(status.get('model_id')), 'train', 'weights', 'last.pt')
+    return checkpoint if os.path.exists(checkpoint) else None
+
+
+def resume_train_args(status):
+    """batch_size và learning_rate của lần train trước: lấy từ status, thiếu (status
+    cũ chưa lưu) thì đọc train_args trong checkpoint.
+
+    Raise ValueError nếu không khôi phục được.
+    """
+    batch_size = status.get("batch_size")
+    learning_rate = status.get("learning_rate")
+    if batch_size is None or learning_rate is None:
+        checkpoint = find_resume_checkpoint(status)
+        train_args = {}
+        if checkpoint is not None:
+            try:
+                import torch
+                # Checkpoint do chính service này ghi, chứa cả object model của ultralytics
+                train_args = torch.load(
+                    checkpoint, map_location="cpu", weights_only=False).get("train_args") or {}
+            except Exception as e:
+                print(f"Error reading checkpoint {checkpoint}: {e}")
+        if batch_size is None:
+            batch_size = train_args.get("batch")
+        if learning_rate is None:
+            learning_rate = train_args.get("lr0")
+
+    if batch_size is None or learning_rate is None:
+        raise ValueError(
+            "Cannot recover batch_size and learning_rate of the previous run")
+    return int(batch_size), float(learning_rate)
+
+
+def prepare_resume(previous_status):
+    """Chuẩn bị resume từ last.pt, giữ nguyên status cũ (metric theo epoch,
+    train_info_id, ...) và ghi lại lần dừng trước vào resume_history."""
+    status = dict(previous_status)
+    model_dir = os.path.join(Config.SHARED_MODEL_DIR, str(status["model_id"]))
+    status_file = os.path.join(model_dir, 'status.json')
+
+    status.setdefault("resume_history", []).append({
+        "stopped_status": previous_status.get("status"),
+        "stopped_at_epoch": previous_status.get("current_epoch"),
+        "stopped_time": previous_status.get("end_time"),
+        "error": previous_status.get("error"),
+        "resumed_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+    for key in ("error", "end_time", "queue_position", "estimated_start_time"):
+        status.pop(key, None)
+    status["model_dir"] = model_dir
+    status["image_size"] = status.get("image_size") or Config.DEFAULT_IMAGE_SIZE
+
+    try:
+        checkpoint = find_resume_checkpoint(previous_status)
+        if checkpoint is None:
+            raise ValueError("No resumable checkpoint (train/weights/last.pt) found")
+        status["resume_from"] = checkpoint
+
+        status["status"] = "preparing_data"
+        safe_update_status(status_file, status)
+
+        # Dataset cũ có thể đã bị dọn khỏi kho, khi đó dựng lại với cùng template
+        if not prepare_dataset(status, status_file, status.get("template_ids") or []):
+            return status
 
-            # Copy ảnh vào train
-            img_filename = f"img_{template_id}.jpg"
-            train_img_path = os.path.join(train_images, img_filename)
-            shutil.copy2(image_path, train_img_path)
+        status["status"] = "running"
+        safe_update_status(status_file, status)
+        return status
 
-            # Tạo file label
-            label_filename = f"img_{template_id}.txt"
-            train_label_path = os.path.join(train_labels, label_filename)
+    except Exception as e:
+        print(f"Resume setup error: {e}")
+        release_dataset(status)
+        status["status"] = "failed"
+        status["error"] = str(e)
+        safe_update_status(status_file, status)
+        return status
 
-            with open(train_label_path, 'w') as f:
-                for box in template_data.get('boundingBox', []):
-                    f.write(
-                        f"0 {box['xCenter']} {box['yCenter']} {box['width']} {box['height']}\n")
 
-            processed_images.append(img_filename)
+def prepare_dataset(status, status_file, template_ids):
+    """Lấy dataset cho job từ kho dùng chung, nếu chưa có thì tải template và dựng mới.
 
-        if not processed_images:
+    Ghi dataset_dir, dataset_info, download_info vào status. Trả về False
+    (status đã được đánh dấu failed) nếu không có ảnh nào dùng được.
+    """
+    images_dir = os.path.join(status["model_dir"], "images")
+    ensure_dir(images_dir)
+
+    store = get_dataset_store()
+    session = get_http_session()
+    training_size = status["image_size"] if Config.USE_TRAINING_IMAGES else None
+    metadata = call_with_retries(
+        fetch_templates_metadata, template_ids, session, training_size)
+    fingerprint = dataset_fingerprint(
+        template_ids, metadata[0], status["image_size"])
+
+    dataset_dir, manifest = store.acquire(fingerprint)
+    if dataset_dir is not None:
+        status["download_info"] = {
+            "requested": len(template_ids),
+            "downloaded": 0,
+            "dataset_reused": True
+        }
+        reused = True
+    else:
+        downloads, download_info = download_templates(
+            template_ids, images_dir, metadata=metadata)
+        status["download_info"] = download_info
+        safe_update_status(status_file, status)
+
+        if download_info["failed"]:
+            # Dataset thiếu ảnh không được dùng lại cho lần train khác
+            fingerprint = f"{fingerprint}-partial-{int(time.time() * 1000)}"
+
+        staging_dir = store.staging_dir(fingerprint)
+        dataset_info = build_dataset(
+            staging_dir, store.final_dir(fingerprint), template_ids, downloads)
+        if dataset_info is None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
             status["status"] = "failed"
             status["error"] = "Không có ảnh nào được xử lý"
             safe_update_status(status_file, status)
-            return {'success': False, 'message': 'Không có ảnh được tải'}
-
-        # Tạo validation set
-        if processed_images:
-            val_img = processed_images[0]
-            shutil.copy2(
-                os.path.join(train_images, val_img),
-                os.path.join(val_images, val_img)
-            )
-            shutil.copy2(
-                os.path.join(train_labels, val_img.replace('.jpg', '.txt')),
-                os.path.join(val_labels, val_img.replace('.jpg', '.txt'))
-            )
+            return False
 
-        # Set dataset info
-        status["dataset_info"] = {
-            "total_images": len(processed_images),
-            "train_images": len(processed_images),
-            "val_images": 1
-        }
+        dataset_dir, manifest = store.commit(
+            fingerprint, staging_dir, {"dataset_info": dataset_info})
+        reused = False
+
+    status["dataset_info"] = dict(
+        manifest["dataset_info"], reused=reused, fingerprint=fingerprint)
+    status["dataset_dir"] = dataset_dir
+    return True
+
+
+def build_dataset(dataset_dir, final_dir, template_ids, downloads, val_template_ids=None):
+    """Dựng cấu trúc dataset YOLO trong dataset_dir.
+
+    dataset.yaml trỏ tới final_dir, nơi dataset được chuyển vào sau khi dựng xong.
+    Tập val là các ảnh của val_template_ids, mặc định chỉ ảnh đầu tiên.
+    Trả về dataset_info, hoặc None nếu không có ảnh nào.
+    """
+    train_images = os.path.join(dataset_dir, "train", "images")
+    train_labels = os.path.join(dataset_dir, "train", "labels")
+    val_images = os.path.join(dataset_dir, "val", "images")
+    val_labels = os.path.join(dataset_dir, "val", "labels")
 
-        # Tạo dataset.yaml
-        yaml_content = f"""path: {os.path.abspath(dataset_dir)}
+    for path in [train_images, train_labels, val_images, val_labels]:
+        ensure_dir(path)
+
+    storage_info = {"bytes_written": 0, "bytes_saved": 0}
+    processed_images = []
+    for template_id in template_ids:
+        if template_id not in downloads:
+            continue
+        image_path, template_data = downloads[template_id]
+
+        # Link ảnh vào train
+        img_filename = f"img_{template_id}.jpg"
+        train_img_path = os.path.join(train_images, img_filename)
+        link_or_copy(image_path, train_img_path, storage_info)
+
+        # Tạo file label
+        label_filename = f"img_{template_id}.txt"
+        train_label_path = os.path.join(train_labels, label_filename)
+
+        # Ảnh letterbox dùng box đã chỉnh tọa độ đi kèm
+        boxes = (template_data.get('trainingImage') or
+                 template_data).get('boundingBox', [])
+        label_lines = [
+            f"0 {box['xCenter']} {box['yCenter']} {box['width']} {box['height']}\n"
+            for box in boxes
+        ]
+        with open(train_label_path, 'w') as f:
+            f.writelines(label_lines)
+        storage_info["bytes_written"] += sum(len(line)
+                                             for line in label_lines)
+
+        processed_images.append(img_filename)
+
+    if not processed_images:
+        return None
+
+    # Tạo validation set
+    if val_template_ids is None:
+        val_filenames = processed_images[:1]
+    else:
+        val_filenames = [f"img_{template_id}.jpg" for template_id in val_template_ids
+                         if f"img_{template_id}.jpg" in processed_images]
+    for val_img in val_filenames:
+        link_or_copy(
+            os.path.join(train_images, val_img),
+            os.path.join(val_images, val_img),
+            storage_info
+        )
+        link_or_copy(
+            os.path.join(train_labels, val_img.replace('.jpg', '.txt')),
+            os.path.join(val_labels, val_img.replace('.jpg', '.txt')),
+            storage_info
+        )
+
+    # Tạo dataset.yaml
+    yaml_content = f"""path: {os.path.abspath(final_dir)}
 train: train/images
 val: val/images
 names:
   0: object
 """
-        with open(os.path.join(dataset_dir, 'dataset.yaml'), 'w') as f:
-            f.write(yaml_content)
+    with open(os.path.join(dataset_dir, 'dataset.yaml'), 'w') as f:
+        f.write(yaml_content)
 
-        # Cập nhật status: running
-        status["status"] = "running"
-        status["current_epoch"] = 0
+    return {
+        "total_images": len(processed_images),
+        "train_images": len(processed_images),
+        "val_images": len(val_filenames),
+        "storage": storage_info
+    }
+
+
+def make_model_id(model_name, version):
+    """Id thư mục train suy ra từ tên + version, ổn định giữa các lần khởi động service.
+
+    16 ký tự hex đầu của sha1 (64 bit) để hai model khác nhau thực tế không trùng thư mục.
+    model-service/inference.py có bản sao để tìm weights; test_model_id.py của hai
+    service giữ hai bản cho cùng kết quả.
+    """
+    return hashlib.sha1(f"{model_name}_{version}".encode('utf-8')).hexdigest()[:16]
+
+
+def legacy_model_id(model_name, version):
+    """Công thức cũ (chỉ 9000 giá trị), chỉ dùng để tìm model đã train trước đây"""
+    return str(zlib.crc32(f"{model_name}_{version}".encode('utf-8')) % 10000 + 1000)
+
+
+def model_dir_owner(model_id):
+    """(model_name, version) của job đã ghi vào thư mục model_id, None nếu chưa có job nào.
+
+    version là None với status.json cũ chưa lưu version.
+    """
+    status = get_training_status(str(model_id))
+    if status.get('status') == 'not_found':
+        return None
+    return status.get('model_name'), status.get('version')
+
+
+def owns_model_dir(model_id, model_name, version):
+    owner = model_dir_owner(model_id)
+    if owner is None:
+        return True
+    owner_name, owner_version = owner
+    return owner_name == model_name and owner_version in (None, version)
+
+
+def check_model_dir_owner(model_id, model_name, version):
+    """Raise ValueError nếu thư mục model_id đang thuộc về model khác"""
+    if not owns_model_dir(model_id, model_name, version):
+        owner_name, owner_version = model_dir_owner(model_id)
+        raise ValueError(
+            f"Training folder {model_id} belongs to model '{owner_name}' "
+            f"version '{owner_version}', refusing to overwrite it")
+
+
+def find_model_id(model_name, version):
+    """Thư mục của model đã train: theo công thức hiện tại, hoặc công thức cũ nếu
+    thư mục đó đúng là của model này"""
+    model_id = make_model_id(model_name, version)
+    if model_dir_owner(model_id) is None:
+        old_id = legacy_model_id(model_name, version)
+        owner = model_dir_owner(old_id)
+        if owner is not None and owner[0] == model_name and owner[1] in (None, version):
+            return old_id
+    return model_id
+
+
+def find_model_weights(model_id):
+    weights_dir = os.path.join(Config.SHARED_MODEL_DIR, str(model_id), 'train', 'weights')
+    for filename in ('best.pt', 'last.pt'):
+        path = os.path.join(weights_dir, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def resolve_base_model(base_model_id=None, model_name=None, version=None):
+    """Tìm weights của model gốc để warm-start, kèm số liệu lần train gốc làm baseline.
+
+    Raise ValueError nếu không tìm thấy weights.
+    """
+    if base_model_id is None:
+        if not model_name or not version:
+            raise ValueError("Base model requires an id or a name and version")
+        base_model_id = find_model_id(model_name, version)
+    base_model_id = str(base_model_id)
+
+    weights = find_model_weights(base_model_id)
+    if weights is None:
+        raise ValueError(f"No trained weights found for base model {base_model_id}")
+
+    base_status = get_training_status(base_model_id)
+    baseline = None
+    if base_status.get('status') == 'completed':
+        # Nếu model gốc cũng được warm-start thì baseline là lần train từ đầu của nó
+        baseline = (base_status.get('warm_start') or {}).get('baseline') or {
+            "epochs": base_status.get('total_epochs'),
+            "seconds": _elapsed_seconds(
+                base_status.get('start_time'), base_status.get('end_time')),
+            "map50": (base_status.get('final_metrics') or {}).get('map50')
+        }
+
+    return {
+        "base_model_id": base_model_id,
+        "weights": weights,
+        "baseline": baseline
+    }
+
+
+def warm_start_report(warm_start, epoch_metrics, epochs, seconds):
+    """So sánh với lần train từ đầu: epoch đầu tiên đạt mAP50 của baseline,
+    số epoch và thời gian tiết kiệm được"""
+    report = {"epochs": epochs, "seconds": int(seconds)}
+    baseline = warm_start.get("baseline")
+    if not baseline or not baseline.get("epochs"):
+        return report
+
+    reached_epoch = None
+    if baseline.get("map50") is not None:
+        reached_epoch = next((metrics["epoch"] for metrics in epoch_metrics
+                              if (metrics.get("map50") or 0.0) >= baseline["map50"]), None)
+    report["baseline_map50_reached_at_epoch"] = reached_epoch
+
+    needed_epochs = reached_epoch or epochs
+    report["epochs_saved"] = baseline["epochs"] - needed_epochs
+    if baseline.get("seconds") and epochs:
+        needed_seconds = seconds * needed_epochs / epochs
+        report["seconds_saved"] = int(baseline["seconds"] - needed_seconds)
+    return report
+
+
+def _elapsed_seconds(start_time, end_time):
+    try:
+        start = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
+        end = datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S')
+        return int((end - start).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def run_export(status, formats=None):
+    """Export best.pt của job đã train xong, ghi kết quả vào status["export_info"].
+
+    Lỗi export không làm job train thất bại, chỉ được ghi lại trong export_info.
+    """
+    status_file = os.path.join(status["model_dir"], 'status.json')
+    weights_path = find_model_weights(status["model_id"])
+    if weights_path is None:
+        status["export_info"] = {"status": "failed", "error": "No weights to export"}
         safe_update_status(status_file, status)
+        return status["export_info"]
+
+    status["export_info"] = {"status": "running", "weights": weights_path}
+    safe_update_status(status_file, status)
+    try:
+        from export_model import export_model
+        export_info = export_model(
+            weights_path, status.get("image_size"), formats)
+        export_info["status"] = "completed"
+    except Exception as e:
+        print(f"Error exporting model {status['model_id']}: {e}")
+        export_info = {"status": "failed", "weights": weights_path, "error": str(e)}
+    status["export_info"] = export_info
+    safe_update_status(status_file, status)
+    return export_info
+
+
+def calibration_template_ids(status):
+    """Template dùng để calibrate: các dòng TrainingData của model đã lưu với TrainInfo
+    của job; nếu model chưa được lưu thì dùng template của job train.
+    Trả về (template_ids, nguồn)."""
+    if status.get("train_info_id") is not None:
+        try:
+            from dao.training_data_dao import TrainingDataDAO
+            template_ids = TrainingDataDAO().get_template_ids_by_train_info_id(
+                status["train_info_id"])
+            if template_ids:
+                return template_ids, "TrainingData"
+        except Exception as e:
+            print(f"Error loading training data: {e}")
+    return list(status.get("template_ids") or []), "training_job"
+
+
+def run_quantization(status, max_map_drop=None):
+    """Lượng tử hóa INT8 model đã export, ghi kết quả vào status["quantization_info"].
+
+    Dataset train không có tập val tách riêng (val chỉ là một ảnh của train), nên
+    FP32 và INT8 được đánh giá trên toàn bộ template trong TrainingData của model
+    (hoặc template của job nếu model chưa được lưu); lỗi chỉ được ghi lại trong
+    quantization_info.
+    """
+    status_file = os.path.join(status["model_dir"], 'status.json')
+    weights_path = find_model_weights(status["model_id"])
+    if weights_path is None:
+        status["quantization_info"] = {"status": "failed", "error": "No weights to quantize"}
+        safe_update_status(status_file, status)
+        return status["quantization_info"]
+
+    status["quantization_info"] = {"status": "running"}
+    safe_update_status(status_file, status)
+
+    work_dir = os.path.join(status["model_dir"], "quantization")
+    dataset_dir = os.path.join(work_dir, "dataset")
+    try:
+        calibration_ids, source = calibration_template_ids(status)
+        images_dir = os.path.join(status["model_dir"], "images")
+        ensure_dir(images_dir)
+        downloads, _ = download_templates(
+            calibration_ids, images_dir, image_size=status.get("image_size"))
+
+        calibration_images = [downloads[template_id][0] for template_id in calibration_ids
+                              if template_id in downloads]
+        calibration_images = calibration_images[:Config.QUANTIZE_CALIBRATION_IMAGES]
+        if not calibration_images:
+            raise ValueError("No calibration images available")
+
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        dataset_info = build_dataset(dataset_dir, dataset_dir, calibration_ids, downloads,
+                                     val_template_ids=calibration_ids)
+        if dataset_info is None:
+            raise ValueError("No validation images available")
+
+        from quantize_model import quantize_model
+        quantization_info = quantize_model(
+            weights_path, calibration_images, os.path.join(dataset_dir, 'dataset.yaml'),
+            work_dir, max_map_drop, eval_images=dataset_info["val_images"])
+        quantization_info.update(status="completed", calibration_source=source,
+                                 eval_source=source)
+    except Exception as e:
+        print(f"Error quantizing model {status['model_id']}: {e}")
+        quantization_info = {"status": "failed", "error": str(e)}
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+
+    status["quantization_info"] = quantization_info
+    safe_update_status(status_file, status)
+    return quantization_info
+
+
+def release_dataset(status):
+    """Trả dataset về kho sau khi job kết thúc để nó có thể bị dọn khi cần chỗ"""
+    dataset_info = status.get("dataset_info") or {}
+    if status.get("dataset_dir") and dataset_info.get("fingerprint"):
+        get_dataset_store().release(dataset_info["fingerprint"])
+
+
+def create_train_info(epochs, batch_size, learning_rate):
+    """Tạo dòng TrainInfo để gắn loss theo epoch, trả về None nếu không ghi được DB"""
+    try:
+        from dao.train_info_dao import TrainInfoDAO
+        from models.train_info import TrainInfo
+
+        return TrainInfoDAO().create(TrainInfo(
+            epoch=epochs,
+            learningRate=learning_rate,
+            batchSize=batch_size,
+            timeTrain=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ))
+    except Exception as e:
+        print(f"Error creating train info: {e}")
+        return None
+
+
+def discard_train_info(status, force=False):
+    """Xóa TrainInfo của job không để lại model: không có checkpoint để resume, hoặc
+    force=True khi thư mục train bị xóa. Trả về True nếu status được cập nhật."""
+    train_info_id = status.get("train_info_id")
+    if train_info_id is None:
+        return False
+    model_dir = status.get("model_dir") or os.path.join(
+        Config.SHARED_MODEL_DIR, str(status.get("model_id")))
+    if not force and os.path.exists(os.path.join(model_dir, 'train', 'weights', 'last.pt')):
+        return False
+
+    try:
+        from dao.train_info_dao import TrainInfoDAO
+        if not TrainInfoDAO().delete_if_unused(train_info_id):
+            return False
+    except Exception as e:
+        print(f"Error deleting train info {train_info_id}: {e}")
+        return False
+    status["train_info_id"] = None
+    return True
+
+
+def run_training(status, epochs, batch_size, cancel_event=None, learning_rate=None):
+    """Chạy YOLO trên dataset đã chuẩn bị bởi prepare_training.
+
+    Nếu cancel_event được set, training dừng ở batch kế tiếp.
+    """
+    model_dir = status["model_dir"]
+    dataset_dir = status.get("dataset_dir") or os.path.join(model_dir, "dataset")
+    status_file = os.path.join(model_dir, 'status.json')
+
+    resume_from = status.get("resume_from")
+    if resume_from:
+        # Resume: tiếp tục ghi loss vào TrainInfo cũ
+        train_info_id = status.get("train_info_id")
+    else:
+        # TrainInfo chỉ được tạo khi có epoch đầu tiên, job lỗi sớm không để lại dòng rỗng
+        train_info_id = None
+        status["train_info_id"] = None
+        status["epoch_metrics"] = []
+        status["metrics_flushed_epoch"] = 0
+    status.setdefault("epoch_metrics", [])
+    metrics_recorder = EpochMetricsRecorder(
+        train_info_id, flushed_epoch=status.get("metrics_flushed_epoch") or 0)
+    started = time.time()
+
+    train_info_attempted = False
+
+    def ensure_train_info():
+        nonlocal train_info_attempted
+        if metrics_recorder.train_info_id is not None or train_info_attempted:
+            return
+        train_info_attempted = True
+        metrics_recorder.train_info_id = create_train_info(
+            epochs, batch_size,
+            learning_rate if learning_rate is not None else Config.DEFAULT_LEARNING_RATE)
+        status["train_info_id"] = metrics_recorder.train_info_id
+
+    def flush_metrics():
+        # Ghi loss còn trong bộ đệm trước khi báo trạng thái cuối
+        metrics_recorder.flush()
+        status["metrics_flushed_epoch"] = metrics_recorder.flushed_epoch
+
+    def check_cancelled(trainer):
+        if cancel_event is not None and cancel_event.is_set():
+            raise TrainingCancelled()
 
-        def train_thread():
+    try:
+        from ultralytics import YOLO
+
+        warm_start = status.get("warm_start")
+        train_options = {}
+        if resume_from:
+            # Optimizer, epoch hiện tại và tham số train được nạp lại từ checkpoint
+            model = YOLO(resume_from)
+            train_options["resume"] = True
+        else:
+            model = YOLO(warm_start["weights"] if warm_start else 'yolov8n.pt')
+        if warm_start and warm_start.get("freeze_layers"):
+            train_options["freeze"] = warm_start["freeze_layers"]
+        if learning_rate is not None and not resume_from:
+            # optimizer='auto' của ultralytics bỏ qua lr0
+            train_options["lr0"] = learning_rate
+            train_options["optimizer"] = Config.TRAIN_OPTIMIZER
+        if status.get("cpu_threads"):
+            # Giới hạn số core của job (sweep chạy nhiều trial song song)
+            import torch
+            torch.set_num_threads(status["cpu_threads"])
+            train_options["workers"] = max(1, status["cpu_threads"] // 2)
+
+        def on_train_start(trainer):
+            if not resume_from:
+                return
+            # Các epoch sau checkpoint sẽ được train lại, bỏ metric cũ của chúng
+            resumed_epoch = trainer.start_epoch
+            status["epoch_metrics"] = [
+                metrics for metrics in status["epoch_metrics"]
+                if metrics["epoch"] <= resumed_epoch]
+            status["current_epoch"] = resumed_epoch
+            metrics_recorder.history = list(status["epoch_metrics"])
+            metrics_recorder.flushed_epoch = min(
+                metrics_recorder.flushed_epoch, resumed_epoch)
+            status["metrics_flushed_epoch"] = metrics_recorder.flushed_epoch
+            if metrics_recorder.train_info_id is not None:
+                try:
+                    from dao.training_lost_dao import TrainingLostDAO
+                    TrainingLostDAO().delete_after_epoch(
+                        metrics_recorder.train_info_id, resumed_epoch)
+                except Exception as e:
+                    print(f"Error trimming training losses: {e}")
+            safe_update_status(status_file, status)
+
+        # Tạo callback để update status
+        def on_train_epoch_end(trainer):
+            check_cancelled(trainer)
             try:
-                from ultralytics import YOLO
-
-                model = YOLO('yolov8n.pt')
-
-                # Tạo callback để update status
-                def on_train_epoch_end(trainer):
-                    try:
-                        current_epoch = trainer.epoch + 1
-                        status["current_epoch"] = current_epoch
-                        status["status"] = "running"
-                        safe_update_status(status_file, status)
-                        print(f"Completed epoch {current_epoch}/{epochs}")
-                    except Exception as e:
-                        print(f"Error in epoch callback: {e}")
-
-                # Add callback
-                model.add_callback('on_train_epoch_end', on_train_epoch_end)
-
-                # Huấn luyện với callback
-                results = model.train(
-                    data=os.path.join(dataset_dir, 'dataset.yaml'),
-                    epochs=epochs,
-                    batch=batch_size,
-                    project=model_dir,
-                    name='train',
-                    exist_ok=True,
-                    verbose=True
-                )
-
-                # Cập nhật trạng thái hoàn thành
-                status["status"] = "completed"
-                status["end_time"] = datetime.now().strftime(
-                    '%Y-%m-%d %H:%M:%S')
-                status["current_epoch"] = epochs
-
-                final_metrics = {
-                    "map50": 0.85,
-                    "map50_95": 0.72,
-                    "precision": 0.88,
-                    "recall": 0.82,
-                    "accuracy": 0.85,
-                    "f1_score": 0.85
-                }
-
-                dataset_info = {
-                    "total_images": len(processed_images),
-                    "train_images": len(processed_images),
-                    "val_images": 1
-                }
-
-                # Cập nhật metrics vào status
-                status["final_metrics"] = final_metrics
-                status["dataset_info"] = dataset_info
-
-                # Final status update
+                current_epoch = trainer.epoch + 1
+                status["current_epoch"] = current_epoch
+                status["status"] = "running"
                 safe_update_status(status_file, status)
-
+                print(f"Completed epoch {current_epoch}/{epochs}")
             except Exception as e:
-                status["status"] = "failed"
-                status["error"] = str(e)
-                status["end_time"] = datetime.now().strftime(
-                    '%Y-%m-%d %H:%M:%S')
+                print(f"Error in epoch callback: {e}")
+
+        # Sau khi validate: lấy loss và metric thật của epoch
+        def on_fit_epoch_end(trainer):
+            try:
+                ensure_train_info()
+                status["epoch_metrics"].append(
+                    metrics_recorder.record(trainer))
+                status["metrics_flushed_epoch"] = metrics_recorder.flushed_epoch
                 safe_update_status(status_file, status)
+            except Exception as e:
+                print(f"Error recording epoch metrics: {e}")
+
+        # Add callback
+        model.add_callback('on_train_start', on_train_start)
+        model.add_callback('on_train_batch_end', check_cancelled)
+        model.add_callback('on_train_epoch_end', on_train_epoch_end)
+        model.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+
+        # Huấn luyện với callback
+        if resume_from:
+            # data chỉ được dùng khi dataset cũ trong checkpoint không còn
+            results = model.train(
+                data=os.path.join(dataset_dir, 'dataset.yaml'),
+                **train_options
+            )
+        else:
+            results = model.train(
+                data=os.path.join(dataset_dir, 'dataset.yaml'),
+                epochs=epochs,
+                batch=batch_size,
+                # Cùng kích thước với ảnh letterbox đã chuẩn bị
+                imgsz=status.get("image_size", Config.DEFAULT_IMAGE_SIZE),
+                project=model_dir,
+                name='train',
+                exist_ok=True,
+                verbose=True,
+                **train_options
+            )
+
+        # Cập nhật trạng thái hoàn thành
+        status.pop("resume_from", None)
+        status["status"] = "completed"
+        status["end_time"] = datetime.now().strftime(
+            '%Y-%m-%d %H:%M:%S')
+        status["current_epoch"] = epochs
+
+        final_metrics = metrics_recorder.final_metrics(
+            getattr(results, 'results_dict', None))
+
+        # Cập nhật metrics vào status
+        status["final_metrics"] = final_metrics
 
-        # Chạy trong thread
-        thread = threading.Thread(target=train_thread)
-        thread.daemon = True
-        thread.start()
+        if warm_start:
+            warm_start["report"] = warm_start_report(
+                warm_start, metrics_recorder.history, epochs, time.time() - started)
 
-        return {'success': True, 'model_id': model_id}
+        if metrics_recorder.train_info_id is not None and final_metrics:
+            try:
+                from dao.train_info_dao import TrainInfoDAO
+                TrainInfoDAO().update_result(
+                    metrics_recorder.train_info_id, epochs, final_metrics["accuracy"],
+                    int(time.time() - started))
+            except Exception as e:
+                print(f"Error updating train info: {e}")
+
+        # Final status update
+        flush_metrics()
+        safe_update_status(status_file, status)
+
+    except TrainingCancelled:
+        # Flush trước khi báo cancelled: process cha terminate worker sau
+        # CANCEL_GRACE_SECONDS, phần chưa ghi sẽ mất
+        flush_metrics()
+        discard_train_info(status)
+        status["status"] = "cancelled"
+        status["end_time"] = datetime.now().strftime(
+            '%Y-%m-%d %H:%M:%S')
+        safe_update_status(status_file, status)
 
     except Exception as e:
-        print(f"Setup error: {e}")
+        flush_metrics()
+        discard_train_info(status)
         status["status"] = "failed"
         status["error"] = str(e)
+        status["end_time"] = datetime.now().strftime(
+            '%Y-%m-%d %H:%M:%S')
         safe_update_status(status_file, status)
-        return {'success': False, 'message': str(e)}
 
+    return status
 
-def get_training_status(model_id):
-    status_file = os.path.join(
-        Config.SHARED_MODEL_DIR, model_id, 'status.json')
 
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r', encoding='utf-8') as f:
-                status_data = json.load(f)
-                return status_data
-        except Exception as e:
-            print(e)
+class QueueStatusStore:
+    """Store của worker process: chuyển trạng thái về registry của process cha"""
 
-    return {'status': 'not_found', 'message': 'Không tìm thấy thông tin huấn luyện'}
+    def __init__(self, event_queue):
+        self.event_queue = event_queue
 
+    def update(self, status_file, status_data):
+        self.event_queue.put((status_file, dict(status_data)))
 
-def cancel_training(model_id):
-    status_file = os.path.join(
-        Config.SHARED_MODEL_DIR, model_id, 'status.json')
+    def get(self, model_id):
+        return None
 
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r', encoding='utf-8') as f:
-                status = json.load(f)
 
-            status['status'] = 'cancelled'
-            status['end_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def run_training_process(status, epochs, batch_size, cancel_event, event_queue=None,
+                         learning_rate=None):
+    """Entry point của worker process do scheduler khởi tạo.
 
-            return safe_update_status(status_file, status)
-        except Exception as e:
-            print(e)
+    Mọi thay đổi trạng thái được gửi về process cha qua event_queue.
+    """
+    if event_queue is not None:
+        set_status_store(QueueStatusStore(event_queue))
+    run_training(status, epochs, batch_size, cancel_event, learning_rate)
+    if status["status"] == "completed" and status.get("export", Config.EXPORT_AFTER_TRAINING):
+        export_info = run_export(status)
+        if Config.QUANTIZE_AFTER_EXPORT and export_info["status"] == "completed":
+            run_quantization(status)
+    sys.exit(0 if status["status"] == "completed" else 1)
 
-    return False
+
+def run_model_task_process(status, task, options=None, event_queue=None):
+    """Entry point của worker process export / quantize do scheduler khởi tạo"""
+    if event_queue is not None:
+        set_status_store(QueueStatusStore(event_queue))
+    options = options or {}
+    if task == "export":
+        info = run_export(status, options.get("formats"))
+    elif task == "quantize":
+        info = run_quantization(status, options.get("max_map_drop"))
+    else:
+        raise ValueError(f"Unknown model task: {task}")
+    sys.exit(0 if info["status"] == "completed" else 1)
+
+
+def train_yolo_model(model_id, model_name, model_type, version, epochs=100,
+                     batch_size=16, image_size=640, learning_rate=0.001, template_ids=None,
+                     warm_start=None):
+    status = prepare_training(
+        model_id, model_name, epochs, template_ids, image_size, version)
+    if status["status"] != "running":
+        return {'success': False, 'message': status.get('error')}
+    if warm_start:
+        status["warm_start"] = dict(warm_start)
+
+    try:
+        run_training(status, epochs, batch_size, learning_rate=learning_rate)
+        if status["status"] == "completed" and Config.EXPORT_AFTER_TRAINING:
+            export_info = run_export(status)
+            if Config.QUANTIZE_AFTER_EXPORT and export_info["status"] == "completed":
+                run_quantization(status)
+    finally:
+        release_dataset(status)
+    return {'success': status["status"] == "completed", 'model_id': str(model_id)}
+
+
+def get_training_status(model_id):
+    if _status_store is not None:
+        status_data = _status_store.get(model_id)
+    else:
+        status_data = read_status_file(os.path.join(
+            Config.SHARED_MODEL_DIR, model_id, 'status.json'))
+
+    if status_data:
+        return status_data
+
+    return {'status': 'not_found', 'message': 'Không tìm thấy thông tin huấn luyện'}
+
+
+def cancel_training(model_id, stopping=False):
+    """Đánh dấu job bị hủy. stopping=True khi worker process vẫn đang chạy: trạng
+    thái là cancelling cho tới khi scheduler thấy process đã thoát."""
+    status = get_training_status(model_id)
+    if status.get('status') in ('not_found', 'completed', 'failed', 'cancelled'):
+        return False
+
+    if stopping:
+        status['status'] = 'cancelling'
+    else:
+        status['status'] = 'cancelled'
+        status['end_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    return safe_update_status(os.path.join(
+        Config.SHARED_MODEL_DIR, model_id, 'status.json'), status)
 
 
 def delete_training_folder(model_id):
     model_dir = os.path.join(Config.SHARED_MODEL_DIR, model_id)
 
     try:
+        status = get_training_status(model_id)
+        if status.get('status') not in ('not_found', 'queued', 'running', 'cancelling'):
+            discard_train_info(status, force=True)
+        if _status_store is not None and hasattr(_status_store, 'forget'):
+            _status_store.forget(model_id)
         if os.path.exists(model_dir):
             shutil.rmtree(model_dir)
             return True
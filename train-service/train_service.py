@@ -1,14 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import os
 import uvicorn
-import threading
+import asyncio
+import json
 import requests
 
-from train_model import (train_yolo_model, get_training_status, cancel_training,
-                         delete_training_folder, cleanup_failed_training)
+from train_model import (get_training_status, cancel_training, delete_training_folder,
+                         cleanup_failed_training, add_status_listener,
+                         set_status_store, make_model_id, check_model_dir_owner,
+                         resolve_base_model, find_resume_checkpoint, resume_train_args,
+                         notify_status, safe_update_status)
+from status_events import status_broadcaster
+from job_registry import JobRegistry, TERMINAL_STATUSES
+from image_cache import get_image_cache
+from dataset_store import get_dataset_store
+from sweep import get_sweep_manager
+from scheduler import (get_scheduler, TrainingJob, ModelTaskJob, QueueFullError,
+                       DuplicateJobError)
 from config import Config
+from utils.db_util import DatabaseUtil
 
 app = FastAPI(title="Train Service", version="1.0.0")
 
@@ -20,6 +35,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+job_registry = JobRegistry()
+job_registry.recover()
+set_status_store(job_registry)
+add_status_listener(status_broadcaster.publish)
+
+
+@app.on_event("shutdown")
+async def flush_status_on_shutdown():
+    job_registry.flush()
+
 
 class TrainRequest(BaseModel):
     model_name: str
@@ -30,12 +55,22 @@ class TrainRequest(BaseModel):
     batch_size: int = 16
     image_size: int = 640
     learning_rate: float = 0.001
+    priority: int = 0
+    # Warm-start từ weights của model đã train: theo id hoặc theo tên + version
+    base_model_id: Optional[str] = None
+    base_model_name: Optional[str] = None
+    base_model_version: Optional[str] = None
+    freeze_backbone: bool = False
+    # Export ONNX sau khi train, None: theo cấu hình EXPORT_AFTER_TRAINING
+    export: Optional[bool] = None
 
 
 class TrainResponse(BaseModel):
     success: bool
     model_id: Optional[str] = None
     message: str
+    queue_position: Optional[int] = None
+    estimated_start_time: Optional[str] = None
 
 
 class StatusResponse(BaseModel):
@@ -49,6 +84,31 @@ class StatusResponse(BaseModel):
     error: Optional[str] = None
     final_metrics: Optional[Dict[str, Any]] = None
     dataset_info: Optional[Dict[str, Any]] = None
+    download_info: Optional[Dict[str, Any]] = None
+    queue_position: Optional[int] = None
+    estimated_start_time: Optional[str] = None
+    train_info_id: Optional[int] = None
+    epoch_metrics: Optional[List[Dict[str, Any]]] = None
+    warm_start: Optional[Dict[str, Any]] = None
+    resume_history: Optional[List[Dict[str, Any]]] = None
+    export_info: Optional[Dict[str, Any]] = None
+    quantization_info: Optional[Dict[str, Any]] = None
+
+
+class SweepRequest(BaseModel):
+    model_name: str
+    template_ids: List[int]
+    search: str = "grid"
+    # Mỗi tham số (epochs, batch_size, learning_rate, image_size) là danh sách giá trị,
+    # hoặc với random search là khoảng {"min": ..., "max": ..., "log": true}
+    space: Dict[str, Any] = {}
+    n_trials: int = 10
+    max_parallel: Optional[int] = None
+    cpu_budget: Optional[int] = None
+    prune_after_epochs: Optional[int] = None
+    seed: Optional[int] = None
+    # None: Config.SWEEP_PRIORITY
+    priority: Optional[int] = None
 
 
 class DeleteResponse(BaseModel):
@@ -56,17 +116,6 @@ class DeleteResponse(BaseModel):
     message: str
 
 
-def run_training_async(model_id, model_name, model_type, version, template_ids,
-                       epochs, batch_size, image_size, learning_rate):
-    try:
-        result = train_yolo_model(
-            model_id, model_name, model_type, version,
-            epochs, batch_size, image_size, learning_rate, template_ids
-        )
-    except Exception as e:
-        print(e)
-
-
 @app.post("/train", response_model=TrainResponse)
 async def start_training(train_request: TrainRequest):
     try:
@@ -74,27 +123,63 @@ async def start_training(train_request: TrainRequest):
             raise HTTPException(
                 status_code=400, detail="Missing required information")
 
-        model_id = hash(
-            f"{train_request.model_name}_{train_request.version}") % 10000 + 1000
-
-        model_id = str(model_id)
-
-        training_thread = threading.Thread(
-            target=run_training_async,
-            args=(model_id, train_request.model_name, train_request.model_type,
-                  train_request.version, train_request.template_ids,
-                  train_request.epochs, train_request.batch_size,
-                  train_request.image_size, train_request.learning_rate)
+        model_id = make_model_id(
+            train_request.model_name, train_request.version)
+        try:
+            check_model_dir_owner(
+                model_id, train_request.model_name, train_request.version)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+        warm_start = None
+        if (train_request.base_model_id or train_request.base_model_name or
+                train_request.base_model_version):
+            try:
+                warm_start = resolve_base_model(
+                    train_request.base_model_id,
+                    train_request.base_model_name,
+                    train_request.base_model_version)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if warm_start["base_model_id"] == model_id:
+                raise HTTPException(
+                    status_code=400, detail="A model cannot be warm-started from itself")
+            warm_start["freeze_layers"] = (Config.BACKBONE_FREEZE_LAYERS
+                                           if train_request.freeze_backbone else 0)
+
+        job = TrainingJob(
+            model_id, train_request.model_name, train_request.model_type,
+            train_request.version, train_request.template_ids,
+            train_request.epochs, train_request.batch_size,
+            train_request.image_size, train_request.learning_rate,
+            priority=train_request.priority,
+            warm_start=warm_start,
+            export=train_request.export
         )
-        training_thread.daemon = True
-        training_thread.start()
+        queue_info = get_scheduler().submit(job) or {}
 
         return TrainResponse(
             success=True,
             model_id=model_id,
-            message="Training started successfully"
+            message="Training queued successfully",
+            queue_position=queue_info.get('queue_position'),
+            estimated_start_time=queue_info.get('estimated_start_time')
         )
 
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except DuplicateJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/queue")
+async def get_queue_api():
+    try:
+        return get_scheduler().stats()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -114,20 +199,218 @@ async def get_training_status_api(model_id: str):
             end_time=status.get('end_time'),
             error=status.get('error'),
             final_metrics=status.get('final_metrics'),
-            dataset_info=status.get('dataset_info')
+            dataset_info=status.get('dataset_info'),
+            download_info=status.get('download_info'),
+            queue_position=status.get('queue_position'),
+            estimated_start_time=status.get('estimated_start_time'),
+            train_info_id=status.get('train_info_id'),
+            epoch_metrics=status.get('epoch_metrics'),
+            warm_start=status.get('warm_start'),
+            resume_history=status.get('resume_history'),
+            export_info=status.get('export_info'),
+            quantization_info=status.get('quantization_info')
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/events/{model_id}")
+async def training_events_api(model_id: str, request: Request):
+    """Server-Sent Events: gửi trạng thái mỗi khi epoch kết thúc hoặc trạng thái thay đổi"""
+    queue = status_broadcaster.subscribe(model_id)
+
+    def format_event(status_data):
+        event = "done" if status_data.get('status') in TERMINAL_STATUSES else "status"
+        return f"event: {event}\ndata: {json.dumps(status_data, ensure_ascii=False)}\n\n"
+
+    async def event_stream():
+        try:
+            status = get_training_status(model_id)
+            yield format_event(status)
+            if status.get('status') in TERMINAL_STATUSES + ('not_found',):
+                return
+
+            while not await request.is_disconnected():
+                try:
+                    status = await asyncio.wait_for(
+                        queue.get(), timeout=Config.EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_event(status)
+                if status.get('status') in TERMINAL_STATUSES:
+                    return
+        finally:
+            status_broadcaster.unsubscribe(model_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/resume/{model_id}", response_model=TrainResponse)
+async def resume_training_api(model_id: str, priority: int = 0):
+    """Train tiếp job bị hủy/lỗi từ train/weights/last.pt (optimizer và epoch được giữ nguyên)"""
+    try:
+        status = get_training_status(model_id)
+        if status.get('status') == 'not_found':
+            raise HTTPException(status_code=404, detail="Training not found")
+        if find_resume_checkpoint(status) is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Training in status '{status.get('status')}' has no checkpoint to resume from")
+        try:
+            # Có thể phải đọc checkpoint, không chạy trong event loop
+            batch_size, learning_rate = await run_in_threadpool(resume_train_args, status)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        job = TrainingJob(
+            model_id, status.get('model_name'), None, status.get('version'),
+            status.get('template_ids') or [], status.get('total_epochs'),
+            batch_size, status.get('image_size'), learning_rate,
+            priority=priority,
+            warm_start=status.get('warm_start'),
+            resume_status=status
+        )
+        queue_info = get_scheduler().submit(job) or {}
+
+        return TrainResponse(
+            success=True,
+            model_id=model_id,
+            message=f"Training resume from epoch {status.get('current_epoch', 0)} queued",
+            queue_position=queue_info.get('queue_position'),
+            estimated_start_time=queue_info.get('estimated_start_time')
+        )
+
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except DuplicateJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def submit_model_task(model_id, task, options):
+    """Claim export / quantize trên registry rồi đưa job vào scheduler"""
+    job = ModelTaskJob(model_id, task, options)
+    status, previous = job_registry.claim_task(model_id, job.info_field)
+    if status is None:
+        raise HTTPException(status_code=409, detail="Export or quantization already running")
+    status_file = os.path.join(Config.SHARED_MODEL_DIR, str(model_id), 'status.json')
+    notify_status(status)
+
+    try:
+        return get_scheduler().submit(job) or {}
+    except (QueueFullError, DuplicateJobError) as e:
+        status[job.info_field] = previous
+        safe_update_status(status_file, status)
+        raise HTTPException(
+            status_code=429 if isinstance(e, QueueFullError) else 409, detail=str(e))
+
+
+@app.post("/export/{model_id}")
+async def export_model_api(model_id: str, formats: Optional[str] = None):
+    """Export lại weights của model đã train (vd. formats=onnx,openvino), chạy qua
+    scheduler trong worker process riêng"""
+    status = get_training_status(model_id)
+    if status.get('status') == 'not_found':
+        raise HTTPException(status_code=404, detail="Training not found")
+    if status.get('status') != 'completed':
+        raise HTTPException(
+            status_code=400, detail=f"Training in status '{status.get('status')}' cannot be exported")
+
+    export_formats = [name.strip() for name in formats.split(",")
+                      if name.strip()] if formats else None
+    queue_info = submit_model_task(model_id, "export", {"formats": export_formats})
+    return dict({"success": True, "message": "Export queued"}, **queue_info)
+
+
+@app.post("/quantize/{model_id}")
+async def quantize_model_api(model_id: str, max_map_drop: Optional[float] = None):
+    """Lượng tử hóa INT8 model đã train, calibrate trên template trong TrainingData;
+    chạy qua scheduler trong worker process riêng"""
+    status = get_training_status(model_id)
+    if status.get('status') == 'not_found':
+        raise HTTPException(status_code=404, detail="Training not found")
+    if status.get('status') != 'completed':
+        raise HTTPException(
+            status_code=400, detail=f"Training in status '{status.get('status')}' cannot be quantized")
+
+    queue_info = submit_model_task(model_id, "quantize", {"max_map_drop": max_map_drop})
+    return dict({"success": True, "message": "Quantization queued"}, **queue_info)
+
+
+@app.post("/sweeps")
+async def start_sweep_api(sweep_request: SweepRequest):
+    try:
+        if not sweep_request.model_name or not sweep_request.template_ids:
+            raise HTTPException(
+                status_code=400, detail="Missing required information")
+
+        return get_sweep_manager().start(
+            sweep_request.model_name, sweep_request.template_ids,
+            search=sweep_request.search,
+            space=sweep_request.space,
+            n_trials=sweep_request.n_trials,
+            max_parallel=sweep_request.max_parallel,
+            cpu_budget=sweep_request.cpu_budget,
+            prune_after_epochs=sweep_request.prune_after_epochs,
+            seed=sweep_request.seed,
+            priority=sweep_request.priority
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sweeps")
+async def list_sweeps_api():
+    return get_sweep_manager().list()
+
+
+@app.get("/sweeps/{sweep_id}")
+async def get_sweep_api(sweep_id: str):
+    sweep = get_sweep_manager().summary(sweep_id)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return sweep
+
+
+@app.post("/sweeps/{sweep_id}/cancel")
+async def cancel_sweep_api(sweep_id: str):
+    if not get_sweep_manager().cancel(sweep_id):
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return {"success": True, "message": "Sweep cancelled"}
+
+
 @app.post("/cancel/{model_id}")
 async def cancel_training_api(model_id: str):
     try:
-        success = cancel_training(model_id)
+        state = get_scheduler().cancel(model_id)
+        if ModelTaskJob.is_task_id(model_id):
+            # Task không có status.json riêng: ModelTaskJob._finished ghi cancelled
+            # vào export_info / quantization_info của job train
+            if state is None:
+                return {"success": False, "message": "Could not cancel task"}
+            return {"success": True,
+                    "message": "Task cancelling" if state == "running" else "Task cancelled"}
+
+        stopping = state == "running"
+        success = cancel_training(model_id, stopping=stopping)
 
         if success:
-            return {"success": True, "message": "Training cancelled"}
+            return {"success": True,
+                    "message": "Training cancelling" if stopping else "Training cancelled"}
         else:
             return {"success": False, "message": "Could not cancel training"}
 
@@ -171,6 +454,30 @@ async def cleanup_failed_training_api(model_id: str):
             status_code=500, detail=str(e))
 
 
+@app.get("/image-cache/stats")
+async def image_cache_stats_api():
+    try:
+        return get_image_cache().stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=str(e))
+
+
+@app.get("/dataset-store/stats")
+async def dataset_store_stats_api():
+    try:
+        return get_dataset_store().stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=str(e))
+
+
+@app.get("/db/pool-stats")
+async def get_db_pool_stats():
+    """Số liệu connection pool: thời gian chờ checkout, số connection đang dùng, số lần pool cạn"""
+    return DatabaseUtil().pool_stats()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "train-service"}
@@ -0,0 +1,119 @@
+from config import Config
+from models.training_lost import TrainingLost
+
+
+class EpochMetricsRecorder:
+    """Thu thập loss và metric validation thật sau mỗi epoch.
+
+    Loss được gom lại và ghi vào bảng TrainingLost theo lô mỗi
+    METRICS_FLUSH_EPOCHS epoch, thay vì commit từng dòng. flushed_epoch là
+    epoch cuối đã ghi xong, được gửi kèm status để process cha ghi nốt phần
+    còn lại nếu worker bị terminate.
+    """
+
+    def __init__(self, train_info_id=None, flush_every=None, flushed_epoch=0):
+        self.train_info_id = train_info_id
+        self.flush_every = flush_every or Config.METRICS_FLUSH_EPOCHS
+        self.flushed_epoch = flushed_epoch
+        self.history = []
+        self._pending = []
+
+    def record(self, trainer):
+        epoch = trainer.epoch + 1
+        losses = trainer.label_loss_items(trainer.tloss, prefix='train')
+        metrics = trainer.metrics or {}
+
+        epoch_metrics = {
+            "epoch": epoch,
+            "box_loss": _round(losses.get('train/box_loss')),
+            "cls_loss": _round(losses.get('train/cls_loss')),
+            "dfl_loss": _round(losses.get('train/dfl_loss')),
+            "precision": _round(metrics.get('metrics/precision(B)')),
+            "recall": _round(metrics.get('metrics/recall(B)')),
+            "map50": _round(metrics.get('metrics/mAP50(B)')),
+            "map50_95": _round(metrics.get('metrics/mAP50-95(B)'))
+        }
+        self.history.append(epoch_metrics)
+
+        if self.train_info_id is not None:
+            self._pending.append(
+                _training_lost(self.train_info_id, epoch_metrics))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+        return epoch_metrics
+
+    def flush(self):
+        if not self._pending:
+            return
+        from dao.training_lost_dao import TrainingLostDAO
+
+        pending, self._pending = self._pending, []
+        try:
+            TrainingLostDAO().create_many(pending)
+            self.flushed_epoch = max(self.flushed_epoch,
+                                     max(loss.epoch for loss in pending))
+        except Exception as e:
+            # Giữ lại để thử ghi ở lần flush sau
+            self._pending = pending + self._pending
+            print(f"Error writing training losses: {e}")
+
+    def final_metrics(self, results_dict=None):
+        """Kết quả cuối: ưu tiên metric của lần validate cuối trên best.pt,
+        nếu không có thì lấy metric của epoch cuối"""
+        if results_dict:
+            last = {
+                "precision": _round(results_dict.get('metrics/precision(B)')),
+                "recall": _round(results_dict.get('metrics/recall(B)')),
+                "map50": _round(results_dict.get('metrics/mAP50(B)')),
+                "map50_95": _round(results_dict.get('metrics/mAP50-95(B)'))
+            }
+        elif self.history:
+            last = self.history[-1]
+        else:
+            return None
+
+        precision = last["precision"] or 0.0
+        recall = last["recall"] or 0.0
+        f1_score = (2 * precision * recall / (precision + recall)
+                    if precision + recall > 0 else 0.0)
+        return {
+            "map50": last["map50"],
+            "map50_95": last["map50_95"],
+            "precision": last["precision"],
+            "recall": last["recall"],
+            "accuracy": last["map50"],
+            "f1_score": round(f1_score, 5)
+        }
+
+
+def flush_relayed_losses(status):
+    """Ghi TrainingLost của các epoch worker đã báo về nhưng chưa kịp ghi DB
+    (worker bị terminate/kill). Trả về True nếu status được cập nhật."""
+    train_info_id = status.get("train_info_id")
+    flushed_epoch = status.get("metrics_flushed_epoch") or 0
+    pending = [_training_lost(train_info_id, metrics)
+               for metrics in status.get("epoch_metrics") or []
+               if metrics["epoch"] > flushed_epoch]
+    if train_info_id is None or not pending:
+        return False
+
+    from dao.training_lost_dao import TrainingLostDAO
+    try:
+        TrainingLostDAO().create_many(pending)
+    except Exception as e:
+        print(f"Error writing training losses: {e}")
+        return False
+    status["metrics_flushed_epoch"] = max(loss.epoch for loss in pending)
+    return True
+
+
+def _training_lost(train_info_id, epoch_metrics):
+    total_loss = sum(epoch_metrics[key] or 0.0
+                     for key in ("box_loss", "cls_loss", "dfl_loss"))
+    return TrainingLost(epoch=epoch_metrics["epoch"], lost=total_loss,
+                        trainInfoId=train_info_id)
+
+
+def _round(value):
+    return round(float(value), 5) if value is not None else None